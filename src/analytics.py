@@ -0,0 +1,135 @@
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .session_log import COUNTED_TYPE
+
+# 1970-01-01 was a Thursday; datetime64[D] counts days from it
+_EPOCH_WEEKDAY = 3
+# Tag trends compare the last TREND_DAYS days with the TREND_DAYS before
+TREND_DAYS = 30
+
+
+def _dense_days(daily: Dict[str, int], today: date):
+    """(first_day, counts) with one int32 slot per day from the first record to today."""
+    if not daily:
+        return np.datetime64(today, 'D'), np.zeros(1, dtype=np.int32)
+    days = np.array(list(daily.keys()), dtype='datetime64[D]')
+    values = np.fromiter(daily.values(), dtype=np.int32, count=len(daily))
+    first = days.min()
+    last = max(days.max(), np.datetime64(today, 'D'))
+    counts = np.zeros(int((last - first).astype(int)) + 1, dtype=np.int32)
+    np.add.at(counts, (days - first).astype(int), values)
+    return first, counts
+
+
+def _streaks(active: np.ndarray, today_index: int):
+    """(current, longest) runs of consecutive active days."""
+    # Run boundaries: +1 where a run starts, -1 one past where it ends
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if not len(starts):
+        return 0, 0
+    longest = int((ends - starts).max())
+    # A streak is still current if it reaches today, or yesterday (today not done yet)
+    last_start, last_end = starts[-1], ends[-1]
+    current = int(last_end - last_start) if last_end >= today_index else 0
+    return current, longest
+
+
+def _rolling_mean(counts: np.ndarray, window: int) -> np.ndarray:
+    """Mean over the trailing `window` days, aligned with counts (zero-padded at the start)."""
+    cumsum = np.cumsum(np.concatenate((np.zeros(window, dtype=np.int64), counts)))
+    return (cumsum[window:] - cumsum[:-window]) / window
+
+
+def session_hours(sessions: Iterable[Dict]) -> List[int]:
+    """Pomodoros per start hour. Callers keep it as a running total (see count_session)."""
+    hours = [0] * 24
+    for s in sessions:
+        count_session(hours, s["type"], s["cut_short"], s["start"])
+    return hours
+
+
+def count_session(hours: List[int], task_type: str, cut_short: bool, start: str):
+    """Add one session (start as ISO text) to a session_hours() histogram."""
+    if task_type == COUNTED_TYPE and not cut_short:
+        hours[int(start[11:13])] += 1
+
+
+def compute(daily: Dict[str, int], sessions: Iterable[Dict], today: date = None,
+            trend_days: int = TREND_DAYS, top_tags: int = 10,
+            hours: Optional[List[int]] = None) -> Dict:
+    """
+    Focus history analytics over dense NumPy arrays (one slot per day).
+
+    - current_streak / longest_streak: consecutive days with a pomodoro
+    - mean_7 / mean_30: trailing averages ending today; rolling_7 /
+      rolling_30 are the full series aligned with `first_day`
+    - weekday: pomodoros per weekday, Monday first (from daily stats)
+    - hours: pomodoros per start hour (from the session log)
+    - tag_trends: (tag, last trend_days, previous trend_days) for the most
+      used recent tags, from the session log
+
+    Given `hours` (session_hours over the whole log), `sessions` only needs
+    the last 2 * trend_days days, so the log is not read from the start.
+    """
+    today = today or date.today()
+    first, counts = _dense_days(daily, today)
+    today_index = len(counts) - 1
+
+    current, longest = _streaks(counts > 0, today_index)
+    rolling_7 = _rolling_mean(counts, 7)
+    rolling_30 = _rolling_mean(counts, 30)
+
+    day_numbers = first.astype(int) + np.arange(len(counts))
+    weekday = np.bincount((day_numbers + _EPOCH_WEEKDAY) % 7, weights=counts, minlength=7)
+
+    session_hist, tag_trends = _session_stats(sessions, today, trend_days, top_tags)
+    if hours is None:
+        hours = session_hist
+
+    return {
+        "first_day": date.fromisoformat(str(first)),
+        "total": int(counts.sum()),
+        "current_streak": current,
+        "longest_streak": longest,
+        "mean_7": float(rolling_7[-1]),
+        "mean_30": float(rolling_30[-1]),
+        "rolling_7": rolling_7,
+        "rolling_30": rolling_30,
+        "weekday": weekday.astype(int).tolist(),
+        "hours": list(hours),
+        "tag_trends": tag_trends,
+    }
+
+
+def _session_stats(sessions: Iterable[Dict], today: date, trend_days: int, top_tags: int):
+    starts, tags = [], []
+    for s in sessions:
+        if s["type"] == COUNTED_TYPE and not s["cut_short"]:
+            starts.append(s["start"])
+            tags.append(s["tag"])
+    if not starts:
+        return [0] * 24, []
+
+    start_times = np.array(starts, dtype='datetime64[m]')
+    minute_of_day = (start_times - start_times.astype('datetime64[D]')).astype(int)
+    hours = np.bincount(minute_of_day // 60, minlength=24)
+
+    # Days before today: 0..trend_days-1 is "recent", the window before is "previous"
+    age = (np.datetime64(today, 'D') - start_times.astype('datetime64[D]')).astype(int)
+    names, tag_ids = np.unique(np.array(tags), return_inverse=True)
+    recent = np.bincount(tag_ids[age < trend_days], minlength=len(names))
+    previous_mask = (age >= trend_days) & (age < 2 * trend_days)
+    previous = np.bincount(tag_ids[previous_mask], minlength=len(names))
+
+    order = np.lexsort((-previous, -recent))
+    trends = []
+    for i in order[:top_tags]:
+        if not names[i] or (recent[i] == 0 and previous[i] == 0):
+            continue
+        trends.append((str(names[i]), int(recent[i]), int(previous[i])))
+    return hours.tolist(), trends
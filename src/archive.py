@@ -0,0 +1,124 @@
+import json
+import logging
+import lzma
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .commit import CommitLog
+
+
+class TaskArchive:
+    """
+    Read-only, compressed segments of tasks moved out of the hot task store.
+
+    Each archive run writes one segment (segment-YYYYmmdd-HHMMSS.jsonl.xz, one
+    task per line) and records it in index.json together with the range of
+    created_at dates it covers and the ids it holds. Lookups by id open a
+    single segment; date queries only open segments whose range overlaps.
+    """
+
+    def __init__(self, directory: Path, commits: Optional[CommitLog] = None):
+        self.directory = Path(directory)
+        self.index_file = self.directory / "index.json"
+        # A new segment and the index entry pointing at it commit together
+        self.commits = commits or CommitLog(self.directory)
+        self._lock = threading.Lock()
+        self._index = None
+        # Most recently opened segment, so paging through one stays cheap
+        self._segment_cache = (None, None)
+
+    # --- Index ---
+
+    def _load_index(self) -> Dict:
+        if self._index is None:
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            except FileNotFoundError:
+                self._index = {"segments": {}, "ids": {}}
+            except json.JSONDecodeError as e:
+                logging.error(f"Error loading archive index: {e}")
+                self._index = {"segments": {}, "ids": {}}
+        return self._index
+
+    def _save_index(self, index: Dict):
+        data = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.commits.write(self.index_file, data)
+        self._index = index
+
+    # --- Segments ---
+
+    def _read_segment(self, name: str) -> List[Dict]:
+        cached_name, tasks = self._segment_cache
+        if cached_name == name:
+            return tasks
+        with lzma.open(self.directory / name, 'rt', encoding='utf-8') as f:
+            tasks = [json.loads(line) for line in f if line.strip()]
+        self._segment_cache = (name, tasks)
+        return tasks
+
+    def add(self, tasks: List[Dict]) -> Optional[str]:
+        """Write `tasks` as a new segment. Returns the segment name."""
+        if not tasks:
+            return None
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            index = self._load_index()
+            name = f"segment-{datetime.now():%Y%m%d-%H%M%S}.jsonl.xz"
+            n = 1
+            while name in index["segments"] or (self.directory / name).exists():
+                n += 1
+                name = f"segment-{datetime.now():%Y%m%d-%H%M%S}-{n}.jsonl.xz"
+
+            segment = lzma.compress("".join(
+                json.dumps(task, ensure_ascii=False, separators=(',', ':')) + "\n"
+                for task in tasks).encode('utf-8'))
+
+            days = sorted(t.get("created_at", "")[:10] for t in tasks)
+            new_index = {
+                "segments": dict(index["segments"]),
+                "ids": dict(index["ids"]),
+            }
+            new_index["segments"][name] = {
+                "count": len(tasks),
+                "first_day": days[0],
+                "last_day": days[-1],
+                "archived_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            for task in tasks:
+                new_index["ids"][task["id"]] = name
+            with self.commits.transaction():
+                self.commits.write(self.directory / name, segment)
+                self._save_index(new_index)
+            return name
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        with self._lock:
+            name = self._load_index()["ids"].get(task_id)
+            if name is None:
+                return None
+            for task in self._read_segment(name):
+                if task.get("id") == task_id:
+                    return task
+        return None
+
+    def iter_tasks(self, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[Dict]:
+        """Archived tasks created between start and end (inclusive), oldest segment first."""
+        first = start.isoformat() if start else ""
+        last = end.isoformat() if end else "9999-12-31"
+        with self._lock:
+            segments = sorted(self._load_index()["segments"].items())
+        for name, meta in segments:
+            if meta["last_day"] < first or meta["first_day"] > last:
+                continue
+            with self._lock:
+                tasks = self._read_segment(name)
+            for task in tasks:
+                if first <= task.get("created_at", "")[:10] <= last:
+                    yield task
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load_index()["ids"])
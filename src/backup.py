@@ -0,0 +1,409 @@
+"""
+Incremental, content-addressed snapshots of the data directory.
+
+    python -m src.backup list
+    python -m src.backup snapshot
+    python -m src.backup restore [SNAPSHOT] [--target DIR]
+
+Close TaskPulse before restoring: a running app keeps its own copy of the
+data in memory and would write it back.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .commit import CommitLog
+from .locking import StoreLock
+
+# Chunks end after a line whose checksum hits the mask, so an edit only
+# changes the chunks around it; binary files without newlines fall back to
+# fixed MAX_CHUNK pieces
+MIN_CHUNK = 2 * 1024
+MAX_CHUNK = 64 * 1024
+_BOUNDARY_MASK = 0xFF
+
+# Never backed up or touched by restore. A SQLite database is copied
+# through the backup API instead, which folds its WAL in
+_SKIP_SUFFIXES = (".tmp", ".lock", "-shm", "-wal", ".commit.intent")
+_SQLITE_SUFFIX = ".db"
+# Written in place (mapped day counters) or through a WAL: size, mtime and
+# inode can stay the same while the content changes, so always read them
+_ALWAYS_READ_SUFFIXES = (".bin", _SQLITE_SUFFIX)
+
+
+def iter_chunks(f) -> Iterator[bytes]:
+    """Split a binary file into content-defined chunks at line boundaries."""
+    chunk = bytearray()
+    while True:
+        line = f.readline(MAX_CHUNK - len(chunk))
+        if not line:
+            break
+        chunk += line
+        if len(chunk) >= MAX_CHUNK or (
+                len(chunk) >= MIN_CHUNK and line.endswith(b"\n")
+                and zlib.crc32(line) & _BOUNDARY_MASK == 0):
+            yield bytes(chunk)
+            chunk.clear()
+    if chunk:
+        yield bytes(chunk)
+
+
+class BackupStore:
+    """
+    Snapshots of a directory tree, stored as deduplicated chunks.
+
+    objects/ab/<sha256> holds each distinct chunk once (zlib compressed);
+    snapshots/<YYYYmmdd-HHMMSS>.json lists every file with its size, mtime,
+    inode and chunk hashes. A file whose size, mtime and inode match the
+    previous snapshot is not even opened (except files written in place,
+    see _ALWAYS_READ_SUFFIXES), and a changed file only adds the chunks
+    that are new, so a snapshot costs about as much as what changed since
+    the last one, not the size of the history. A SQLite database is read
+    through sqlite3's backup API, so the copy is consistent even while the
+    app writes to it.
+
+    snapshot(), prune() and restore() hold an exclusive lock on the backup
+    folder, so a snapshot taken by another process never loses chunks to
+    a concurrent prune.
+    """
+
+    def __init__(self, backup_dir: Path, data_dir: Path, keep_last: int = 24,
+                 keep_days: int = 30, read_lock: Optional[Callable] = None,
+                 commits: Optional[CommitLog] = None):
+        self.backup_dir = Path(backup_dir)
+        self.data_dir = Path(data_dir)
+        self.objects_dir = self.backup_dir / "objects"
+        self.snapshots_dir = self.backup_dir / "snapshots"
+        self.keep_last = keep_last
+        self.keep_days = keep_days
+        # Held (shared) while reading, so no writer is half way through a file
+        self.read_lock = read_lock
+        # Chunks and manifests are replaced atomically under the fsync policy
+        self.commits = commits or CommitLog(self.backup_dir)
+        self._lock = threading.Lock()
+        self._dir_lock = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Walking the data directory ---
+
+    def _iter_files(self, root: Path) -> Iterator[Path]:
+        backup_dir = self.backup_dir.resolve()
+        for dirpath, dirnames, filenames in os.walk(root):
+            # Keep a backup folder inside data/ out of its own snapshots
+            dirnames[:] = sorted(d for d in dirnames
+                                 if (Path(dirpath) / d).resolve() != backup_dir
+                                 and d != "__pycache__")
+            for name in sorted(filenames):
+                if not name.endswith(_SKIP_SUFFIXES):
+                    yield Path(dirpath) / name
+
+    @contextmanager
+    def _locked(self):
+        """This thread and, through a lock file, other processes using the backup folder."""
+        with self._lock:
+            if self._dir_lock is None:
+                self.backup_dir.mkdir(parents=True, exist_ok=True)
+                self._dir_lock = StoreLock(self.backup_dir / ".backup.lock")
+            with self._dir_lock.exclusive():
+                yield
+
+    @contextmanager
+    def _open_for_backup(self, path: Path):
+        """`path` opened for reading; a consistent copy if it is a SQLite database."""
+        if path.suffix != _SQLITE_SUFFIX:
+            with open(path, 'rb') as f:
+                yield f
+            return
+        fd, tmp = tempfile.mkstemp(suffix=".db.tmp")
+        os.close(fd)
+        try:
+            src = sqlite3.connect(f"file:{path.as_posix()}?mode=ro", uri=True)
+            dst = sqlite3.connect(tmp)
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+            with open(tmp, 'rb') as f:
+                yield f
+        finally:
+            os.unlink(tmp)
+
+    # --- Objects ---
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def _store_chunk(self, data: bytes) -> Tuple[str, int]:
+        """Store a chunk unless already present. Returns (hash, bytes written)."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if path.exists():
+            return digest, 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        packed = zlib.compress(data)
+        self.commits.write(path, packed)
+        return digest, len(packed)
+
+    def _load_chunk(self, digest: str) -> bytes:
+        with open(self._object_path(digest), 'rb') as f:
+            data = zlib.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise ValueError(f"Backup chunk {digest[:12]} is corrupt")
+        return data
+
+    # --- Snapshots ---
+
+    def list_snapshots(self) -> List[str]:
+        """Snapshot names, oldest first."""
+        if not self.snapshots_dir.exists():
+            return []
+        return sorted(p.stem for p in self.snapshots_dir.glob("*.json"))
+
+    def load_snapshot(self, name: str) -> Dict:
+        with open(self.snapshots_dir / f"{name}.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _latest_files(self) -> Dict[str, Dict]:
+        names = self.list_snapshots()
+        if not names:
+            return {}
+        try:
+            return self.load_snapshot(names[-1])["files"]
+        except (OSError, json.JSONDecodeError, KeyError) as e:
+            logging.error(f"Error reading snapshot {names[-1]}: {e}")
+            return {}
+
+    def snapshot(self, label: str = "") -> Optional[str]:
+        """
+        Take a snapshot of the data directory. Returns its name, or None if
+        nothing changed since the previous one.
+        """
+        with self._locked():
+            previous = self._latest_files()
+            files = {}
+            written = 0
+            with (self.read_lock() if self.read_lock else nullcontext()):
+                for path in self._iter_files(self.data_dir):
+                    rel = path.relative_to(self.data_dir).as_posix()
+                    try:
+                        st = path.stat()
+                        old = previous.get(rel)
+                        if (old and old["size"] == st.st_size and old["mtime_ns"] == st.st_mtime_ns
+                                and old.get("inode") == st.st_ino
+                                and not path.name.endswith(_ALWAYS_READ_SUFFIXES)):
+                            files[rel] = old
+                            continue
+                        chunks = []
+                        size = 0
+                        with self._open_for_backup(path) as f:
+                            for data in iter_chunks(f):
+                                digest, n = self._store_chunk(data)
+                                chunks.append(digest)
+                                size += len(data)
+                                written += n
+                    except FileNotFoundError:
+                        continue  # Deleted while we were walking
+                    except sqlite3.Error as e:
+                        logging.error(f"Error backing up {rel}: {e}")
+                        continue
+                    # size is what was stored: a database copy can differ from the file on disk
+                    files[rel] = {"size": size, "mtime_ns": st.st_mtime_ns,
+                                  "inode": st.st_ino, "chunks": chunks}
+
+            if files == previous and not label:
+                return None
+
+            self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+            name = datetime.now().strftime("%Y%m%d-%H%M%S")
+            n = 1
+            while (self.snapshots_dir / f"{name}.json").exists():
+                n += 1
+                name = f"{datetime.now():%Y%m%d-%H%M%S}-{n}"
+            manifest = {
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "label": label,
+                "bytes_written": written,
+                "files": files,
+            }
+            self.commits.write(self.snapshots_dir / f"{name}.json",
+                               json.dumps(manifest, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            logging.info(f"Backup snapshot {name}: {len(files)} files, {written} new bytes")
+            return name
+
+    # --- Retention ---
+
+    def prune(self) -> int:
+        """
+        Keep the newest `keep_last` snapshots plus the last snapshot of each of
+        the past `keep_days` days; delete the rest and any chunk no remaining
+        snapshot uses. Returns how many snapshots were deleted.
+        """
+        with self._locked():
+            names = self.list_snapshots()
+            keep = set(names[-self.keep_last:]) if self.keep_last > 0 else set()
+            cutoff = (datetime.now() - timedelta(days=self.keep_days)).strftime("%Y%m%d")
+            last_per_day = {}
+            for name in names:
+                last_per_day[name[:8]] = name
+            keep.update(name for day, name in last_per_day.items() if day >= cutoff)
+
+            evicted = [name for name in names if name not in keep]
+            if not evicted:
+                return 0
+            for name in evicted:
+                (self.snapshots_dir / f"{name}.json").unlink()
+
+            # Garbage-collect chunks only when a snapshot actually went away
+            referenced = set()
+            for name in keep:
+                for meta in self.load_snapshot(name)["files"].values():
+                    referenced.update(meta["chunks"])
+            for path in self.objects_dir.glob("*/*"):
+                if path.name not in referenced:
+                    path.unlink()
+            logging.info(f"Pruned {len(evicted)} backup snapshots")
+            return len(evicted)
+
+    # --- Restore ---
+
+    def restore(self, name: Optional[str] = None, target: Optional[Path] = None,
+                write_lock: Optional[Callable] = None) -> int:
+        """
+        Make `target` (default: the data directory) match snapshot `name`
+        (default: the newest). Files already matching are skipped, files the
+        snapshot does not have are removed. Returns how many files were written.
+        """
+        with self._locked():
+            return self._restore(name, target, write_lock)
+
+    def _restore(self, name: Optional[str], target: Optional[Path], write_lock: Optional[Callable]) -> int:
+        names = self.list_snapshots()
+        if not names:
+            raise FileNotFoundError("No backup snapshots found")
+        name = name or names[-1]
+        files = self.load_snapshot(name)["files"]
+        target = Path(target or self.data_dir)
+
+        written = 0
+        with (write_lock() if write_lock else nullcontext()):
+            for rel, meta in files.items():
+                dest = target / rel
+                try:
+                    st = dest.stat()
+                    if (st.st_size == meta["size"] and st.st_mtime_ns == meta["mtime_ns"]
+                            and not dest.name.endswith(_ALWAYS_READ_SUFFIXES)):
+                        continue
+                except FileNotFoundError:
+                    pass
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                tmp = dest.with_name(dest.name + ".restore.tmp")
+                with open(tmp, 'wb') as f:
+                    for digest in meta["chunks"]:
+                        f.write(self._load_chunk(digest))
+                # Restore the mtime too, so the next snapshot can skip the file
+                os.utime(tmp, ns=(meta["mtime_ns"], meta["mtime_ns"]))
+                if dest.suffix == _SQLITE_SUFFIX:
+                    # The stored copy already contains its WAL; a leftover
+                    # one from the current database must not be replayed onto it
+                    for suffix in ("-wal", "-shm"):
+                        dest.with_name(dest.name + suffix).unlink(missing_ok=True)
+                os.replace(tmp, dest)
+                written += 1
+
+            for path in list(self._iter_files(target)):
+                if path.relative_to(target).as_posix() not in files:
+                    path.unlink()
+        return written
+
+    # --- Periodic snapshots ---
+
+    def start(self, interval: float, before: Optional[Callable[[], None]] = None):
+        """Snapshot and prune every `interval` seconds; `before` runs first (e.g. a flush)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval, before),
+                                            name="BackupStore", daemon=True)
+            self._thread.start()
+
+    def _run(self, interval: float, before):
+        while not self._stop.wait(interval):
+            try:
+                if before:
+                    before()
+                self.snapshot()
+                self.prune()
+            except Exception as e:
+                logging.error(f"Error taking backup snapshot: {e}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+
+
+def main(argv=None):
+    from .config import DATA_DIR, BACKUP_DIR, BACKUP_KEEP_LAST, BACKUP_KEEP_DAYS
+    from .locking import StoreLock
+
+    parser = argparse.ArgumentParser(prog="python -m src.backup", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="list snapshots")
+    sub.add_parser("snapshot", help="take a snapshot now")
+    p = sub.add_parser("restore", help="restore a snapshot (default: the newest)")
+    p.add_argument("snapshot", nargs="?")
+    p.add_argument("--target", type=Path, help=f"directory to restore into (default: {DATA_DIR})")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    lock = StoreLock(DATA_DIR / ".taskpulse.lock")
+    store = BackupStore(BACKUP_DIR, DATA_DIR, BACKUP_KEEP_LAST, BACKUP_KEEP_DAYS,
+                        read_lock=lock.shared)
+
+    if args.command == "list":
+        for name in store.list_snapshots():
+            manifest = store.load_snapshot(name)
+            size = sum(m["size"] for m in manifest["files"].values())
+            label = f"  ({manifest['label']})" if manifest.get("label") else ""
+            print(f"{name}  {len(manifest['files'])} files  {size} bytes  "
+                  f"+{manifest['bytes_written']} stored{label}")
+    elif args.command == "snapshot":
+        print(store.snapshot() or "No changes since the last snapshot")
+    elif args.command == "restore":
+        names = store.list_snapshots()
+        name = args.snapshot or (names[-1] if names else None)
+        if name not in names:
+            print(f"No such snapshot: {name}" if name else "No backup snapshots found")
+            return 1
+        if args.target is None:
+            # Keep the current state, so a restore can itself be undone
+            store.snapshot(label="before restore")
+            n = store.restore(name, write_lock=lambda: _restore_lock(lock))
+        else:
+            n = store.restore(name, args.target)
+        print(f"Restored {n} files from {name}")
+    return 0
+
+
+@contextmanager
+def _restore_lock(lock):
+    with lock.exclusive():
+        yield
+        # Tells a running JSON-mode app that the files changed under it
+        lock.bump()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
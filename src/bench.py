@@ -0,0 +1,307 @@
+"""
+Storage stress tests and benchmarks.
+
+    python -m src.bench stress [--modes json,journal,sqlite] [--processes 4]
+                               [--threads 4] [--count 50] [--daily-format json]
+    python -m src.bench commit [--modes json,journal,cached,sqlite]
+                               [--policies always,batched,never] [--count 200]
+    python -m src.bench recurring [--count 1000]
+    python -m src.bench timers [--count 500] [--spread 5] [--dump DIR]
+    python -m src.bench notify [--count 200] [--seconds 2]
+
+`stress` hammers record_pomodoro (and add_task) from many threads in many
+processes against a throwaway data directory, then checks that no count and
+no task was lost. tests/test_stress.py runs it with small counts. Every process gets the directory through TASKPULSE_DATA_DIR
+and the backend through TASKPULSE_STORAGE_MODE, so the real data/ folder is
+never touched.
+
+`commit` measures per-commit latency of record_pomodoro (daily stats, tag
+stats and rollups in one group commit) and add_task under each fsync_policy.
+
+`recurring` stores `count` recurring reminders, then times what startup
+does with them: load them from DataManager and arm each on the scheduler.
+
+`timers` arms `count` countdowns spread over `spread` seconds and prints the
+lateness histogram of their callbacks (deadline -> callback), the same data
+the diagnostics view shows; --dump writes it to a file as well.
+
+`notify` sends `count` notifications over `seconds` from several threads
+through NotificationService with the stub backend, then prints how many
+were shown, merged, deduplicated and dropped, and the delivery latency.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+
+def _worker(proc_no: int, threads: int, count: int, errors):
+    from .data_manager import DataManager
+    dm = DataManager()
+
+    def hammer(thread_no):
+        try:
+            dm.add_task(f"stress-{proc_no}-{thread_no}", "manual")
+            for _ in range(count):
+                dm.record_pomodoro(task_name=f"stress-p{proc_no}")
+        except Exception as e:
+            errors.put(f"process {proc_no} thread {thread_no}: {e!r}")
+
+    pool = [threading.Thread(target=hammer, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    dm.close()
+
+
+def _check(processes: int, threads: int, count: int, results):
+    from .data_manager import DataManager
+    dm = DataManager()
+    expected = processes * threads * count
+    days_total = sum(dm.get_daily_stats().values())
+    rollup_total = sum(dm.get_year_total(y) for y in dm.get_years_with_data())
+    tags = dict(dm.get_tag_stats())
+    lost_tags = {f"stress-p{p}": tags.get(f"stress-p{p}", 0) for p in range(processes)
+                 if tags.get(f"stress-p{p}", 0) != threads * count}
+    tasks = sum(1 for t in dm.iter_tasks(filter=lambda t: t["title"].startswith("stress-")))
+    dm.close()
+    results.put({
+        "expected": expected,
+        "days": days_total,
+        "rollups": rollup_total,
+        "bad_tags": lost_tags,
+        "tasks": tasks,
+        "expected_tasks": processes * threads,
+    })
+
+
+def stress(mode: str, processes: int, threads: int, count: int, daily_format: str) -> List[str]:
+    """Run the stress test for one backend; returns what went wrong (empty if nothing was lost)."""
+    data_dir = tempfile.mkdtemp(prefix=f"taskpulse-stress-{mode}-")
+    os.environ["TASKPULSE_DATA_DIR"] = data_dir
+    os.environ["TASKPULSE_STORAGE_MODE"] = mode
+    os.environ["TASKPULSE_DAILY_STATS_FORMAT"] = daily_format
+    ctx = multiprocessing.get_context("spawn")
+    errors, results = ctx.Queue(), ctx.Queue()
+    try:
+        started = time.perf_counter()
+        workers = [ctx.Process(target=_worker, args=(i, threads, count, errors))
+                   for i in range(processes)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - started
+
+        checker = ctx.Process(target=_check, args=(processes, threads, count, results))
+        checker.start()
+        checker.join()
+        r = results.get(timeout=30)
+
+        failures = []
+        while not errors.empty():
+            failures.append(errors.get())
+        if any(w.exitcode != 0 for w in workers):
+            failures.append("a worker process crashed")
+        if r["days"] != r["expected"]:
+            failures.append(f"daily stats {r['days']} != {r['expected']}")
+        if r["rollups"] != r["expected"]:
+            failures.append(f"rollups {r['rollups']} != {r['expected']}")
+        if r["bad_tags"]:
+            failures.append(f"tag counts off: {r['bad_tags']}")
+        if r["tasks"] != r["expected_tasks"]:
+            failures.append(f"tasks {r['tasks']} != {r['expected_tasks']}")
+
+        rate = r["expected"] / elapsed if elapsed else 0
+        status = "OK" if not failures else "FAILED"
+        print(f"[{mode}/{daily_format}] {processes}x{threads}x{count} = {r['expected']} pomodoros "
+              f"in {elapsed:.2f}s ({rate:.0f}/s): {status}")
+        for f in failures:
+            print(f"    {f}")
+        return failures
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def _percentile(sorted_values, p: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def _commit_worker(count: int, results):
+    from .data_manager import DataManager
+    dm = DataManager()
+    timings = {"record_pomodoro": [], "add_task": []}
+    for i in range(count):
+        started = time.perf_counter()
+        dm.record_pomodoro(task_name=f"bench-{i % 10}")
+        timings["record_pomodoro"].append(time.perf_counter() - started)
+        started = time.perf_counter()
+        dm.add_task(f"bench-{i}", "manual")
+        timings["add_task"].append(time.perf_counter() - started)
+    dm.close()
+    results.put(timings)
+
+
+def commit_latency(mode: str, policy: str, count: int):
+    data_dir = tempfile.mkdtemp(prefix=f"taskpulse-commit-{mode}-")
+    os.environ["TASKPULSE_DATA_DIR"] = data_dir
+    os.environ["TASKPULSE_STORAGE_MODE"] = mode
+    os.environ["TASKPULSE_FSYNC_POLICY"] = policy
+    os.environ["TASKPULSE_BACKUP_INTERVAL_MINUTES"] = "0"
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    try:
+        worker = ctx.Process(target=_commit_worker, args=(count, results))
+        worker.start()
+        timings = results.get(timeout=600)
+        worker.join()
+        for op, values in timings.items():
+            values.sort()
+            print(f"[{mode}/{policy}] {op:<16} mean {sum(values) / len(values) * 1000:7.3f} ms  "
+                  f"p50 {_percentile(values, 0.5) * 1000:7.3f} ms  "
+                  f"p99 {_percentile(values, 0.99) * 1000:7.3f} ms")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def recurring(count: int):
+    # Before anything imports config, so the real data/ folder is never touched
+    data_dir = tempfile.mkdtemp(prefix="taskpulse-recurring-")
+    os.environ["TASKPULSE_DATA_DIR"] = data_dir
+    os.environ["TASKPULSE_BACKUP_INTERVAL_MINUTES"] = "0"
+
+    from datetime import datetime, timedelta
+    from . import recurrence
+    from .data_manager import DataManager
+    from .scheduler import TaskScheduler
+    scheduler = TaskScheduler()
+    try:
+        dm = DataManager()
+        rules = [recurrence.interval(15), recurrence.daily("20:00"), recurrence.weekly("08:30", [0, 2, 4])]
+        items = [{"title": f"reminder-{i}", "type": "recurring",
+                  "params": {"rule": rules[i % 3],
+                             "last_fired": (datetime.now() - timedelta(minutes=1)).isoformat()}}
+                 for i in range(count)]
+        dm.add_tasks(items)
+
+        started = time.perf_counter()
+        reminders = dm.get_recurring()
+        loaded = time.perf_counter()
+        for task in reminders:
+            last = datetime.fromisoformat(task["params"]["last_fired"])
+            scheduler.add_recurring_task(f"recurring_{task['id']}", task["params"]["rule"],
+                                         lambda fired_at, occurrences: None, last)
+        armed = time.perf_counter()
+        print(f"{len(reminders)} reminders: load {(loaded - started) * 1000:.1f} ms, "
+              f"arm {(armed - loaded) * 1000:.1f} ms")
+        dm.close()
+    finally:
+        scheduler.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def timers(count: int, spread: float, dump_dir=None):
+    import random
+    from .diagnostics import format_histogram
+    from .scheduler import TaskScheduler
+
+    scheduler = TaskScheduler()
+    done = threading.Semaphore(0)
+    try:
+        for i in range(count):
+            scheduler.engine.add(f"bench-{i}", random.uniform(0, spread), done.release)
+        for _ in range(count):
+            done.acquire()
+        summary = scheduler.diagnostics.summary()
+        print(f"{count} timers over {spread:g}s, deadline -> callback:")
+        for line in format_histogram(summary["metrics"]["callback"]):
+            print("  " + line)
+        if dump_dir:
+            print(f"written to {scheduler.diagnostics.dump(dump_dir)}")
+    finally:
+        scheduler.shutdown()
+
+
+def notify(count: int, seconds: float):
+    from .diagnostics import format_histogram
+    from .notifications import NotificationService, StubBackend
+
+    backend = StubBackend()
+    service = NotificationService(backend, min_interval=0.5, dedup_window=1.0)
+    titles = ["任务完成", "任务开始", "提醒"]
+
+    def sender(thread_no):
+        for i in range(count // 4):
+            service.notify(titles[i % 3], f"任务 [{thread_no}-{i % 10}]")
+            time.sleep(seconds * 4 / count)
+
+    threads = [threading.Thread(target=sender, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    service.close()
+    print(f"{count} notifications over {seconds:g}s: {len(backend.delivered)} shown, {service.stats()}")
+    for line in format_histogram(service.latency.summary()):
+        print("  " + line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.bench", description=__doc__.split("\n\n")[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("stress", help="concurrent record_pomodoro across threads and processes")
+    p.add_argument("--modes", default="json,journal,sqlite",
+                   help="comma separated storage modes (cached is single-process only)")
+    p.add_argument("--processes", type=int, default=4)
+    p.add_argument("--threads", type=int, default=4)
+    p.add_argument("--count", type=int, default=50, help="pomodoros per thread")
+    p.add_argument("--daily-format", default="json", choices=("json", "mmap"))
+
+    p = sub.add_parser("commit", help="per-commit write latency under each fsync policy")
+    p.add_argument("--modes", default="json,journal,cached,sqlite")
+    p.add_argument("--policies", default="always,batched,never")
+    p.add_argument("--count", type=int, default=200, help="commits per operation")
+
+    p = sub.add_parser("recurring", help="startup cost of re-arming recurring reminders")
+    p.add_argument("--count", type=int, default=1000)
+
+    p = sub.add_parser("timers", help="lateness of timer callbacks against their deadlines")
+    p.add_argument("--count", type=int, default=500)
+    p.add_argument("--spread", type=float, default=5.0, help="seconds the deadlines are spread over")
+    p.add_argument("--dump", default=None, help="also write the histogram to this directory")
+
+    p = sub.add_parser("notify", help="rate limiting and merging of a notification burst")
+    p.add_argument("--count", type=int, default=200)
+    p.add_argument("--seconds", type=float, default=2.0)
+
+    args = parser.parse_args(argv)
+    if args.command == "stress":
+        ok = True
+        for mode in args.modes.split(","):
+            ok &= not stress(mode.strip(), args.processes, args.threads, args.count, args.daily_format)
+        return 0 if ok else 1
+    if args.command == "commit":
+        for mode in args.modes.split(","):
+            for policy in args.policies.split(","):
+                commit_latency(mode.strip(), policy.strip(), args.count)
+        return 0
+    if args.command == "recurring":
+        recurring(args.count)
+        return 0
+    if args.command == "timers":
+        timers(args.count, args.spread, args.dump)
+        return 0
+    if args.command == "notify":
+        notify(args.count, args.seconds)
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
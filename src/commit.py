@@ -0,0 +1,288 @@
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+FSYNC_POLICIES = ("always", "batched", "never")
+
+
+def _fsync_dir(directory: Path):
+    """Make renames in `directory` durable (no-op where directories can't be opened)."""
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _fsync_path(path: Path):
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    except FileNotFoundError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class CommitLog:
+    """
+    Crash-safe file replacement with multi-file group commits.
+
+    Every write goes to a temp file next to its target and is renamed over it,
+    so a reader or a crash only ever sees the old or the new content, never a
+    truncated file. Writes made inside one transaction() are committed
+    together: all temp files are written first, then an intent file listing
+    the renames, then the renames themselves. If the process dies after the
+    intent file is complete, recover() finishes the renames on the next start;
+    before that point none of them happened. patch() stages an in-place
+    write to an existing file (a mapped day counter slot); patches carry
+    the bytes themselves, so recover() can apply them again. So a
+    pomodoro's stats (JSON or mapped), rollups and tag counts land on disk
+    together or not at all.
+
+    Appends (task journal, session log, sync deltas) and standalone writes
+    (timer state, archive segments, backups) are not grouped with anything;
+    they only follow the fsync policy. The cached storage mode keeps changes
+    in memory and commits them later, so it is not covered either.
+
+    fsync policy:
+      always  - fsync temp files, the intent file and the directory on every
+                commit; a commit that returned survives a power cut
+      batched - no fsync on the commit path; files changed since the last
+                sync are fsynced together `batch_interval` seconds later
+      never   - leave it to the OS; still atomic against app crashes
+    Callers serialize commits (JSON backends hold the store's writer lock).
+    """
+
+    def __init__(self, directory: Path, fsync: str = "batched", batch_interval: float = 1.0):
+        if fsync not in FSYNC_POLICIES:
+            logging.error(f"Unknown fsync_policy '{fsync}', using batched")
+            fsync = "batched"
+        self.directory = Path(directory)
+        self.fsync = fsync
+        self.batch_interval = batch_interval
+        self._local = threading.local()
+        self._dirty = set()            # paths written since the last batched fsync
+        self._dirty_lock = threading.Lock()
+        self._timer = None
+        self.commits = 0
+        self.fsyncs = 0
+
+    # --- Writing ---
+
+    def _tmp_path(self, path: Path) -> Path:
+        # Unique per thread, so concurrent writers never share a temp file
+        return path.with_name(f"{path.name}.{os.getpid()}-{threading.get_ident()}.commit.tmp")
+
+    def _write_tmp(self, path: Path, data: bytes) -> Path:
+        tmp = self._tmp_path(path)
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            if self.fsync == "always":
+                f.flush()
+                os.fsync(f.fileno())
+                self.fsyncs += 1
+        return tmp
+
+    def write(self, path: Path, data: bytes, on_commit: Optional[Callable[[], None]] = None):
+        """
+        Replace `path` with `data`. Inside a transaction() the write is staged
+        and happens at commit; otherwise it is committed on its own right away.
+        `on_commit` runs once the new content is in place.
+        """
+        staged = getattr(self._local, "staged", None)
+        if staged is not None:
+            staged[Path(path)] = (data, on_commit)
+            return
+        self._commit({Path(path): (data, on_commit)}, [])
+
+    def patch(self, path: Path, offset: int, data: bytes):
+        """
+        Overwrite `data` at `offset` of the existing file `path`, in place.
+        Inside a transaction() it is applied after the group's renames and
+        recorded in the intent file; otherwise right away.
+        """
+        patches = getattr(self._local, "patches", None)
+        if patches is not None:
+            patches.append((Path(path), offset, data))
+            return
+        self._commit({}, [(Path(path), offset, data)])
+
+    @contextmanager
+    def transaction(self):
+        """Group every write() in the block into one commit. Nested blocks join the outer one."""
+        if getattr(self._local, "staged", None) is not None:
+            yield
+            return
+        self._local.staged, self._local.patches = {}, []
+        try:
+            yield
+            staged, patches = self._local.staged, self._local.patches
+        finally:
+            self._local.staged = self._local.patches = None
+        if staged or patches:
+            self._commit(staged, patches)
+
+    def _commit(self, staged: Dict[Path, Tuple[bytes, Optional[Callable]]],
+                patches: List[Tuple[Path, int, bytes]]):
+        renames: List[Tuple[Path, Path]] = []
+        try:
+            for path, (data, _) in staged.items():
+                renames.append((self._write_tmp(path, data), path))
+        except OSError:
+            for tmp, _ in renames:
+                tmp.unlink(missing_ok=True)
+            raise
+
+        intent = None
+        if len(renames) + len(patches) > 1:
+            # The commit point: once this file is complete, recover() will
+            # finish the renames and patches even if we die half way through
+            intent = self.directory / f"{os.getpid()}-{threading.get_ident()}.commit.intent"
+            with open(intent, 'w', encoding='utf-8') as f:
+                json.dump([[str(tmp), str(path)] for tmp, path in renames]
+                          + [[str(path), offset, data.hex()] for path, offset, data in patches], f)
+                if self.fsync == "always":
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self.fsyncs += 1
+
+        for tmp, path in renames:
+            os.replace(tmp, path)
+        for path, offset, data in patches:
+            self._apply_patch(path, offset, data)
+        if self.fsync == "always":
+            for directory in {path.parent for _, path in renames}:
+                _fsync_dir(directory)
+                self.fsyncs += 1
+        elif self.fsync == "batched":
+            self._mark_dirty([path for _, path in renames] + [path for path, _, _ in patches])
+        if intent is not None:
+            intent.unlink()
+        self.commits += 1
+
+        for data, on_commit in staged.values():
+            if on_commit:
+                on_commit()
+
+    def _apply_patch(self, path: Path, offset: int, data: bytes):
+        # Through the page cache, so processes that map the file see it at once
+        with open(path, 'r+b') as f:
+            f.seek(offset)
+            f.write(data)
+            if self.fsync == "always":
+                f.flush()
+                os.fsync(f.fileno())
+                self.fsyncs += 1
+
+    def appended(self, path: Path, f):
+        """Apply the fsync policy to `f`, an open file just appended to."""
+        if self.fsync == "always":
+            f.flush()
+            os.fsync(f.fileno())
+            self.fsyncs += 1
+        elif self.fsync == "batched":
+            self._mark_dirty([Path(path)])
+
+    # --- Batched fsync ---
+
+    def _mark_dirty(self, paths):
+        with self._dirty_lock:
+            self._dirty.update(paths)
+            if self._timer is None:
+                self._timer = threading.Timer(self.batch_interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def sync(self):
+        """fsync every file written since the last sync, and their directories."""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+            self._timer = None
+        try:
+            for path in dirty:
+                _fsync_path(path)
+            for directory in {path.parent for path in dirty}:
+                _fsync_dir(directory)
+            self.fsyncs += len(dirty) + len({path.parent for path in dirty})
+        except OSError as e:
+            logging.error(f"Error syncing data files: {e}")
+
+    def close(self):
+        with self._dirty_lock:
+            timer = self._timer
+        if timer is not None:
+            timer.cancel()
+        self.sync()
+
+    # --- Recovery ---
+
+    def recover(self) -> int:
+        """
+        Finish commits interrupted by a crash and drop temp files of commits
+        that never reached their intent file. Files of processes that are
+        still running are left alone: they may be committing right now. Call
+        before reading. Returns how many commits were rolled forward.
+        """
+        rolled = 0
+        for intent in self.directory.glob("*.commit.intent"):
+            if _owner_alive(intent.name):
+                continue
+            try:
+                with open(intent, 'r', encoding='utf-8') as f:
+                    steps = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                # Torn intent file: no rename had started, the temp files go below
+                steps = []
+            for step in steps:
+                if len(step) == 3:
+                    path, offset, data = step
+                    self._apply_patch(Path(path), offset, bytes.fromhex(data))
+                elif os.path.exists(step[0]):
+                    os.replace(step[0], step[1])
+            if steps:
+                rolled += 1
+                logging.info(f"Recovered interrupted commit {intent.name}")
+            intent.unlink()
+        for pattern in ("*.commit.tmp", "*/*.commit.tmp"):
+            for tmp in self.directory.glob(pattern):
+                if not _owner_alive(tmp.name[:-len(".commit.tmp")].rsplit(".", 1)[-1]):
+                    tmp.unlink(missing_ok=True)
+        return rolled
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        import ctypes
+        # PROCESS_QUERY_LIMITED_INFORMATION; os.kill() would terminate the process
+        handle = ctypes.windll.kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            return False
+        ctypes.windll.kernel32.CloseHandle(handle)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _owner_alive(name: str) -> bool:
+    """Whether the process named in a "<pid>-<thread>..." temp/intent file name is running."""
+    try:
+        pid = int(name.split("-", 1)[0])
+    except ValueError:
+        return False
+    return _pid_alive(pid)
+
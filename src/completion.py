@@ -0,0 +1,98 @@
+import bisect
+import heapq
+from typing import Dict, List, Set
+
+
+def _grams(text: str) -> Set[str]:
+    """Single characters plus bigrams; enough to narrow any substring query."""
+    grams = set(text)
+    grams.update(text[i:i + 2] for i in range(len(text) - 1))
+    return grams
+
+
+class CompletionIndex:
+    """
+    In-memory index over tag names for the task input autocomplete.
+
+    - Prefix matches come from a sorted list of case-folded names (bisect).
+    - Substring matches (e.g. typing "苹果" for "吃苹果") intersect a
+      character/bigram posting index, then verify the candidates.
+    Results are ranked by usage count. Adding or bumping a tag updates the
+    index in place, so nothing is rebuilt per keystroke.
+    """
+
+    def __init__(self, counts: Dict[str, int] = None):
+        self.counts = {}
+        self._folded = {}     # name -> case-folded name
+        self._sorted = []     # sorted (folded, name) pairs for prefix search
+        self._postings = {}   # gram -> set of names
+        self._ranked = None   # names by count desc, rebuilt lazily
+        if counts:
+            for name, count in counts.items():
+                self._insert(name, count)
+            self._sorted.sort()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _insert(self, name: str, count: int, keep_sorted: bool = False):
+        folded = name.casefold()
+        self.counts[name] = count
+        self._folded[name] = folded
+        if keep_sorted:
+            bisect.insort(self._sorted, (folded, name))
+        else:
+            self._sorted.append((folded, name))
+        for gram in _grams(folded):
+            self._postings.setdefault(gram, set()).add(name)
+
+    def add(self, name: str, amount: int = 1):
+        if name in self.counts:
+            self.counts[name] += amount
+        else:
+            self._insert(name, amount, keep_sorted=True)
+        self._ranked = None
+
+    def clear(self):
+        self.counts.clear()
+        self._folded.clear()
+        self._sorted.clear()
+        self._postings.clear()
+        self._ranked = None
+
+    def _top(self, names, limit: int) -> List[str]:
+        return heapq.nlargest(limit, names, key=lambda n: self.counts[n])
+
+    def search(self, text: str, limit: int = 10) -> List[str]:
+        query = text.strip().casefold()
+        if not query:
+            if self._ranked is None:
+                self._ranked = sorted(self.counts, key=self.counts.get, reverse=True)
+            return self._ranked[:limit]
+
+        # Prefix hits first, they are what the user is most likely typing
+        start = bisect.bisect_left(self._sorted, (query,))
+        prefix_hits = []
+        # Index from the bisect point; slicing would copy the rest of the list
+        for i in range(start, len(self._sorted)):
+            folded, name = self._sorted[i]
+            if not folded.startswith(query):
+                break
+            prefix_hits.append(name)
+        result = self._top(prefix_hits, limit)
+        if len(result) >= limit:
+            return result
+
+        # Then any other names containing the query
+        candidates = None
+        for gram in sorted(_grams(query), key=len, reverse=True):
+            posting = self._postings.get(gram)
+            if not posting:
+                return result
+            candidates = set(posting) if candidates is None else candidates & posting
+            if len(candidates) < 64:
+                break
+        taken = set(result)
+        contains = [n for n in candidates
+                    if n not in taken and query in self._folded[n]]
+        return result + self._top(contains, limit - len(result))
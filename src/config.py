@@ -1,11 +1,12 @@
 import os
+import configparser
 from pathlib import Path
 
 # Project Root
 PROJECT_ROOT = Path(__file__).parent.parent
 
-# Data Directory
-DATA_DIR = PROJECT_ROOT / "data"
+# Data Directory (TASKPULSE_DATA_DIR points tools and stress tests elsewhere)
+DATA_DIR = Path(os.environ.get("TASKPULSE_DATA_DIR") or PROJECT_ROOT / "data")
 if not DATA_DIR.exists():
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -15,7 +16,96 @@ ASSETS_DIR = PROJECT_ROOT / "assets"
 # Tasks File
 TASKS_FILE = DATA_DIR / "tasks.json"
 
+# Settings file (user_config + meta), split out of tasks.json
+CONFIG_FILE = DATA_DIR / "config.json"
+
+# Journal of task mutations (used when storage_mode = journal)
+JOURNAL_FILE = DATA_DIR / "tasks.journal"
+
+# Single-file database (used when storage_mode = sqlite)
+SQLITE_FILE = DATA_DIR / "taskpulse.db"
+
 # App Config
 APP_NAME = "TaskPulse"
 APP_ICON_PATH = ASSETS_DIR / "icon.png"
 APP_ICON_ICO_PATH = ASSETS_DIR / "icon.ico"
+
+# User Settings (config.ini, shared with Start_TaskPulse.bat)
+SETTINGS_FILE = PROJECT_ROOT / "config.ini"
+SETTINGS_SECTION = "Settings"
+
+# No interpolation: python_path usually holds raw Windows paths
+_settings = configparser.ConfigParser(interpolation=None)
+try:
+    _settings.read(SETTINGS_FILE, encoding="utf-8")
+except configparser.Error:
+    pass
+
+def get_setting(key: str, default=None, cast=str):
+    """
+    Read a value from config.ini [Settings], falling back to default.
+    An environment variable TASKPULSE_<KEY> takes precedence.
+    """
+    raw = os.environ.get(f"TASKPULSE_{key.upper()}")
+    if raw is None:
+        try:
+            raw = _settings.get(SETTINGS_SECTION, key, fallback=None)
+        except configparser.Error:
+            return default
+    if raw is None or raw.strip() == "":
+        return default
+    raw = raw.strip()
+    if cast is bool:
+        return raw.lower() in ("1", "true", "yes", "on")
+    try:
+        return cast(raw)
+    except (TypeError, ValueError):
+        return default
+
+# Storage
+# json    - plain JSON files, every mutation rewrites tasks.json (default)
+# journal - mutations are appended to JOURNAL_FILE and folded back periodically
+# sqlite  - everything lives in SQLITE_FILE (migrated from the JSON files once)
+# cached  - JSON files loaded once into memory, written back by a background thread
+STORAGE_MODE = get_setting("storage_mode", "json").lower()
+# Daily pomodoro counters: json (stats.json) or mmap (one binary file per year)
+DAILY_STATS_FORMAT = get_setting("daily_stats_format", "json").lower()
+# Journal size (bytes) that triggers a background compaction into tasks.json
+JOURNAL_COMPACT_BYTES = get_setting("journal_compact_bytes", 256 * 1024, int)
+# cached mode: wait this long after the last change before writing (seconds)...
+WRITE_DEBOUNCE_SECONDS = get_setting("write_debounce_seconds", 0.5, float)
+# ...but never keep unsaved changes longer than this (seconds)
+FLUSH_INTERVAL_SECONDS = get_setting("flush_interval_seconds", 5.0, float)
+
+# Durability of writes: always (fsync every commit), batched (fsync changed
+# files together about once a second) or never (leave it to the OS). Files
+# are replaced atomically in every mode
+FSYNC_POLICY = get_setting("fsync_policy", "batched")
+
+# Archive (off unless archive_after_days > 0): on startup, manual tasks older
+# than this many days and tasks in these statuses are moved into data/archive/
+ARCHIVE_AFTER_DAYS = get_setting("archive_after_days", 0, int)
+ARCHIVE_STATUSES = tuple(s.strip() for s in
+                         get_setting("archive_statuses", "done,cancelled").split(",") if s.strip())
+
+# Multi-machine sync: a folder shared between machines (e.g. a synced cloud
+# drive). Empty = sync disabled
+SYNC_DIR = get_setting("sync_dir", "")
+SYNC_INTERVAL_SECONDS = get_setting("sync_interval_seconds", 60.0, float)
+
+# Backups: incremental snapshots of data/ every N minutes (0 = only on exit
+# and on demand), keeping the newest BACKUP_KEEP_LAST plus one per day for
+# BACKUP_KEEP_DAYS days
+BACKUP_DIR = Path(get_setting("backup_dir", "") or DATA_DIR / "backups")
+BACKUP_INTERVAL_MINUTES = get_setting("backup_interval_minutes", 10.0, float)
+BACKUP_KEEP_LAST = get_setting("backup_keep_last", 24, int)
+BACKUP_KEEP_DAYS = get_setting("backup_keep_days", 30, int)
+
+# Notifications: tray (balloons from the tray icon) / plyer (native toasts) /
+# stub (shown nowhere, for headless runs). At most one per title every
+# NOTIFY_MIN_INTERVAL_SECONDS (the rest are merged into a summary), and a
+# repeat of a message within NOTIFY_DEDUP_SECONDS is dropped
+NOTIFY_BACKEND = get_setting("notify_backend", "tray").lower()
+NOTIFY_MIN_INTERVAL_SECONDS = get_setting("notify_min_interval_seconds", 3.0, float)
+NOTIFY_DEDUP_SECONDS = get_setting("notify_dedup_seconds", 30.0, float)
+NOTIFY_QUEUE_SIZE = get_setting("notify_queue_size", 64, int)
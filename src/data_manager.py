@@ -1,11 +1,51 @@
-import json
 import uuid
 import logging
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from pathlib import Path
 from threading import Lock
-from typing import Dict, List, Optional
-from .config import TASKS_FILE, DATA_DIR
-import os
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from .config import (TASKS_FILE, CONFIG_FILE, DATA_DIR, JOURNAL_FILE, SQLITE_FILE,
+                     STORAGE_MODE, DAILY_STATS_FORMAT, JOURNAL_COMPACT_BYTES,
+                     WRITE_DEBOUNCE_SECONDS, FLUSH_INTERVAL_SECONDS, FSYNC_POLICY,
+                     ARCHIVE_AFTER_DAYS, ARCHIVE_STATUSES,
+                     SYNC_DIR, SYNC_INTERVAL_SECONDS, BACKUP_DIR,
+                     BACKUP_INTERVAL_MINUTES, BACKUP_KEEP_LAST, BACKUP_KEEP_DAYS)
+from .storage import StorageBackend, JsonBackend, JournalBackend
+from .archive import TaskArchive
+from .commit import CommitLog
+from .backup import BackupStore
+from .completion import CompletionIndex
+from .leaderboard import TopK
+from .session_log import SessionLog
+from .sync import SyncAgent
+from .timer_state import TimerState
+from . import rollups
+
+def create_backend(mode: str) -> StorageBackend:
+    """Build the storage backend selected by `storage_mode` in config.ini."""
+    if mode == "sqlite":
+        from .sqlite_store import SqliteBackend
+        # SQLite keeps its own daily table; daily_stats_format only says
+        # where to import the counts from on first start
+        return SqliteBackend(SQLITE_FILE, DATA_DIR, fsync_policy=FSYNC_POLICY,
+                             daily_format=DAILY_STATS_FORMAT)
+    if mode == "cached":
+        from .write_behind import WriteBehindBackend
+        return WriteBehindBackend(DATA_DIR, TASKS_FILE,
+                                  flush_interval=FLUSH_INTERVAL_SECONDS,
+                                  debounce=WRITE_DEBOUNCE_SECONDS,
+                                  config_file=CONFIG_FILE,
+                                  daily_format=DAILY_STATS_FORMAT,
+                                  fsync_policy=FSYNC_POLICY)
+    if mode == "journal":
+        return JournalBackend(DATA_DIR, TASKS_FILE, JOURNAL_FILE,
+                              compact_bytes=JOURNAL_COMPACT_BYTES,
+                              config_file=CONFIG_FILE,
+                              daily_format=DAILY_STATS_FORMAT,
+                              fsync_policy=FSYNC_POLICY)
+    if mode != "json":
+        logging.error(f"Unknown storage_mode '{mode}', falling back to json")
+    return JsonBackend(DATA_DIR, TASKS_FILE, CONFIG_FILE, DAILY_STATS_FORMAT, FSYNC_POLICY)
 
 class DataManager:
     _instance = None
@@ -20,182 +60,411 @@ class DataManager:
         return cls._instance
 
     def _init_data(self):
-        self.data_file = TASKS_FILE
-        self.daily_records_dir = DATA_DIR / "daily_records"
-        self.stats_file = self.daily_records_dir / "stats.json"
-        self.tag_stats_file = self.daily_records_dir / "tag_stats.json"
-        self._ensure_file_exists()
-        self._ensure_stats_exists()
-
-    def _ensure_file_exists(self):
-        if not self.data_file.exists():
-            default_data = {
-                "tasks": [],
-                "user_config": {
-                    "engineer_mode": False,
-                    "auto_start": False
-                },
-                "meta": {
-                    "version": "1.0.0",
-                    "created_at": datetime.now().isoformat()
-                }
-            }
-            self._save_json(default_data)
-
-    def _ensure_stats_exists(self):
-        if not self.daily_records_dir.exists():
-            try:
-                os.makedirs(self.daily_records_dir)
-            except OSError as e:
-                logging.error(f"Error creating directory: {e}")
+        self.storage_mode = STORAGE_MODE
+        self.backend = create_backend(STORAGE_MODE)
+        # Every file DataManager writes besides the backend's own goes
+        # through one CommitLog and its fsync policy (the backend's, if it has one)
+        self.commits = getattr(self.backend, "commits", None)
+        if self.commits is None:
+            self.commits = CommitLog(DATA_DIR, FSYNC_POLICY)
+            self.commits.recover()
+        self.sessions = SessionLog(DATA_DIR / "daily_records" / "sessions", self.commits)
+        self.archive = TaskArchive(DATA_DIR / "archive", self.commits)
+        self.timer_state = TimerState(DATA_DIR / "timers.json", self.commits)
 
-        if not self.stats_file.exists():
-            self._save_stats({})
-            
-        if not self.tag_stats_file.exists():
-            # Pre-fill with some default examples so user can test the UI immediately
-            default_tags = {
-                "专注工作": 5,
-                "阅读学习": 3,
-                "锻炼身体": 2
-            }
-            self._save_tag_stats(default_tags)
-
-    def _load_json(self) -> Dict:
-        try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError) as e:
-            logging.error(f"Error loading tasks: {e}")
-            return {"tasks": [], "user_config": {}}
+        # Analytics are recomputed only after new pomodoros/sessions
+        self._stats_version = 0
+        self._analytics = None   # (stats_version, day, result)
+        # Sessions per start hour over the whole log: read once, then kept
+        # up to date by record_session
+        self._session_hours = None
+        self._analytics_lock = Lock()
 
-    def _save_json(self, data: Dict):
-        try:
-            with open(self.data_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logging.error(f"Error saving tasks: {e}")
+        # Tag autocomplete index and leaderboard, built on first use and
+        # updated incrementally
+        self._tag_lock = Lock()
+        self._completion = None
+        self._leaderboard = None
+        self._tag_version = None
 
-    def _load_stats(self) -> Dict:
-        try:
-            if not self.stats_file.exists():
-                return {}
-            with open(self.stats_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
-
-    def _save_stats(self, data: Dict):
-        try:
-            with open(self.stats_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logging.error(f"Error saving stats: {e}")
+        # Counts and tasks from other machines, merged through a shared folder
+        self._merge_listeners = []
+        self.sync = None
+        if SYNC_DIR:
+            try:
+                self.sync = SyncAgent(Path(SYNC_DIR), DATA_DIR / "sync_state.json",
+                                      self.backend, on_merge=self._on_remote_merge,
+                                      commits=self.commits, archive=self.archive)
+                self.sync.start(SYNC_INTERVAL_SECONDS)
+            except OSError as e:
+                logging.error(f"Error starting sync with {SYNC_DIR}: {e}")
+                self.sync = None
 
-    def _load_tag_stats(self) -> Dict:
-        try:
-            if not self.tag_stats_file.exists():
-                return {}
-            with open(self.tag_stats_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
-            return {}
-
-    def _save_tag_stats(self, data: Dict):
-        try:
-            with open(self.tag_stats_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            logging.error(f"Error saving tag stats: {e}")
+        # Snapshots of data/, taken under the store's read lock when it has one
+        store_lock = getattr(self.backend, "store_lock", None)
+        self.backups = BackupStore(BACKUP_DIR, DATA_DIR, BACKUP_KEEP_LAST, BACKUP_KEEP_DAYS,
+                                   read_lock=store_lock.shared if store_lock else None,
+                                   commits=CommitLog(BACKUP_DIR, FSYNC_POLICY))
+        if BACKUP_INTERVAL_MINUTES > 0:
+            self.backups.start(BACKUP_INTERVAL_MINUTES * 60, before=self.backend.flush)
 
     # --- Public API ---
 
-    def get_all_tasks(self) -> List[Dict]:
-        data = self._load_json()
-        return data.get("tasks", [])
-
-    def add_task(self, title: str, task_type: str, params: Dict = None) -> str:
-        data = self._load_json()
+    def _new_task(self, title: str, task_type: str, params: Dict = None) -> Dict:
         if params is None:
             params = {}
         
-        task_id = str(uuid.uuid4())
-        new_task = {
-            "id": task_id,
+        return {
+            "id": str(uuid.uuid4()),
             "title": title,
             "type": task_type,
             "params": params,
             "created_at": datetime.now().isoformat(),
             "status": "active"
         }
-        
-        data["tasks"].append(new_task)
-        self._save_json(data)
-        return task_id
+
+    def get_all_tasks(self) -> List[Dict]:
+        return self.backend.get_tasks()
+
+    def iter_tasks(self, filter: Optional[Callable[[Dict], bool]] = None,
+                   limit: Optional[int] = None, offset: int = 0) -> Iterator[Dict]:
+        """
+        Yield tasks in stored order without materializing the full list.
+        `filter` is applied before `offset`/`limit`, so pages count matching tasks.
+        """
+        return self.backend.iter_tasks(filter, limit, offset)
+
+    def get_task(self, task_id: str) -> Optional[Dict]:
+        return self.backend.get_task(task_id)
+
+    def add_task(self, title: str, task_type: str, params: Dict = None) -> str:
+        new_task = self._new_task(title, task_type, params)
+        self.backend.add_task(new_task)
+        if self.sync:
+            self.sync.publish_added([new_task])
+        return new_task["id"]
 
     def delete_task(self, task_id: str) -> bool:
-        data = self._load_json()
-        tasks = data.get("tasks", [])
-        original_count = len(tasks)
-        tasks = [t for t in tasks if t["id"] != task_id]
-        
-        if len(tasks) < original_count:
-            data["tasks"] = tasks
-            self._save_json(data)
-            return True
-        return False
+        found = self.backend.delete_task(task_id)
+        if found and self.sync:
+            self.sync.publish_removed([task_id])
+        return found
+
+    def update_task(self, task_id: str, **fields) -> bool:
+        return self.update_tasks({task_id: fields}) > 0
+
+    # --- Batch API: N changes, one persist ---
+
+    def add_tasks(self, items: Iterable[Dict]) -> List[str]:
+        """Add tasks given as {"title", "type", "params"} dicts. Returns the new ids."""
+        new_tasks = [self._new_task(i["title"], i.get("type", "manual"), i.get("params"))
+                     for i in items]
+        self.backend.add_tasks(new_tasks)
+        if self.sync:
+            self.sync.publish_added(new_tasks)
+        return [t["id"] for t in new_tasks]
+
+    def delete_tasks(self, task_ids: Iterable[str]) -> int:
+        """Delete many tasks at once. Returns how many were found."""
+        task_ids = list(task_ids)
+        found = self.backend.delete_tasks(task_ids)
+        if found and self.sync:
+            self.sync.publish_removed(task_ids)
+        return found
+
+    def update_tasks(self, updates: Dict[str, Dict]) -> int:
+        """Merge fields into many tasks, {task_id: {field: value}}. Returns how many were found."""
+        # updated_at decides which version wins when machines sync
+        now = datetime.now().isoformat()
+        changed = self.backend.update_tasks(
+            {t_id: dict(fields, updated_at=now) for t_id, fields in updates.items()})
+        if changed and self.sync:
+            tasks = [self.backend.get_task(t_id) for t_id in updates]
+            self.sync.publish_added([t for t in tasks if t is not None])
+        return changed
+
+    def remove_duplicate_tasks(self, task_type: str = "manual") -> int:
+        """Keep only the oldest task per title of the given type, in one write."""
+        seen = set()
+        duplicates = []
+        for t in self.iter_tasks(filter=lambda t: t.get("type") == task_type):
+            if t["title"] in seen:
+                duplicates.append(t["id"])
+            else:
+                seen.add(t["title"])
+        return self.delete_tasks(duplicates) if duplicates else 0
+
+    # --- Recurring reminders (type "recurring", rule in params, see recurrence.py) ---
+
+    def add_recurring(self, title: str, rule: Dict, task_id: Optional[str] = None,
+                      enabled: bool = True) -> str:
+        """
+        Store a recurring reminder. A fixed `task_id` replaces an existing one
+        in a single upsert; switch such a reminder off with enabled=False
+        rather than deleting it, since a synced delete is never undone.
+        """
+        task = self._new_task(title, "recurring", {"rule": rule, "enabled": enabled,
+                                                   "last_fired": datetime.now().isoformat()})
+        if task_id:
+            task["id"] = task_id
+        self.backend.add_task(task)
+        if self.sync:
+            self.sync.publish_added([task])
+        return task["id"]
+
+    def get_recurring(self) -> List[Dict]:
+        """Enabled recurring reminders."""
+        return list(self.iter_tasks(filter=lambda t: t.get("type") == "recurring"
+                                    and t.get("params", {}).get("enabled", True)))
+
+    def mark_recurring_fired(self, fired: Dict[str, datetime]) -> int:
+        """Remember when reminders last fired, {task_id: time}, in one write (local, not synced)."""
+        updates = {}
+        for task_id, when in fired.items():
+            task = self.get_task(task_id)
+            if task:
+                params = dict(task.get("params", {}), last_fired=when.isoformat())
+                updates[task_id] = {"params": params}
+        return self.backend.update_tasks(updates) if updates else 0
+
+    # --- Archive ---
+
+    def archive_tasks(self, max_age_days: Optional[int] = None,
+                      statuses: Optional[Iterable[str]] = None) -> int:
+        """
+        Move stale tasks out of the hot store into a compressed archive segment:
+        manual tasks created more than `max_age_days` ago, and tasks of any type
+        whose status is in `statuses`. Returns how many were archived.
+        """
+        if max_age_days is None:
+            max_age_days = ARCHIVE_AFTER_DAYS
+        statuses = set(ARCHIVE_STATUSES if statuses is None else statuses)
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat() if max_age_days > 0 else None
+
+        def is_stale(t):
+            if t.get("status") in statuses:
+                return True
+            return cutoff is not None and t.get("type") == "manual" and t.get("created_at", "") < cutoff
+
+        stale = list(self.iter_tasks(filter=is_stale))
+        if not stale:
+            return 0
+        # Segment first: a crash in between leaves a copy in both, never in neither
+        self.archive.add(stale)
+        archived = self.backend.delete_tasks([t["id"] for t in stale])
+        # Other machines move them into their own archive
+        if self.sync:
+            self.sync.publish_archived([t["id"] for t in stale])
+        return archived
+
+    def get_archived_task(self, task_id: str) -> Optional[Dict]:
+        return self.archive.get(task_id)
+
+    def iter_archived_tasks(self, start: Optional[date] = None,
+                            end: Optional[date] = None) -> Iterator[Dict]:
+        """Archived tasks created between start and end (inclusive)."""
+        return self.archive.iter_tasks(start, end)
 
     def get_config(self) -> Dict:
-        data = self._load_json()
-        return data.get("user_config", {})
+        return self.backend.get_config()
 
     def update_config(self, key: str, value):
-        data = self._load_json()
-        if "user_config" not in data:
-            data["user_config"] = {}
-        data["user_config"][key] = value
-        self._save_json(data)
-
-    def record_pomodoro(self, task_name=None, is_test_mode=False):
-        """Record a completed pomodoro for today."""
+        self.backend.update_config(key, value)
+
+    def record_pomodoro(self, task_name=None, is_test_mode=False, when: Optional[datetime] = None):
+        """Record a completed pomodoro for today (or for the day of `when`)."""
         if is_test_mode:
             return 0
             
-        # 1. Date Stats
-        stats = self._load_stats()
-        today = datetime.now().strftime("%Y-%m-%d")
+        today = (when or datetime.now()).strftime("%Y-%m-%d")
         
-        if today in stats:
-            stats[today] += 1
-        else:
-            stats[today] = 1
-            
-        self._save_stats(stats)
-        
-        # 2. Tag Stats
-        if task_name:
-            # Clean task name: Remove icons or status text if any, usually passed clean
-            # but user might input mixed stuff. We assume task_name is what user typed.
-            t_stats = self._load_tag_stats()
-            # Simple normalization
-            name = task_name.strip()
-            if name:
-                t_stats[name] = t_stats.get(name, 0) + 1
-                self._save_tag_stats(t_stats)
+        # Clean task name: Remove icons or status text if any, usually passed clean
+        # but user might input mixed stuff. We assume task_name is what user typed.
+        name = task_name.strip() if task_name else ""
         
-        return stats[today]
+        # Day and tag counters are written together by the backend
+        count = self.backend.record_pomodoro(today, name or None)
+        if self.sync:
+            self.sync.publish_counts(today, name or None)
+        self._stats_version += 1
+        if name:
+            with self._tag_lock:
+                if self._completion is not None:
+                    self._completion.add(name)
+                    self._leaderboard.add(name)
+                    self._tag_version = self.backend.tag_stats_version()
+        return count
+
+    def record_session(self, title: str, task_type: str, start: datetime, end: datetime,
+                       cut_short: bool = False, is_test_mode=False):
+        """Log one finished or cancelled timer to the monthly session log."""
+        if is_test_mode:
+            return
+        # Under the lock, so the running hour totals count the row exactly once
+        with self._analytics_lock:
+            try:
+                self.sessions.append(start, end, task_type, (title or "").strip() or None, cut_short)
+            except OSError as e:
+                logging.error(f"Error writing session log: {e}")
+                return
+            if self._session_hours is not None:
+                from . import analytics
+                analytics.count_session(self._session_hours, task_type, cut_short,
+                                        start.isoformat(timespec="seconds"))
+        self._stats_version += 1
+
+    def save_timers(self, timers: Dict[str, Dict], pomodoro_count: int):
+        """Persist running timers and the pomodoro cycle (see TimerState)."""
+        self.timer_state.save(timers, pomodoro_count)
+
+    def load_timers(self) -> Dict:
+        """Timers and pomodoro count saved by the previous run."""
+        return self.timer_state.load()
+
+    def get_sessions(self, start: date, end: date) -> List[Dict]:
+        """Sessions that ended between start and end (inclusive), oldest first."""
+        return list(self.sessions.iter_sessions(start, end))
+
+    def get_analytics(self) -> Dict:
+        """Streaks, rolling means and distributions, see analytics.compute (cached)."""
+        from . import analytics
+        today = date.today()
+        cached = self._analytics
+        if cached and cached[0] == self._stats_version and cached[1] == today:
+            return cached[2]
+        version = self._stats_version
+        with self._analytics_lock:
+            if self._session_hours is None:
+                self._session_hours = analytics.session_hours(self.sessions.iter_sessions(date.min, today))
+            hours = list(self._session_hours)
+        # Only the tag trend window is read from the log
+        recent = self.sessions.iter_sessions(today - timedelta(days=2 * analytics.TREND_DAYS - 1), today)
+        result = analytics.compute(self.backend.get_daily_stats(), recent, today, hours=hours)
+        self._analytics = (version, today, result)
+        return result
 
     def get_daily_stats(self) -> Dict[str, int]:
-        """Get the history of pomodoro counts per day."""
-        return self._load_stats()
+        """Get the history of pomodoro counts per day (shared object, do not modify)."""
+        return self.backend.get_daily_stats()
+
+    def get_daily_stats_range(self, start: date, end: date) -> Dict[str, int]:
+        """{"YYYY-MM-DD": count} for recorded days between start and end (inclusive)."""
+        return self.backend.get_daily_stats_range(start, end)
+
+    def iter_days(self, start: date, end: date):
+        """(date, count) for every day between start and end (inclusive), zeros included."""
+        return self.backend.iter_days(start, end)
+
+    def get_year_counts(self, year: int):
+        """
+        Pomodoro counts for one year as a 366-slot sequence indexed by
+        day_of_year - 1. With daily_stats_format = mmap this is a zero-copy
+        view of the year file; read it, do not keep it across app exit.
+        """
+        return self.backend.get_year_counts(year)
+
+    # --- Rollups: O(1) totals maintained by record_pomodoro ---
+
+    def get_year_total(self, year: int) -> int:
+        return self.backend.get_rollup(rollups.YEAR, str(year))
+
+    def get_month_total(self, year: int, month: int) -> int:
+        return self.backend.get_rollup(rollups.MONTH, f"{year}-{month:02d}")
+
+    def get_week_total(self, iso_year: int, iso_week: int) -> int:
+        return self.backend.get_rollup(rollups.WEEK, f"{iso_year}-W{iso_week:02d}")
+
+    def get_weekday_totals(self) -> List[int]:
+        """All-time totals per weekday, Monday first."""
+        return [self.backend.get_rollup(rollups.WEEKDAY, str(i)) for i in range(7)]
+
+    def get_years_with_data(self) -> List[int]:
+        return sorted(int(y) for y in self.backend.get_rollup_keys(rollups.YEAR))
 
     def get_tag_stats(self) -> List[tuple]:
-        """Get top tags sorted by count. Returns list of (name, count)."""
-        stats = self._load_tag_stats()
+        """All tags sorted by count, as (name, count). Full sort, meant for export."""
+        stats = self.backend.get_tag_stats()
         # Sort by count desc
         sorted_tags = sorted(stats.items(), key=lambda x: x[1], reverse=True)
         return sorted_tags
 
+    def get_top_tags(self, k: int = 10) -> List[tuple]:
+        """The k most used tags as (name, count), from the incremental leaderboard."""
+        with self._tag_lock:
+            self._sync_tags()
+            return self._leaderboard.top(k)
+
+    def get_tag_total(self) -> int:
+        """Sum of all tag counts."""
+        with self._tag_lock:
+            self._sync_tags()
+            return self._leaderboard.total
+
     def clear_tag_stats(self):
         """Reset tag statistics."""
-        self._save_tag_stats({})
+        self.backend.clear_tag_stats()
+        with self._tag_lock:
+            self._completion = None
+            self._leaderboard = None
+
+    def on_remote_merge(self, listener):
+        """Call listener() (on the sync thread) after changes from other machines were merged."""
+        self._merge_listeners.append(listener)
+
+    def _on_remote_merge(self):
+        # Called from the sync thread after other machines' changes were merged
+        self._stats_version += 1
+        with self._tag_lock:
+            self._completion = None
+            self._leaderboard = None
+        for listener in self._merge_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logging.error(f"Error in merge listener: {e}")
+
+    def _sync_tags(self):
+        # Caller holds self._tag_lock. Rebuild only if tags changed elsewhere.
+        version = self.backend.tag_stats_version()
+        if self._completion is None or version != self._tag_version:
+            stats = self.backend.get_tag_stats()
+            self._completion = CompletionIndex(stats)
+            self._leaderboard = TopK(stats)
+            self._tag_version = version
+
+    def complete_tags(self, text: str = "", limit: int = 10) -> List[str]:
+        """Tag names matching `text` (prefix or substring), most used first."""
+        with self._tag_lock:
+            self._sync_tags()
+            if not text.strip() and limit <= self._leaderboard.capacity:
+                return [name for name, _ in self._leaderboard.top(limit)]
+            return self._completion.search(text, limit)
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        """Read-cache hit/miss counters, e.g. to confirm repaints do no file I/O."""
+        return self.backend.cache_stats()
+
+    def flush(self):
+        """Force pending writes to disk (only buffered backends have any)."""
+        self.backend.flush()
+
+    def backup(self) -> Optional[str]:
+        """Snapshot data/ now. Returns the snapshot name, or None if nothing changed."""
+        self.backend.flush()
+        try:
+            name = self.backups.snapshot()
+            self.backups.prune()
+            return name
+        except OSError as e:
+            logging.error(f"Error taking backup snapshot: {e}")
+            return None
+
+    def close(self):
+        """Stop syncing, flush and release the storage backend, then back up (called on app exit)."""
+        if self.sync:
+            self.sync.stop()
+        self.backups.stop()
+        self.backend.close()
+        self.backup()
+        self.commits.close()
+        self.backups.commits.close()
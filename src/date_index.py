@@ -0,0 +1,46 @@
+import bisect
+from datetime import date
+from typing import Dict, Iterator, Tuple
+
+
+class DateIndex:
+    """
+    Daily counts sorted by ordinal day, for range queries.
+
+    Built once per daily-stats object (backends replace that object on every
+    change), after which a window lookup is two bisects plus the days inside
+    the window, independent of how much history exists.
+    """
+
+    def __init__(self, stats: Dict[str, int]):
+        pairs = []
+        for day_str, count in stats.items():
+            try:
+                pairs.append((date.fromisoformat(day_str).toordinal(), count))
+            except ValueError:
+                continue
+        pairs.sort()
+        self.ordinals = [o for o, _ in pairs]
+        self.counts = [c for _, c in pairs]
+
+    def _bounds(self, start: date, end: date) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self.ordinals, start.toordinal())
+        hi = bisect.bisect_right(self.ordinals, end.toordinal())
+        return lo, hi
+
+    def range(self, start: date, end: date) -> Dict[str, int]:
+        """{"YYYY-MM-DD": count} for recorded days in start..end (inclusive)."""
+        lo, hi = self._bounds(start, end)
+        return {date.fromordinal(self.ordinals[i]).isoformat(): self.counts[i]
+                for i in range(lo, hi)}
+
+    def iter_days(self, start: date, end: date) -> Iterator[Tuple[date, int]]:
+        """Every day in start..end (inclusive) with its count, zeros included."""
+        lo, hi = self._bounds(start, end)
+        i = lo
+        for ordinal in range(start.toordinal(), end.toordinal() + 1):
+            if i < hi and self.ordinals[i] == ordinal:
+                yield date.fromordinal(ordinal), self.counts[i]
+                i += 1
+            else:
+                yield date.fromordinal(ordinal), 0
@@ -0,0 +1,192 @@
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+# One slot per day of year (index = day_of_year - 1), little-endian uint32.
+# The files are synced and backed up, so the byte order is fixed, not native.
+SLOTS = 366
+SLOT = struct.Struct('<I')
+SLOT_SIZE = SLOT.size
+FILE_SIZE = SLOTS * SLOT_SIZE
+# Slots can be viewed in place only where native order matches the file
+_NATIVE_LE = sys.byteorder == "little"
+
+# Read-only view used for years that have no file yet
+_ZEROS = memoryview(bytes(FILE_SIZE)).cast('I')
+
+
+def slot_of(day: date) -> int:
+    return day.toordinal() - date(day.year, 1, 1).toordinal()
+
+
+def _slots_of(data) -> memoryview:
+    """Read-only uint32 slots of little-endian `data`, zero-copy on little-endian hosts."""
+    if _NATIVE_LE:
+        return memoryview(data).cast('I').toreadonly()
+    slots = array('I', bytes(data))
+    slots.byteswap()
+    return memoryview(slots).toreadonly()
+
+
+class YearCounters:
+    """A memory-mapped counts-YYYY.bin file: 366 fixed uint32 slots."""
+
+    def __init__(self, path: Path, year: int):
+        self.path = Path(path)
+        self.year = year
+        self._file = self._open_file()
+        self._mm = mmap.mmap(self._file.fileno(), FILE_SIZE)
+
+    def _open_file(self):
+        # Never truncate or rewrite: another process may have the file mapped
+        # and already be incrementing it. Growing to FILE_SIZE with
+        # truncate() only appends zeros, so concurrent creators agree.
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        f = os.fdopen(fd, 'r+b')
+        size = os.fstat(fd).st_size
+        if size < FILE_SIZE:
+            if size:
+                logging.error(f"{self.path.name} has unexpected size, padding to {FILE_SIZE} bytes")
+            f.truncate(FILE_SIZE)
+        return f
+
+    def increment(self, slot: int, amount: int = 1) -> int:
+        offset = slot * SLOT_SIZE
+        value = SLOT.unpack_from(self._mm, offset)[0] + amount
+        SLOT.pack_into(self._mm, offset, value)
+        return value
+
+    def view(self) -> memoryview:
+        """Read-only view of all 366 slots (zero-copy on little-endian hosts)."""
+        return _slots_of(self._mm)
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        try:
+            self._mm.close()
+        except BufferError:
+            # A view handed out earlier is still alive; the map goes with it
+            pass
+        self._file.close()
+
+
+def read_counts(directory: Path) -> Dict[str, int]:
+    """
+    {"YYYY-MM-DD": count} from the counts-YYYY.bin files in `directory`, read
+    as plain files: nothing is created, padded or mapped.
+    """
+    result = {}
+    for path in Path(directory).glob("counts-*.bin"):
+        try:
+            year = int(path.stem.split("-")[1])
+            data = path.read_bytes()[:FILE_SIZE]
+        except (IndexError, ValueError, OSError) as e:
+            logging.error(f"Skipping {path.name}: {e}")
+            continue
+        data += bytes(FILE_SIZE - len(data))
+        base = date(year, 1, 1).toordinal()
+        for slot, count in enumerate(_slots_of(data)):
+            if count:
+                result[date.fromordinal(base + slot).isoformat()] = count
+    return result
+
+
+class DailyCounterStore:
+    """
+    Daily pomodoro counts as one fixed-size binary file per year.
+
+    Recording a pomodoro is an in-place increment of a single slot instead of
+    rewriting an ever-growing dict, and a year of heatmap data is a zero-copy
+    memoryview over the mapped file.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._years = {}
+        self._lock = threading.Lock()
+
+    def _path(self, year: int) -> Path:
+        return self.directory / f"counts-{year}.bin"
+
+    def _open(self, year: int, create: bool) -> Optional[YearCounters]:
+        counters = self._years.get(year)
+        if counters is None and (create or self._path(year).exists()):
+            counters = YearCounters(self._path(year), year)
+            self._years[year] = counters
+        return counters
+
+    def has_data(self) -> bool:
+        return any(self.directory.glob("counts-*.bin"))
+
+    def years(self):
+        result = []
+        for p in self.directory.glob("counts-*.bin"):
+            try:
+                result.append(int(p.stem.split("-")[1]))
+            except (IndexError, ValueError):
+                pass
+        return sorted(result)
+
+    def increment(self, day: date, amount: int = 1) -> int:
+        with self._lock:
+            return self._open(day.year, create=True).increment(slot_of(day), amount)
+
+    def slot_patch(self, day: date, value: int) -> Tuple[Path, int, bytes]:
+        """(path, offset, bytes) that set `day` to `value`, for CommitLog.patch(). Creates the year file."""
+        with self._lock:
+            self._open(day.year, create=True)
+        return self._path(day.year), slot_of(day) * SLOT_SIZE, SLOT.pack(value)
+
+    def get(self, day: date) -> int:
+        with self._lock:
+            counters = self._open(day.year, create=False)
+            return counters.view()[slot_of(day)] if counters else 0
+
+    def year_view(self, year: int) -> memoryview:
+        with self._lock:
+            counters = self._open(year, create=False)
+            return counters.view() if counters else _ZEROS
+
+    def iter_days(self, start: date, end: date) -> Iterator[Tuple[date, int]]:
+        """(day, count) for every day in start..end, reading only those years' slots."""
+        ordinal = start.toordinal()
+        while ordinal <= end.toordinal():
+            day = date.fromordinal(ordinal)
+            view = self.year_view(day.year)
+            year_end = min(end.toordinal(), date(day.year, 12, 31).toordinal())
+            base = date(day.year, 1, 1).toordinal()
+            for o in range(ordinal, year_end + 1):
+                yield date.fromordinal(o), view[o - base]
+            ordinal = year_end + 1
+
+    def to_dict(self) -> Dict[str, int]:
+        """{"YYYY-MM-DD": count} for every non-zero day, for the dict-based API."""
+        result = {}
+        for year in self.years():
+            view = self.year_view(year)
+            base = date(year, 1, 1).toordinal()
+            for slot, count in enumerate(view):
+                if count:
+                    result[date.fromordinal(base + slot).isoformat()] = count
+        return result
+
+    def flush(self):
+        with self._lock:
+            for counters in self._years.values():
+                counters.flush()
+
+    def close(self):
+        with self._lock:
+            for counters in self._years.values():
+                counters.flush()
+                counters.close()
+            self._years.clear()
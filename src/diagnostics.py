@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+# Histogram bucket upper bounds in milliseconds; the last bucket is open
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+class LatencyHistogram:
+    """
+    Latencies bucketed for display, plus the most recent samples (bounded)
+    for exact percentiles. record() is O(1) and thread-safe.
+    """
+
+    def __init__(self, keep: int = 10000):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.samples = deque(maxlen=keep)
+        self.total = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        ms = max(0.0, seconds * 1000)
+        bucket = next((i for i, bound in enumerate(BUCKETS_MS) if ms <= bound), len(BUCKETS_MS))
+        with self._lock:
+            self.counts[bucket] += 1
+            self.samples.append(ms)
+            self.total += 1
+            self.max = max(self.max, ms)
+
+    def summary(self) -> Dict:
+        """count, p50/p99/max in ms and the bucket counts (labelled "<=N ms")."""
+        with self._lock:
+            samples = sorted(self.samples)
+            counts = list(self.counts)
+            total, worst = self.total, self.max
+
+        def pct(p):
+            return samples[min(len(samples) - 1, int(p * len(samples)))] if samples else 0.0
+
+        labels = [f"<={b} ms" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]} ms"]
+        return {
+            "count": total,
+            "p50_ms": round(pct(0.50), 3),
+            "p99_ms": round(pct(0.99), 3),
+            "max_ms": round(worst, 3),
+            "buckets": dict(zip(labels, counts)),
+        }
+
+
+class TimerDiagnostics:
+    """
+    How late timers fire: "callback" is deadline -> engine callback, "ui" is
+    deadline -> the window handling the expiry. Clock events (suspend/resume,
+    wall-clock steps) are kept alongside, since they explain outliers.
+    """
+
+    def __init__(self):
+        self.metrics = {"callback": LatencyHistogram(), "ui": LatencyHistogram()}
+        self.clock_events = deque(maxlen=200)
+        self.counters = {}   # name -> callable returning a dict of counts
+
+    def record(self, metric: str, seconds: float):
+        self.metrics.setdefault(metric, LatencyHistogram()).record(seconds)
+
+    def add_counters(self, name: str, source):
+        """Include source() (a dict of counts, e.g. drops) in summary() under `name`."""
+        self.counters[name] = source
+
+    def clock_event(self, kind: str, delta: float):
+        self.clock_events.append({"time": datetime.now().isoformat(timespec="seconds"),
+                                  "kind": kind, "delta_s": round(delta, 3)})
+
+    def summary(self) -> Dict:
+        return {
+            "metrics": {name: h.summary() for name, h in self.metrics.items()},
+            "clock_events": list(self.clock_events),
+            "counters": {name: source() for name, source in self.counters.items()},
+        }
+
+    def dump(self, directory: Path) -> Path:
+        """Write the summary to directory/timer_latency-YYYYmmdd-HHMMSS.json."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"timer_latency-{datetime.now():%Y%m%d-%H%M%S}.json"
+        tmp = path.with_suffix(".json.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+        logging.info(f"Timer diagnostics written to {path}")
+        return path
+
+
+def format_histogram(summary: Dict, width: int = 30) -> List[str]:
+    """Text rendering of one LatencyHistogram.summary(), one line per non-empty bucket."""
+    lines = [f"n={summary['count']}  p50={summary['p50_ms']:.1f} ms  "
+             f"p99={summary['p99_ms']:.1f} ms  max={summary['max_ms']:.1f} ms"]
+    peak = max(summary["buckets"].values(), default=0)
+    for label, count in summary["buckets"].items():
+        if count:
+            bar = "█" * max(1, round(count / peak * width))
+            lines.append(f"{label:>10} {bar} {count}")
+    return lines
@@ -0,0 +1,82 @@
+import logging
+import threading
+from collections import deque
+from typing import Callable, List, NamedTuple, Optional
+
+# Event kinds
+TIMER_FIRED = "timer_fired"      # task_id, deadline (monotonic)
+REMINDER = "reminder"            # task_id, title, occurrences, deadline
+CLOCK_CHANGED = "clock_changed"  # kind ("suspend" | "step"), delta (seconds)
+RECORDED = "recorded"            # stats changed outside the GUI (e.g. merged from sync)
+CANCELLED = "cancelled"          # task_id
+NOTIFY = "notify"                # title, message
+
+# The only kinds that may be dropped when the queue is full. Everything else
+# changes state (a finished timer records a pomodoro) and is always queued.
+LOSSY_KINDS = frozenset({NOTIFY})
+
+# How long the GUI lets a burst accumulate before draining (one frame)
+FRAME_MS = 16
+
+
+class Event(NamedTuple):
+    kind: str
+    data: dict
+
+
+class EventBus:
+    """
+    Hand-off from worker threads (timer engine, sync, tray timers) to the
+    GUI thread.
+
+    publish() appends to a bounded queue under a short lock and never
+    blocks on the GUI. The first event into an empty queue calls `wakeup`
+    (e.g. a queued Qt signal); the GUI then waits one frame, so a burst
+    lands together, and takes everything with drain() in one swap. What
+    the GUI does with a batch is up to it; the point is that ten timers
+    finishing together cost one refresh, not ten. The bus only batches
+    delivery: merging notifications is NotificationService's job.
+
+    When the queue is full, NOTIFY events are dropped and counted in
+    `dropped`; every other kind changes state and is queued regardless,
+    so a stalled GUI never loses a finished timer. The queue only fills if
+    the GUI thread stops draining altogether.
+    """
+
+    def __init__(self, wakeup: Optional[Callable[[], None]] = None, maxsize: int = 4096):
+        self.wakeup = wakeup
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._queue = deque()
+        self._overflowing = False
+        self._lock = threading.Lock()
+
+    def publish(self, kind: str, **data) -> bool:
+        with self._lock:
+            if len(self._queue) >= self.maxsize and kind in LOSSY_KINDS:
+                self.dropped += 1
+                # Log once per overflow, not once per event
+                first = not self._overflowing
+                self._overflowing = True
+                was_empty = None
+            else:
+                was_empty = not self._queue
+                self._queue.append(Event(kind, data))
+        if was_empty is None:
+            if first:
+                logging.error(f"Event queue full ({self.maxsize}), dropping notifications until the GUI catches up")
+            return False
+        if was_empty and self.wakeup:
+            self.wakeup()
+        return True
+
+    def drain(self) -> List[Event]:
+        """Everything published so far, oldest first. GUI thread."""
+        with self._lock:
+            events, self._queue = self._queue, deque()
+            self._overflowing = False
+        return list(events)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._queue)
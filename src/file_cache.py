@@ -0,0 +1,73 @@
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict
+
+
+class FileCache:
+    """
+    Read-through cache of parsed files, validated by file identity.
+
+    A cached object is returned as long as the file's (mtime_ns, size, inode)
+    is unchanged, so repeated reads cost one stat() and no parsing. Any write
+    through another process changes the identity and forces a reload.
+    Objects handed out are shared: treat them as read-only.
+    """
+
+    def __init__(self):
+        self._entries = {}  # path -> (signature, obj)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def signature(path: Path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self, path: Path, loader: Callable[[], object]):
+        sig = self.signature(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and sig is not None and entry[0] == sig:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        obj = loader()
+        if sig is not None:
+            with self._lock:
+                self._entries[path] = (sig, obj)
+        return obj
+
+    def peek(self, path: Path):
+        """The cached object if it is still current, else None (never loads)."""
+        sig = self.signature(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and sig is not None and entry[0] == sig:
+                self.hits += 1
+                return entry[1]
+        return None
+
+    def put(self, path: Path, obj):
+        """Remember `obj` as the content just written to `path`."""
+        sig = self.signature(path)
+        with self._lock:
+            if sig is None:
+                self._entries.pop(path, None)
+            else:
+                self._entries[path] = (sig, obj)
+
+    def invalidate(self, path: Path = None):
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
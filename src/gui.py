@@ -9,7 +9,8 @@ from datetime import datetime, timedelta
 from .config import APP_NAME, APP_ICON_PATH
 from .data_manager import DataManager
 from .utils import set_autostart
-from PySide6.QtWidgets import QDialog
+from . import event_bus
+from PySide6.QtWidgets import QDialog, QPlainTextEdit
 
 
 
@@ -52,7 +53,14 @@ class HeatmapFullWidget(QWidget):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
         
-        stats = self.data_manager.get_daily_stats()
+        # The grid spans 53 weeks from the Monday before Jan 1, including the
+        # neighbouring years' edges. Only that window is read from storage.
+        jan1 = datetime(self.year, 1, 1).date()
+        window_start = jan1 - timedelta(days=jan1.weekday())
+        window_end = window_start + timedelta(weeks=53, days=-1)
+        window_counts = [count for _, count in self.data_manager.iter_days(window_start, window_end)]
+        window_base = window_start.toordinal()
+        today_ordinal = datetime.now().toordinal()
         
         # Weekday labels font
         painter.setPen(QColor("#767676"))
@@ -99,8 +107,9 @@ class HeatmapFullWidget(QWidget):
                 
                 for row in range(7):
                     day_date = col_date + timedelta(days=row)
-                    date_str = day_date.strftime("%Y-%m-%d")
-                    count = stats.get(date_str, 0)
+                    day_ordinal = day_date.toordinal()
+                    count = window_counts[day_ordinal - window_base]
+                    date_str = day_date.date().isoformat()
                     
                     if count == 0: c_idx = 0
                     elif count <= 1: c_idx = 1
@@ -126,7 +135,7 @@ class HeatmapFullWidget(QWidget):
                         
                     painter.drawRoundedRect(rect, 2, 2)
                     
-                    if date_str == datetime.now().strftime("%Y-%m-%d"):
+                    if day_ordinal == today_ordinal:
                         painter.setBrush(Qt.NoBrush)
                         painter.setPen(QPen(QColor("#000000"), 1))
                         painter.drawRoundedRect(rect.adjusted(-1,-1,1,1), 2, 2)
@@ -221,10 +230,12 @@ class TagStatsWidget(QWidget):
         
         self.bar_rects = [] # Store rects for hover detection
         self.cached_stats = [] 
+        self.cached_total = 0
 
     def update_data(self):
-        # Update using REAL data
-        self.cached_stats = self.data_manager.get_tag_stats()
+        # Update using REAL data (only the top 10 are ever shown)
+        self.cached_stats = self.data_manager.get_top_tags(10)
+        self.cached_total = self.data_manager.get_tag_total()
         
         self.bar_canvas.update()
         self.update_list()
@@ -244,7 +255,7 @@ class TagStatsWidget(QWidget):
             painter.drawRoundedRect(0, 0, w, h, 6, 6)
             return
             
-        total = sum(c for n, c in self.cached_stats)
+        total = self.cached_total
         if total == 0: return
 
         x_cursor = 0
@@ -373,16 +384,9 @@ class ContributionPanel(QWidget):
         # List years from current down to 2024 or based on data
         # For now static is fine or scan data
         # Let's verify stats data for years? 
-        # Scan stats keys for years
-        stats = self.data_manager.get_daily_stats()
-        years = set()
+        # Years that have data come from the rollups, no scan of daily stats
+        years = set(self.data_manager.get_years_with_data())
         years.add(current_year)
-        if stats:
-            for dStr in stats.keys():
-                try:
-                    y = int(dStr.split('-')[0])
-                    years.add(y)
-                except: pass
         
         sorted_years = sorted(list(years), reverse=True)
         for y in sorted_years:
@@ -400,6 +404,12 @@ class ContributionPanel(QWidget):
         self.heatmap = HeatmapFullWidget(self.data_manager, self.year)
         content_layout.addWidget(self.heatmap)
         
+        # Streaks / averages / best time, from the analytics engine
+        self.analytics_label = QLabel()
+        self.analytics_label.setStyleSheet("font-size: 12px; color: #555;")
+        self.analytics_label.setWordWrap(True)
+        content_layout.addWidget(self.analytics_label)
+        
         layout.addLayout(content_layout)
         
         self.tag_stats = TagStatsWidget(self.data_manager)
@@ -407,6 +417,7 @@ class ContributionPanel(QWidget):
         
         self.tag_stats.update_data() # Initial load
         self.update_stats_label()
+        self.update_analytics_label()
 
     def on_year_changed(self, index):
         year = int(self.year_combo.currentData())
@@ -416,20 +427,40 @@ class ContributionPanel(QWidget):
         self.update_stats_label()
         
     def  update_stats_label(self):
-        stats = self.data_manager.get_daily_stats()
         # Count only for selected year
-        count = 0
-        for d_str, c in stats.items():
-            if d_str.startswith(str(self.year)):
-                count += c
+        count = self.data_manager.get_year_total(self.year)
         self.title_label.setText(f"{self.year} 年累计坚持: {count} 次")
         
+    def update_analytics_label(self):
+        a = self.data_manager.get_analytics()
+        weekdays = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+        lines = [
+            f"🔥 连续专注 {a['current_streak']} 天 (最长 {a['longest_streak']} 天)"
+            f"  |  近7天日均 {a['mean_7']:.1f}  |  近30天日均 {a['mean_30']:.1f}"
+        ]
+        if a["total"]:
+            best_day = max(range(7), key=lambda i: a["weekday"][i])
+            best = f"最常专注: {weekdays[best_day]}"
+            if any(a["hours"]):
+                best_hour = max(range(24), key=lambda h: a["hours"][h])
+                best += f", {best_hour}:00-{best_hour + 1}:00"
+            lines.append(best)
+        if a["tag_trends"]:
+            trends = []
+            for tag, recent, previous in a["tag_trends"][:3]:
+                arrow = "↑" if recent > previous else ("↓" if recent < previous else "→")
+                trends.append(f"{tag} {recent}{arrow}")
+            lines.append("近30天: " + "  ".join(trends))
+        self.analytics_label.setText("\n".join(lines))
+
     def update(self):
         super().update()
         self.heatmap.update()
         if hasattr(self, 'tag_stats'):
             self.tag_stats.update_data()
         self.update_stats_label()
+        if hasattr(self, 'analytics_label'):
+            self.update_analytics_label()
 
 
 
@@ -713,10 +744,68 @@ class RestCompletionDialog(QDialog):
     def get_task_name(self):
         return self.combo.currentText().strip()
 
+
+class TimerDiagnosticsDialog(QDialog):
+    """Lateness histograms of fired timers (deadline -> callback, deadline -> UI) and clock events."""
+
+    def __init__(self, diagnostics, parent=None):
+        super().__init__(parent)
+        self.diagnostics = diagnostics
+        self.setWindowTitle("计时精度诊断")
+        self.resize(460, 420)
+
+        layout = QVBoxLayout(self)
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QFont("Consolas", 9))
+        layout.addWidget(self.text)
+
+        btn_layout = QHBoxLayout()
+        btn_layout.addStretch()
+        btn_refresh = QPushButton("刷新")
+        btn_refresh.clicked.connect(self.refresh)
+        btn_dump = QPushButton("导出到文件")
+        btn_dump.clicked.connect(self.on_dump)
+        btn_layout.addWidget(btn_refresh)
+        btn_layout.addWidget(btn_dump)
+        layout.addLayout(btn_layout)
+        self.refresh()
+
+    def refresh(self):
+        from .diagnostics import format_histogram
+        summary = self.diagnostics.summary()
+        titles = {"callback": "截止时间 → 回调", "ui": "截止时间 → 界面更新", "notify": "通知 入队 → 送达"}
+        lines = []
+        for name, metric in summary["metrics"].items():
+            lines.append(f"[{titles.get(name, name)}]")
+            lines.extend(format_histogram(metric))
+            lines.append("")
+        lines.append("[时钟事件]")
+        events = summary["clock_events"]
+        if not events:
+            lines.append("无")
+        for event in events:
+            kind = "休眠恢复" if event["kind"] == "suspend" else "系统时间跳变"
+            lines.append(f"{event['time']}  {kind}  {event['delta_s']:+.1f} 秒")
+        for name, counts in summary["counters"].items():
+            lines.append("")
+            lines.append(f"[{name}]")
+            lines.append("  ".join(f"{key}={value}" for key, value in counts.items()))
+        self.text.setPlainText("\n".join(lines))
+
+    def on_dump(self):
+        from .config import DATA_DIR
+        try:
+            path = self.diagnostics.dump(DATA_DIR / "diagnostics")
+            QMessageBox.information(self, "已导出", f"诊断数据已写入:\n{path}")
+        except OSError as e:
+            QMessageBox.warning(self, "导出失败", str(e))
+
 class MainWindow(QMainWindow):
     # Custom signals
     request_show = Signal()
     sig_notify = Signal(str, str) # title, message
+    sig_events_pending = Signal() # the event bus went from empty to non-empty (any thread)
 
     def __init__(self, scheduler=None):
         super().__init__()
@@ -848,7 +937,9 @@ class MainWindow(QMainWindow):
         """)
 
         # Tag Auto-complete (Select below input)
-        self.completer = QCompleter(self)
+        # The model holds only the current matches from the completion index
+        self.tag_model = QStringListModel(self)
+        self.completer = QCompleter(self.tag_model, self)
         self.completer.setCaseSensitivity(Qt.CaseInsensitive)
         self.completer.setFilterMode(Qt.MatchContains)
         self.completer.setCompletionMode(QCompleter.PopupCompletion)
@@ -856,6 +947,7 @@ class MainWindow(QMainWindow):
         
         # Install event filter to show popup on click
         self.input_field.installEventFilter(self)
+        self.input_field.textEdited.connect(self.update_tag_suggestions)
         self.input_field.returnPressed.connect(self.on_input_return_pressed)
         
         input_layout.addWidget(self.input_field)
@@ -1056,14 +1148,27 @@ class MainWindow(QMainWindow):
         self.task_list.customContextMenuRequested.connect(self.show_context_menu)
         layout.addWidget(self.task_list)
         
-        # UI Refresh Timer (for countdowns)
+        # UI Refresh Timer (for countdowns). Expiry comes from the timer
+        # engine; this only repaints, and only runs while a timer is running
         self.ui_timer = QTimer(self)
         self.ui_timer.timeout.connect(self.update_task_timers)
-        self.ui_timer.start(1000) # Update every second
         
         # Keep track of active tasks locally for UI countdown 
         # {task_id: {end_time, title, finished: bool, popup_shown: bool, type: 'focus'|'break'}}
         self.active_ui_tasks = {}
+        self._running_ids = set()     # unfinished timers
+        self._mini_task_id = None     # most urgent running timer, shown in mini mode
+        self._pending_popups = []
+        self._showing_popup = False
+        self._fired_reminders = {}    # task_id -> fired_at, saved in one write
+        # Worker threads (timer engine, sync, tray timers) publish here and
+        # never touch widgets; the GUI drains a frame's worth at a time
+        self.events = event_bus.EventBus(wakeup=self.sig_events_pending.emit)
+        self.sig_events_pending.connect(self._schedule_drain)
+        if self.scheduler:
+            self.scheduler.on_clock_change(
+                lambda kind, delta: self.events.publish(event_bus.CLOCK_CHANGED, kind=kind, delta=delta))
+        self.data_manager.on_remote_merge(lambda: self.events.publish(event_bus.RECORDED))
 
     def start_focus_with_input(self, minutes, is_pomodoro=False):
         # If starting a break, we might skip input check?
@@ -1129,17 +1234,9 @@ class MainWindow(QMainWindow):
                 "popup_shown": False,
                 "type": task_type
             }
+            self._arm_timer(task_id, self.active_ui_tasks[task_id])
             self.refresh_task_list(full_reload=True)
-            
-            # We don't remove from UI list in job_function anymore.
-            # job_function only handles System Notification (Tray)
-            def job_function():
-                # Display explicit seconds for very short durations
-                duration_str = f"{minutes} 分钟" if minutes >= 1 else f"{int(minutes*60)} 秒"
-                # Use signal instead of direct Utils call
-                self.sig_notify.emit("任务完成", f"任务 [{title}] 的 {duration_str} 已达成！")
-                
-            self.scheduler.add_countdown_task(task_id, minutes, job_function)
+            self.save_timers()
             
             # Friendly format for start notification too
             duration_str = f"{minutes} 分钟" if minutes >= 1 else f"{int(minutes*60)} 秒"
@@ -1152,6 +1249,123 @@ class MainWindow(QMainWindow):
         else:
             print("Scheduler not initialized!")
 
+    def _arm_timer(self, task_id, info):
+        """Schedule a running timer; its expiry drives both the tray message and the UI."""
+        # Runs on the timer engine thread: only publish from here
+        def job_function():
+            self.events.publish(event_bus.TIMER_FIRED, task_id=task_id,
+                                deadline=self.scheduler.firing_deadline())
+
+        self._running_ids.add(task_id)
+        if self.scheduler:
+            # A countdown, not a wall-clock appointment: armed on the monotonic
+            # clock so a wall-clock step cannot end it early or late
+            from datetime import datetime
+            left = (info["end_time"] - datetime.now()).total_seconds()
+            self.scheduler.add_countdown_task(task_id, max(0, left) / 60, job_function)
+        self._pick_mini_task()
+        if not self.ui_timer.isActive():
+            self.ui_timer.start(1000)
+
+    def _remaining_seconds(self, task_id, info):
+        """Seconds left on a running timer, from the engine's monotonic deadline."""
+        remaining = self.scheduler.remaining(task_id) if self.scheduler else None
+        if remaining is None:
+            from datetime import datetime
+            remaining = (info["end_time"] - datetime.now()).total_seconds()
+        return max(0, int(remaining))
+
+    def _pick_mini_task(self):
+        # Only on start/finish/cancel, so the 1 s tick never scans all timers
+        running = [(self.active_ui_tasks[t_id]["end_time"], t_id) for t_id in self._running_ids
+                   if t_id in self.active_ui_tasks]
+        self._mini_task_id = min(running)[1] if running else None
+
+    def save_timers(self):
+        """Snapshot running timers and the pomodoro cycle, so a restart can pick them up."""
+        self.data_manager.save_timers(self.active_ui_tasks, self.pomodoro_count)
+
+    def restore_timers(self):
+        """
+        Bring back the timers of the previous run. Called once, after the
+        window is shown. Timers still running are re-armed; timers that ran
+        out while the app was closed are marked finished at their end time,
+        and pomodoros among them are recorded (without the popup).
+        """
+        from datetime import datetime
+        state = self.data_manager.load_timers()
+        now = datetime.now()
+        is_test_mode = hasattr(self, 'check_test_mode') and self.check_test_mode.isChecked()
+        self.pomodoro_count = max(self.pomodoro_count, state["pomodoro_count"])
+        caught_up = 0
+
+        for t_id, info in state["timers"].items():
+            if t_id in self.active_ui_tasks:
+                continue
+            if info["finished"]:
+                # Finished rows only matter for today's list
+                if info.get("finished_time", now).date() == now.date():
+                    self.active_ui_tasks[t_id] = info
+                continue
+            if info["end_time"] > now:
+                self.active_ui_tasks[t_id] = info
+                self._arm_timer(t_id, info)
+                continue
+
+            info["finished"] = True
+            info["finished_time"] = info["end_time"]
+            info["popup_shown"] = True
+            self.log_session(info)
+            if info.get("type") == "focus_pomo":
+                self.pomodoro_count += 1
+                self.data_manager.record_pomodoro(task_name=info['title'], is_test_mode=is_test_mode,
+                                                  when=info["end_time"])
+                caught_up += 1
+            if info["finished_time"].date() == now.date():
+                self.active_ui_tasks[t_id] = info
+
+        if state["timers"]:
+            self.refresh_task_list(full_reload=True)
+            self.save_timers()
+        if caught_up:
+            if hasattr(self, 'contrib_panel'):
+                self.contrib_panel.update()
+            self.sig_notify.emit("番茄钟", f"已补记 {caught_up} 个在程序关闭期间完成的番茄钟。")
+
+    def restore_reminders(self):
+        """Arm every stored recurring reminder. Called once, after the window is shown."""
+        for task in self.data_manager.get_recurring():
+            self._arm_reminder(task)
+
+    def _arm_reminder(self, task):
+        if not self.scheduler:
+            return
+        from datetime import datetime
+        params = task.get("params", {})
+        last = params.get("last_fired")
+        last = datetime.fromisoformat(last) if last else None
+        task_id, title = task["id"], task["title"]
+
+        def on_fire(fired_at, occurrences):
+            self.events.publish(event_bus.REMINDER, task_id=task_id, title=title,
+                                occurrences=occurrences, deadline=self.scheduler.firing_deadline())
+
+        self.scheduler.add_recurring_task(f"recurring_{task_id}", params["rule"], on_fire, last)
+
+    def on_reminder(self, task_id, title, occurrences):
+        """A recurring reminder fired; returns its notification message."""
+        from datetime import datetime
+        # Reminders that were all missed fire together at startup: save once
+        if not self._fired_reminders:
+            QTimer.singleShot(1000, self._save_fired_reminders)
+        self._fired_reminders[task_id] = datetime.now()
+        missed = f" (错过的 {occurrences} 次已合并)" if occurrences > 1 else ""
+        return f"{title}{missed}"
+
+    def _save_fired_reminders(self):
+        fired, self._fired_reminders = self._fired_reminders, {}
+        self.data_manager.mark_recurring_fired(fired)
+
     def show_context_menu(self, pos):
         item = self.task_list.itemAt(pos)
         if item:
@@ -1183,117 +1397,240 @@ class MainWindow(QMainWindow):
                 self.scheduler.remove_task(task_id)
             
             # Remove from UI tracking
-            del self.active_ui_tasks[task_id]
+            info = self.active_ui_tasks.pop(task_id)
+            if not info["finished"]:
+                self.log_session(info, cut_short=True)
+            self._running_ids.discard(task_id)
+            self._pick_mini_task()
             
             # Remove from table
             self.task_list.removeRow(row)
+            self.save_timers()
             
             if not force_close:
-                self.sig_notify.emit("任务取消", "已取消该专注任务。")
+                self.events.publish(event_bus.CANCELLED, task_id=task_id)
     
+    def log_session(self, info, cut_short=False):
+        """Append a finished (or cancelled) timer to the session log."""
+        from datetime import datetime
+        is_test_mode = hasattr(self, 'check_test_mode') and self.check_test_mode.isChecked()
+        end = info.get("finished_time") or datetime.now()
+        self.data_manager.record_session(info["title"], info.get("type", "focus_manual"),
+                                         info["start_time"], end, cut_short=cut_short,
+                                         is_test_mode=is_test_mode)
+
     def update_task_timers(self):
-        # Called every second
-        if getattr(self, '_updating_timers', False):
+        """
+        1 s countdown repaint. Timers finish through on_timer_expired, so this
+        touches only the rows in view and the mini widget, however many
+        timers are running.
+        """
+        if not self._running_ids:
+            self.ui_timer.stop()
             return
-        self._updating_timers = True
-        
-        updated = False
-        popup_needed_for = None
-        
+
+        if self.is_mini_mode:
+            info = self.active_ui_tasks.get(self._mini_task_id)
+            if info:
+                rem_sec = self._remaining_seconds(self._mini_task_id, info)
+                mins, secs = divmod(rem_sec, 60)
+                if mins >= 60:
+                    hrs, mins = divmod(mins, 60)
+                    time_str = f"{hrs}:{mins:02d}:{secs:02d}"
+                else:
+                    time_str = f"{mins:02d}:{secs:02d}"
+                self.mini_widget.update_info(info['title'], time_str, info.get("type") == "break")
+            return
+
+        if not self.isVisible() or self.task_list.rowCount() == 0:
+            return
+        first = self.task_list.rowAt(0)
+        last = self.task_list.rowAt(self.task_list.viewport().height() - 1)
+        if first < 0:
+            return
+        if last < 0:
+            last = self.task_list.rowCount() - 1
+        for row in range(first, last + 1):
+            item = self.task_list.item(row, 0)
+            t_id = item.data(Qt.UserRole) if item else None
+            if t_id not in self._running_ids:
+                continue
+            info = self.active_ui_tasks[t_id]
+            mins, secs = divmod(self._remaining_seconds(t_id, info), 60)
+            self.task_list.item(row, 2).setText(f"⏳ {mins:02d}:{secs:02d}")
+
+    def _record_ui_lateness(self, deadline):
+        import time
+        self.scheduler.diagnostics.record("ui", time.monotonic() - deadline)
+
+    @Slot()
+    def _schedule_drain(self):
+        # Wait a frame so a burst (many timers ending together, a backlog
+        # of reminders after resume) is handled as one batch
+        QTimer.singleShot(event_bus.FRAME_MS, self.drain_events)
+
+    def drain_events(self):
+        """
+        Handle everything worker threads published since the last frame:
+        one save and one list refresh however many events arrived.
+        Notifications are passed on one by one; merging and rate limiting
+        them is the notification service's job.
+        """
+        finished, notes = [], []
+        refresh = stats_changed = False
+        for kind, data in self.events.drain():
+            if kind == event_bus.TIMER_FIRED:
+                self._record_ui_lateness(data["deadline"])
+                info = self.on_timer_expired(data["task_id"])
+                if info:
+                    finished.append(info)
+            elif kind == event_bus.REMINDER:
+                self._record_ui_lateness(data["deadline"])
+                message = self.on_reminder(data["task_id"], data["title"], data["occurrences"])
+                notes.append(("提醒", message))
+            elif kind == event_bus.CLOCK_CHANGED:
+                self.on_clock_changed(data["kind"], data["delta"])
+                refresh = True
+            elif kind == event_bus.RECORDED:
+                stats_changed = True
+            elif kind == event_bus.CANCELLED:
+                notes.append(("任务取消", "已取消该专注任务。"))
+            elif kind == event_bus.NOTIFY:
+                notes.append((data["title"], data["message"]))
+
+        if finished or refresh:
+            self._pick_mini_task()
+            self.save_timers()
+            self.refresh_task_list(full_reload=False)
+        if any(info.get("type") == "focus_pomo" for info in finished):
+            stats_changed = True
+        if stats_changed and hasattr(self, 'contrib_panel'):
+            self.contrib_panel.update()
+
+        for info in finished:
+            minutes = info["total_minutes"]
+            # Display explicit seconds for very short durations
+            duration_str = f"{minutes} 分钟" if minutes >= 1 else f"{int(minutes*60)} 秒"
+            self.sig_notify.emit("任务完成", f"任务 [{info['title']}] 的 {duration_str} 已达成！")
+        for title, message in notes:
+            self.sig_notify.emit(title, message)
+
+        if finished:
+            self._show_pending_popups()
+
+    def on_clock_changed(self, kind, delta):
+        """
+        The engine already re-anchored its deadlines. After a wall-clock step,
+        move the displayed (and logged) start/end times of running timers by
+        the same amount, so they agree with the clock again; the countdowns
+        themselves are monotonic and keep their real duration.
+        """
+        from datetime import timedelta
+        if kind == "step":
+            shift = timedelta(seconds=delta)
+            for t_id in self._running_ids:
+                info = self.active_ui_tasks.get(t_id)
+                if info:
+                    info["start_time"] += shift
+                    info["end_time"] += shift
+
+    def show_timer_diagnostics(self):
+        if self.scheduler:
+            TimerDiagnosticsDialog(self.scheduler.diagnostics, self).exec()
+
+    def on_timer_expired(self, task_id):
+        """
+        A timer ran out: mark it finished, log it, record it if it was a
+        pomodoro and queue its popup. Returns its info, or None if it was
+        cancelled or already finished. drain_events() does the refresh, save
+        and notification for the batch; the popup only offers what comes next,
+        so quitting with popups still queued loses nothing.
+        """
+        from datetime import datetime
+        info = self.active_ui_tasks.get(task_id)
+        self._running_ids.discard(task_id)
+        if not info or info["finished"]:
+            return None
+        info["finished"] = True
+        info["finished_time"] = datetime.now()
+        self.log_session(info)
+        if info.get("type") == "focus_pomo":
+            is_test_mode = hasattr(self, 'check_test_mode') and self.check_test_mode.isChecked()
+            self.pomodoro_count += 1
+            info["pomodoro_number"] = self.pomodoro_count
+            self.data_manager.record_pomodoro(task_name=info['title'], is_test_mode=is_test_mode,
+                                              when=info["finished_time"])
+        self._pending_popups.append(info)
+        return info
+
+    def _show_pending_popups(self):
+        # Popups are modal; timers finishing meanwhile queue up behind it
+        if self._showing_popup:
+            return
+        self._showing_popup = True
         try:
-            from datetime import datetime
-            from PySide6.QtWidgets import QMessageBox
-            now = datetime.now()
+            while self._pending_popups:
+                info = self._pending_popups.pop(0)
+                if not info["popup_shown"]:
+                    info["popup_shown"] = True
+                    self.show_finished_popup(info)
+        finally:
+            self._showing_popup = False
+
+    def show_finished_popup(self, info):
+        """Follow-up dialog for a finished timer: break after a pomodoro, next pomodoro after a break."""
+        try:
+            t_type = info.get("type", "focus_manual")
+        
+            if t_type == "focus_pomo":
+                is_test_mode = hasattr(self, 'check_test_mode') and self.check_test_mode.isChecked()
+                # Already recorded when the timer ran out (on_timer_expired)
+                number = info.get("pomodoro_number", self.pomodoro_count)
             
-            for t_id, info in self.active_ui_tasks.items():
-                if info["finished"]:
-                    continue
-                    
-                remaining = (info["end_time"] - now).total_seconds()
-                
-                if remaining <= 0:
-                    info["finished"] = True
-                    info["finished_time"] = now
-                    updated = True
-                    
-                    if not info["popup_shown"]:
-                        popup_needed_for = info
-                        info["popup_shown"] = True
+                if is_test_mode:
+                    breaks_needed = 5/60
+                    break_name = "快速休息(测试)"
+                    display_time = "5 秒"
                 else:
-                    updated = True
+                    breaks_needed = 15 if (number % 4 == 0) else 5
+                    break_name = "长休息" if breaks_needed == 15 else "短休息"
+                    display_time = f"{breaks_needed} 分钟"
+            
+                msg = QMessageBox(self)
+                msg.setWindowTitle("番茄钟完成!")
+                msg.setText(f"恭喜！第 {number} 个番茄钟已完成。\n\n接下来建议进行 {display_time} {break_name}。\n是否立即开始休息？")
+                msg.setIcon(QMessageBox.Information)
+                yes_btn = msg.addButton("开始休息", QMessageBox.YesRole)
+                no_btn = msg.addButton("稍后", QMessageBox.NoRole)
+                msg.exec()
+            
+                if msg.clickedButton() == yes_btn:
+                    task_disp_time = f"{int(breaks_needed*60)}秒" if is_test_mode else f"{breaks_needed}min"
+                    self.start_focus_timer(breaks_needed, f"{break_name} ({task_disp_time})", task_type="break")
                 
-            if updated:
-                self.refresh_task_list(full_reload=False)
-                QApplication.processEvents()
-        except Exception as e:
-            print(f"Error in timer update: {e}")
-            self._updating_timers = False
-            return
+            elif t_type == "break":
+                top_tags = self.data_manager.complete_tags("", 20)
+            
+                is_test_mode = hasattr(self, 'check_test_mode') and self.check_test_mode.isChecked()
 
-        # Handle Popup outside the first try block but protected by _updating_timers
-        if popup_needed_for:
-            try:
-                info = popup_needed_for
-                t_type = info.get("type", "focus_manual")
+                dlg = RestCompletionDialog(self, history_items=top_tags)
+                if dlg.exec():
+                    task_name = dlg.get_task_name()
+                    if not task_name:
+                         task_name = "下一轮专注"
                 
-                if t_type == "focus_pomo":
-                    is_test_mode = hasattr(self, 'check_test_mode') and self.check_test_mode.isChecked()
-                    
-                    self.pomodoro_count += 1
-                    self.data_manager.record_pomodoro(task_name=info['title'], is_test_mode=is_test_mode)
-                    
-                    if hasattr(self, 'contrib_panel'):
-                        self.contrib_panel.update()
-                    # Check for Test Mode removed from here as it is done above
-                    
-                    if is_test_mode:
-                        breaks_needed = 5/60
-                        break_name = "快速休息(测试)"
-                        display_time = "5 秒"
-                    else:
-                        breaks_needed = 15 if (self.pomodoro_count % 4 == 0) else 5
-                        break_name = "长休息" if breaks_needed == 15 else "短休息"
-                        display_time = f"{breaks_needed} 分钟"
-                    
-                    msg = QMessageBox(self)
-                    msg.setWindowTitle("番茄钟完成!")
-                    msg.setText(f"恭喜！第 {self.pomodoro_count} 个番茄钟已完成。\n\n接下来建议进行 {display_time} {break_name}。\n是否立即开始休息？")
-                    msg.setIcon(QMessageBox.Information)
-                    yes_btn = msg.addButton("开始休息", QMessageBox.YesRole)
-                    no_btn = msg.addButton("稍后", QMessageBox.NoRole)
-                    msg.exec()
-                    
-                    if msg.clickedButton() == yes_btn:
-                        task_disp_time = f"{int(breaks_needed*60)}秒" if is_test_mode else f"{breaks_needed}min"
-                        self.start_focus_timer(breaks_needed, f"{break_name} ({task_disp_time})", task_type="break")
-                        
-                elif t_type == "break":
-                    top_tags = [t[0] for t in self.data_manager.get_tag_stats()]
-                    
-                    is_test_mode = hasattr(self, 'check_test_mode') and self.check_test_mode.isChecked()
-
-                    dlg = RestCompletionDialog(self, history_items=top_tags)
-                    if dlg.exec():
-                        task_name = dlg.get_task_name()
-                        if not task_name:
-                             task_name = "下一轮专注"
-                        
-                        next_duration = 5/60 if is_test_mode else 25
-                        self.start_focus_timer(next_duration, task_name, task_type="focus_pomo")
-                        
-                else:
-                    msg = QMessageBox(self)
-                    msg.setWindowTitle("专注完成!")
-                    msg.setText(f"恭喜！任务 [{info['title']}] 已完成！\n请休息一下吧。")
-                    msg.setIcon(QMessageBox.Information)
-                    msg.setStandardButtons(QMessageBox.Ok)
-                    msg.exec()
-            except Exception as e:
-                print(f"Error in popup: {e}")
-            finally:
-                self._updating_timers = False
-        else:
-            self._updating_timers = False
+                    next_duration = 5/60 if is_test_mode else 25
+                    self.start_focus_timer(next_duration, task_name, task_type="focus_pomo")
+                
+            else:
+                msg = QMessageBox(self)
+                msg.setWindowTitle("专注完成!")
+                msg.setText(f"恭喜！任务 [{info['title']}] 已完成！\n请休息一下吧。")
+                msg.setIcon(QMessageBox.Information)
+                msg.setStandardButtons(QMessageBox.Ok)
+                msg.exec()
+        except Exception as e:
+            print(f"Error in popup: {e}")
 
     def toggle_mini_mode(self):
         """Switch between Normal and Mini Mode."""
@@ -1371,7 +1708,7 @@ class MainWindow(QMainWindow):
             
             for t_id, info in self.active_ui_tasks.items():
                 if not info["finished"]:
-                    rem = (info["end_time"] - now).total_seconds()
+                    rem = self._remaining_seconds(t_id, info)
                     if rem < min_remaining:
                         min_remaining = rem
                         active_task = info
@@ -1433,8 +1770,7 @@ class MainWindow(QMainWindow):
                 countdown_text = "完成"
                 finished = True
             else:
-                remaining_seconds = int((info["end_time"] - now).total_seconds())
-                if remaining_seconds < 0: remaining_seconds = 0
+                remaining_seconds = self._remaining_seconds(t_id, info)
                 
                 mins, secs = divmod(remaining_seconds, 60)
                 time_str = f"{mins:02d}:{secs:02d}"
@@ -1560,11 +1896,15 @@ class MainWindow(QMainWindow):
         self.btn_clear_tags.setStyleSheet("color: red; margin-top: 10px;")
         self.btn_clear_tags.clicked.connect(self.on_clear_tags_clicked)
         
+        self.btn_diagnostics = QPushButton("⏱ 计时精度诊断")
+        self.btn_diagnostics.clicked.connect(self.show_timer_diagnostics)
+        
         layout.addWidget(self.check_autostart)
         layout.addWidget(self.check_engineer)
         layout.addWidget(self.check_test_mode)
         layout.addWidget(self.check_deepseek)
         layout.addWidget(self.btn_clear_tags)
+        layout.addWidget(self.btn_diagnostics)
         layout.addStretch()
 
     def load_settings(self):
@@ -1587,6 +1927,21 @@ class MainWindow(QMainWindow):
 
     def on_engineer_mode_toggled(self, checked):
         self.data_manager.update_config("engineer_mode", checked)
+
+        # Weekday evening practice reminder, kept as a recurring task
+        from . import recurrence
+        reminder_id = "engineer_reminder"
+        existing = self.data_manager.get_task(reminder_id)
+        enabled = bool(existing) and existing.get("params", {}).get("enabled", True)
+        if checked != enabled:
+            # Toggled with an upsert, never deleted: a synced delete would stick
+            self.data_manager.add_recurring("Python 刷题时间到！来一道题吧。",
+                                            recurrence.weekly("20:00", range(5)),
+                                            task_id=reminder_id, enabled=checked)
+            if checked:
+                self._arm_reminder(self.data_manager.get_task(reminder_id))
+            elif self.scheduler:
+                self.scheduler.remove_task(f"recurring_{reminder_id}")
         
         if checked:
              self.sig_notify.emit("工程师模式已开启", "您将收到 Python 练习提醒。")
@@ -1660,14 +2015,17 @@ class MainWindow(QMainWindow):
         """Handle return key in input field - Start 25m Pomodoro by default."""
         self.start_focus_with_input(25, is_pomodoro=True)
 
+    def update_tag_suggestions(self, text):
+        """Refill the completer with the best matches for the current input."""
+        self.tag_model.setStringList(self.data_manager.complete_tags(text, 20))
+
     def eventFilter(self, obj, event):
         if obj == self.input_field:
             if event.type() == QEvent.FocusIn or (event.type() == QEvent.MouseButtonPress):
                 # Update completer model
-                top_tags = [t[0] for t in self.data_manager.get_tag_stats()]
+                top_tags = self.data_manager.complete_tags(self.input_field.text(), 20)
                 if top_tags:
-                    model = QStringListModel(top_tags)
-                    self.completer.setModel(model)
+                    self.tag_model.setStringList(top_tags)
                     
                     # Force popup show even if text is empty
                     if not self.input_field.text():
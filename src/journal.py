@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import threading
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, ContextManager, Dict, Iterable, List, Optional
+
+from .commit import CommitLog
+from .task_index import TaskIndex
+
+
+class TaskJournal:
+    """
+    Append-only journal on top of the tasks.json snapshot.
+
+    Mutations are appended as one compact JSON line each, so add/delete/update
+    cost the same no matter how many tasks are stored. The current state is the
+    snapshot plus every journal record replayed in order; it is kept in memory
+    and only the new tail of the journal is read when another process appended.
+    Once the journal grows past `compact_bytes`, a background thread folds it
+    back into the snapshot.
+    """
+
+    def __init__(self, snapshot_file: Path, journal_file: Path,
+                 compact_bytes: int = 256 * 1024,
+                 default_factory: Optional[Callable[[], Dict]] = None,
+                 file_lock: Optional[Callable[[], ContextManager]] = None,
+                 commits: Optional[CommitLog] = None):
+        self.snapshot_file = Path(snapshot_file)
+        self.journal_file = Path(journal_file)
+        self.compact_bytes = compact_bytes
+        self.default_factory = default_factory or (lambda: {"tasks": []})
+        # Cross-process writer lock held while the files are swapped
+        self.file_lock = file_lock or nullcontext
+        # Atomic file swaps and the fsync policy for appends
+        self.commits = commits or CommitLog(self.snapshot_file.parent)
+
+        self._lock = threading.RLock()
+        self._state = None            # {"tasks": TaskIndex, "doc": {...other keys}}
+        self._offset = 0              # bytes of journal already replayed
+        self._snapshot_sig = None     # (mtime_ns, size) of the snapshot we loaded
+        self._compacting = False
+
+    # --- State ---
+
+    def _file_sig(self, path: Path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return None
+
+    def _load_snapshot(self) -> Dict:
+        try:
+            with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return self.default_factory()
+        except json.JSONDecodeError as e:
+            logging.error(f"Error loading task snapshot: {e}")
+            return self.default_factory()
+
+    def _reload(self):
+        doc = self._load_snapshot()
+        tasks = TaskIndex(doc.pop("tasks", []))
+        self._state = {"tasks": tasks, "doc": doc}
+        self._snapshot_sig = self._file_sig(self.snapshot_file)
+        self._offset = 0
+        self._replay_tail()
+
+    def _replay_tail(self):
+        try:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(self._offset)
+                tail = f.read()
+        except FileNotFoundError:
+            return
+        # Only consume complete lines; a concurrent writer may be mid-append
+        end = tail.rfind(b"\n")
+        if end < 0:
+            return
+        for line in tail[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                self._apply(json.loads(line))
+            except (json.JSONDecodeError, KeyError) as e:
+                logging.error(f"Skipping bad journal record: {e}")
+        self._offset += end + 1
+
+    def _sync(self):
+        """Bring the in-memory state up to date with the files on disk."""
+        if self._state is None or self._file_sig(self.snapshot_file) != self._snapshot_sig:
+            self._reload()
+            return
+        size = os.path.getsize(self.journal_file) if self.journal_file.exists() else 0
+        if size < self._offset:
+            # Journal was compacted by someone else, snapshot changed with it
+            self._reload()
+        elif size > self._offset:
+            self._replay_tail()
+
+    def _apply(self, record: Dict):
+        # Single-task records ("task"/"id") predate the batch forms ("tasks"/"ids")
+        op = record["op"]
+        tasks = self._state["tasks"]
+        if op == "add":
+            tasks.add_many(record["tasks"] if "tasks" in record else [record["task"]])
+        elif op == "del":
+            tasks.delete_many(record["ids"] if "ids" in record else [record["id"]])
+        elif op == "upd":
+            tasks.update_many(record["changes"])
+        elif op == "cfg":
+            # Settings records from before config.json; see legacy_config()
+            self._state["doc"].setdefault("user_config", {})[record["key"]] = record["value"]
+        else:
+            logging.error(f"Unknown journal op: {op}")
+
+    # --- Mutations ---
+
+    def _append(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+        with open(self.journal_file, 'ab') as f:
+            f.write(line.encode('utf-8'))
+            self.commits.appended(self.journal_file, f)
+            size = f.tell()
+        self._offset = size
+        self._apply(record)
+        if size >= self.compact_bytes:
+            self._schedule_compaction()
+
+    def add_tasks(self, tasks: List[Dict]):
+        if not tasks:
+            return
+        with self._lock:
+            self._sync()
+            self._append({"op": "add", "tasks": tasks})
+
+    def delete_tasks(self, task_ids: Iterable[str]) -> int:
+        with self._lock:
+            self._sync()
+            index = self._state["tasks"]
+            ids = [t_id for t_id in dict.fromkeys(task_ids) if t_id in index]
+            if ids:
+                self._append({"op": "del", "ids": ids})
+            return len(ids)
+
+    def update_tasks(self, updates: Dict[str, Dict]) -> int:
+        with self._lock:
+            self._sync()
+            index = self._state["tasks"]
+            changes = {t_id: fields for t_id, fields in updates.items() if t_id in index}
+            if changes:
+                self._append({"op": "upd", "changes": changes})
+            return len(changes)
+
+    # --- Reads ---
+
+    def get_tasks(self) -> List[Dict]:
+        with self._lock:
+            self._sync()
+            return self._state["tasks"].tasks()
+
+    def get_task(self, task_id: str) -> Optional[Dict]:
+        with self._lock:
+            self._sync()
+            return self._state["tasks"].get(task_id)
+
+    def legacy_config(self) -> Dict:
+        """Settings still stored in the snapshot or journal from older versions."""
+        with self._lock:
+            self._sync()
+            return dict(self._state["doc"].get("user_config", {}))
+
+    # --- Compaction ---
+
+    def _schedule_compaction(self):
+        if self._compacting:
+            return
+        self._compacting = True
+        threading.Thread(target=self.compact, name="TaskJournalCompactor", daemon=True).start()
+
+    def compact(self):
+        """Fold the journal into the snapshot and drop the replayed records."""
+        try:
+            with self._lock:
+                self._sync()
+                # Settings live in config.json now, never fold them back in
+                doc = dict(self._state["doc"])
+                doc.pop("user_config", None)
+                doc["tasks"] = self._state["tasks"].tasks()
+                folded = self._offset
+
+            # The expensive part (serializing everything) runs without blocking writers
+            data = json.dumps(doc, ensure_ascii=False, indent=2).encode('utf-8')
+
+            with self.file_lock(), self._lock:
+                journal_size = os.path.getsize(self.journal_file) if self.journal_file.exists() else 0
+                if self._file_sig(self.snapshot_file) != self._snapshot_sig or journal_size < folded:
+                    # Another process compacted in between: `folded` no longer
+                    # points into the journal we read, so start over from disk
+                    self._reload()
+                    logging.info("Task journal was compacted elsewhere, skipped")
+                    return
+                # Keep whatever was appended while the snapshot was written
+                self._replay_tail()
+                try:
+                    with open(self.journal_file, 'rb') as f:
+                        f.seek(folded)
+                        rest = f.read()
+                except FileNotFoundError:
+                    rest = b""
+                # Snapshot and shortened journal are swapped in together: a
+                # crash in between would otherwise replay folded records twice
+                with self.commits.transaction():
+                    self.commits.write(self.snapshot_file, data)
+                    self.commits.write(self.journal_file, rest)
+                self._snapshot_sig = self._file_sig(self.snapshot_file)
+                self._offset -= folded
+                self._state["doc"].pop("user_config", None)
+            logging.info(f"Compacted task journal ({folded} bytes folded)")
+        except Exception as e:
+            logging.error(f"Error compacting task journal: {e}")
+        finally:
+            self._compacting = False
@@ -0,0 +1,96 @@
+import json
+import re
+from pathlib import Path
+from typing import Iterator
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_DELIMITER = re.compile(r"[\s,\]}]")
+
+
+class _Reader:
+    """Sliding text buffer over a file, refilled in fixed-size chunks."""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what was already consumed so the buffer stays about one item long
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at end of file)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting '{char}'", self.buf, self.pos)
+        self.pos += 1
+
+    def value(self):
+        """Decode one JSON value, reading more of the file until it is complete."""
+        if self.peek() not in '{["':
+            # A bare number cut at the buffer edge would decode short, so make
+            # sure its delimiter is buffered first
+            while not _DELIMITER.search(self.buf, self.pos) and self.fill():
+                pass
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+                self.pos = end
+                return obj
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+
+
+def iter_array(path: Path, key: str, chunk_size: int = 64 * 1024) -> Iterator:
+    """
+    Yield the items of the array stored under top-level `key` one at a time.
+
+    Only one item (plus one chunk) is held in memory, so the first items of a
+    very large file are available without parsing the rest. Other top-level
+    values are decoded and discarded. Yields nothing if the key is missing.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _Reader(f, chunk_size)
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+        while True:
+            name = reader.value()
+            reader.expect(':')
+            if name != key:
+                reader.value()
+            else:
+                reader.expect('[')
+                if reader.peek() == ']':
+                    return
+                while True:
+                    yield reader.value()
+                    sep = reader.peek()
+                    if sep == ']':
+                        return
+                    reader.expect(',')
+            sep = reader.peek()
+            if sep == '}':
+                return
+            reader.expect(',')
@@ -0,0 +1,89 @@
+from typing import Dict, List, Tuple
+
+
+class TopK:
+    """
+    Incrementally maintained top-K of tag counts.
+
+    The K best tags live in an indexed min-heap (heap array plus name -> slot),
+    so bumping a tag costs O(log K): either it is already in the heap and is
+    sifted down, or it beats the current minimum and replaces it. Counts only
+    grow, so a tag outside the heap can never overtake one inside without
+    passing through this check. Only asking for more than K entries falls back
+    to a full sort.
+    """
+
+    def __init__(self, counts: Dict[str, int] = None, capacity: int = 32):
+        self.capacity = capacity
+        self.counts = {}
+        self.total = 0
+        self._heap = []   # names, heap-ordered by count (smallest first)
+        self._pos = {}    # name -> index in _heap
+        for name, count in (counts or {}).items():
+            self.add(name, count)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _less(self, a: str, b: str) -> bool:
+        # Ties broken by name so the ranking is stable between calls
+        ca, cb = self.counts[a], self.counts[b]
+        return ca < cb or (ca == cb and a > b)
+
+    def _swap(self, i: int, j: int):
+        heap = self._heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self._pos[heap[i]] = i
+        self._pos[heap[j]] = j
+
+    def _sift_up(self, i: int):
+        while i > 0:
+            parent = (i - 1) // 2
+            if not self._less(self._heap[i], self._heap[parent]):
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i: int):
+        heap = self._heap
+        size = len(heap)
+        while True:
+            smallest = i
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < size and self._less(heap[child], heap[smallest]):
+                    smallest = child
+            if smallest == i:
+                return
+            self._swap(i, smallest)
+            i = smallest
+
+    def add(self, name: str, amount: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+        self.total += amount
+
+        if name in self._pos:
+            # Its count grew, so it can only move away from the root
+            self._sift_down(self._pos[name])
+        elif len(self._heap) < self.capacity:
+            self._heap.append(name)
+            self._pos[name] = len(self._heap) - 1
+            self._sift_up(len(self._heap) - 1)
+        elif self._less(self._heap[0], name):
+            del self._pos[self._heap[0]]
+            self._heap[0] = name
+            self._pos[name] = 0
+            self._sift_down(0)
+
+    def clear(self):
+        self.counts.clear()
+        self.total = 0
+        self._heap.clear()
+        self._pos.clear()
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        """The k most used tags as (name, count), highest first."""
+        if k > self.capacity:
+            names = sorted(self.counts, key=lambda n: (-self.counts[n], n))
+        else:
+            names = sorted(self._heap, key=lambda n: (-self.counts[n], n))
+        return [(n, self.counts[n]) for n in names[:k]]
@@ -0,0 +1,151 @@
+import logging
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# The lock file holds the store version as one little-endian uint64
+_VERSION = struct.Struct("<Q")
+# Windows byte-range locks are mandatory, so lock a byte past the version
+_WIN_LOCK_OFFSET = 64
+
+
+def _lock_fd(fd: int, exclusive: bool):
+    if fcntl:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return
+    # msvcrt has no shared mode: readers take the exclusive lock as well
+    while True:
+        os.lseek(fd, _WIN_LOCK_OFFSET, os.SEEK_SET)
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return
+        except OSError:
+            time.sleep(0.002)
+
+
+def _unlock_fd(fd: int):
+    if fcntl:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, _WIN_LOCK_OFFSET, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class StoreLock:
+    """
+    Advisory lock over a data directory, plus a version stamp.
+
+    shared() admits any number of readers, exclusive() a single writer; both
+    work across threads and processes because every acquisition opens its own
+    file description. A thread that already holds the lock may re-enter it
+    (but cannot upgrade shared to exclusive). Every committed write bumps the
+    version, so a writer that prepared its change from an older version can
+    tell and retry instead of overwriting someone else's update, and sync()
+    calls `on_change` when a version we did not write shows up, so in-memory
+    caches are dropped even if a file's mtime did not visibly change.
+    """
+
+    def __init__(self, path: Path, on_change: Optional[Callable[[], None]] = None):
+        self.path = Path(path)
+        self.on_change = on_change
+        self._seen = None
+        self._local = threading.local()
+        if not self.path.exists():
+            try:
+                with open(self.path, 'xb') as f:
+                    f.write(_VERSION.pack(0))
+            except FileExistsError:
+                pass
+        self._seen = self.version()
+
+    @contextmanager
+    def _hold(self, exclusive: bool):
+        mode = getattr(self._local, "mode", None)
+        if mode is not None:
+            if exclusive and mode == "shared":
+                raise RuntimeError("Cannot upgrade a shared store lock to exclusive")
+            yield
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0))
+        try:
+            _lock_fd(fd, exclusive)
+            self._local.mode = "exclusive" if exclusive else "shared"
+            self._local.fd = fd
+            try:
+                yield
+            finally:
+                self._local.mode = None
+                self._local.fd = None
+                _unlock_fd(fd)
+        finally:
+            os.close(fd)
+
+    def shared(self):
+        return self._hold(exclusive=False)
+
+    def exclusive(self):
+        return self._hold(exclusive=True)
+
+    def version(self) -> int:
+        """Current version stamp. Call while holding the lock for a stable value."""
+        with self.shared():
+            fd = self._local.fd
+            os.lseek(fd, 0, os.SEEK_SET)
+            data = os.read(fd, _VERSION.size)
+        return _VERSION.unpack(data)[0] if len(data) == _VERSION.size else 0
+
+    def bump(self) -> int:
+        """Advance the version after a write. Caller holds the exclusive lock."""
+        if getattr(self._local, "mode", None) != "exclusive":
+            raise RuntimeError("bump() requires the exclusive store lock")
+        version = self.version() + 1
+        fd = self._local.fd
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.write(fd, _VERSION.pack(version))
+        self._seen = version
+        return version
+
+    def sync(self) -> int:
+        """Read the version, calling on_change if someone else wrote since we last looked."""
+        version = self.version()
+        if version != self._seen:
+            if self.on_change:
+                self.on_change()
+            self._seen = version
+        return version
+
+    def optimistic(self, prepare: Callable[[], Callable], retries: int = 20):
+        """
+        Run a read-modify-write without holding the writer lock while reading.
+
+        prepare() runs under the shared lock and returns a commit callable.
+        commit() runs under the exclusive lock only if nobody wrote in the
+        meantime; otherwise prepare() is called again on the new state.
+        Returns commit()'s result.
+        """
+        for _ in range(retries):
+            with self.shared():
+                version = self.sync()
+                commit = prepare()
+            with self.exclusive():
+                if self.version() == version:
+                    result = commit()
+                    self.bump()
+                    return result
+        # Heavy contention: stop being optimistic and do it all under the lock
+        logging.info(f"Store lock contended, writing under exclusive lock ({self.path.name})")
+        with self.exclusive():
+            self.sync()
+            result = prepare()()
+            self.bump()
+            return result
@@ -1,10 +1,16 @@
 import sys
 import os
+import threading
+from PySide6.QtCore import QTimer
 from PySide6.QtWidgets import QApplication, QSystemTrayIcon
 from .gui import MainWindow
 from .tray import SystemTray
 from .scheduler import TaskScheduler
 from .utils import show_notification
+from .data_manager import DataManager
+from .notifications import NotificationService, create_backend
+from .config import (NOTIFY_BACKEND, NOTIFY_MIN_INTERVAL_SECONDS, NOTIFY_DEDUP_SECONDS,
+                     NOTIFY_QUEUE_SIZE, ARCHIVE_AFTER_DAYS)
 
 def main():
     # Fix for high DPI scaling
@@ -39,6 +45,9 @@ def main():
     # Define exit callback
     def exit_app():
         scheduler.shutdown()
+        notifications.close()
+        # Write out anything the storage layer is still holding in memory
+        DataManager().close()
         app.quit()
     
     # Initialize Tray
@@ -46,15 +55,27 @@ def main():
     tray = SystemTray(window, exit_app, scheduler)
     tray.setup()
     
-    # Connect Window Notifications to Tray
-    window.sig_notify.connect(lambda title, msg: tray.showMessage(title, msg, QSystemTrayIcon.Information, 3000))
+    # Window notifications go through a rate-limited worker, not straight to the tray
+    notifications = NotificationService(create_backend(NOTIFY_BACKEND, tray), NOTIFY_QUEUE_SIZE,
+                                        NOTIFY_MIN_INTERVAL_SECONDS, NOTIFY_DEDUP_SECONDS)
+    window.sig_notify.connect(notifications.notify)
+    scheduler.diagnostics.metrics["notify"] = notifications.latency
+    scheduler.diagnostics.add_counters("notify", notifications.stats)
     
     # Welcome Notification
-    tray.showMessage("TaskPulse", "TaskPulse 已在后台运行。", QSystemTrayIcon.Information, 3000)
+    notifications.notify("TaskPulse", "TaskPulse 已在后台运行。")
     
     # Show window on start as requested
     window.show()
     
+    # Restore the previous run's timers and reminders once the first paint is queued
+    QTimer.singleShot(0, window.restore_timers)
+    QTimer.singleShot(0, window.restore_reminders)
+
+    # Move stale tasks into the archive without delaying startup (opt-in)
+    if ARCHIVE_AFTER_DAYS > 0:
+        threading.Thread(target=DataManager().archive_tasks, name="TaskArchiver", daemon=True).start()
+    
     sys.exit(app.exec())
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from .diagnostics import LatencyHistogram
+
+# Summary used when several different messages of one category are merged
+SUMMARIES = {
+    "任务完成": "{n} 个任务已完成",
+    "任务开始": "{n} 个任务已开始",
+    "任务取消": "已取消 {n} 个任务",
+    "提醒": "{n} 条提醒",
+}
+DEFAULT_SUMMARY = "{n} 条通知"
+# Lines of the merged messages listed under the summary
+SUMMARY_LINES = 3
+
+
+class PlyerBackend:
+    """Native desktop notifications through plyer (what utils.show_notification uses)."""
+
+    def deliver(self, title: str, message: str):
+        from .utils import show_notification
+        show_notification(title, message)
+
+
+class TrayBackend:
+    """Tray balloons. The tray lives on the GUI thread, so this goes through a queued signal."""
+
+    def __init__(self, tray):
+        self.tray = tray
+
+    def deliver(self, title: str, message: str):
+        self.tray.sig_show_message.emit(title, message)
+
+
+class StubBackend:
+    """Keeps what would have been shown, for headless runs and tests."""
+
+    def __init__(self):
+        self.delivered: List[tuple] = []
+
+    def deliver(self, title: str, message: str):
+        self.delivered.append((title, message))
+
+
+def create_backend(name: str, tray=None):
+    if name == "plyer":
+        return PlyerBackend()
+    if name == "stub":
+        return StubBackend()
+    if name != "tray":
+        logging.error(f"Unknown notification backend {name!r}, using tray")
+    return TrayBackend(tray) if tray is not None else StubBackend()
+
+
+class _Pending:
+    """Messages of one category waiting for the category's next slot."""
+    __slots__ = ("title", "messages", "enqueued", "due")
+
+    def __init__(self):
+        self.title: Optional[str] = None
+        self.messages: Dict[str, int] = {}   # message -> repeats, in arrival order
+        self.enqueued: List[float] = []      # monotonic enqueue times, for latency
+        self.due = 0.0
+
+
+class NotificationService:
+    """
+    Desktop notifications off the caller's thread, without flooding the user.
+
+    notify() only appends to a bounded queue (dropping, and counting, when
+    it is full) and returns. A worker thread delivers to the backend with a
+    per-category rate limit: the category is the title unless given. The
+    first message of a category goes out at once; whatever arrives before
+    the category's next slot (`min_interval` later) is held and merged into
+    one notification: repeats of a message become "(×3)", different
+    messages a summary such as "3 个任务已完成". A message identical to one
+    delivered less than `dedup_window` seconds ago is dropped. Callers
+    (the window, the event bus) pass every message through unmerged, so this
+    is the only place notifications are merged and counted.
+
+    `latency` holds enqueue -> delivery times; stats() the counters.
+    """
+
+    def __init__(self, backend, maxsize: int = 64, min_interval: float = 3.0,
+                 dedup_window: float = 30.0, rate_limits: Optional[Dict[str, float]] = None):
+        self.backend = backend
+        self.maxsize = maxsize
+        self.min_interval = min_interval
+        self.dedup_window = dedup_window
+        self.rate_limits = dict(rate_limits or {})
+        self.latency = LatencyHistogram()
+        self.counters = {"queued": 0, "delivered": 0, "merged": 0, "deduped": 0,
+                         "dropped": 0, "failed": 0}
+        self._queue = deque()
+        self._pending: Dict[str, _Pending] = {}
+        self._next_slot: Dict[str, float] = {}
+        self._recent: Dict[tuple, float] = {}   # (title, message) -> delivered at
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="Notifications", daemon=True)
+        self._thread.start()
+
+    def notify(self, title: str, message: str, category: Optional[str] = None) -> bool:
+        """Queue a notification; False if the queue was full and it was dropped."""
+        with self._cond:
+            if self._stopped or len(self._queue) >= self.maxsize:
+                self.counters["dropped"] += 1
+                return False
+            self._queue.append((category or title, title, message, time.monotonic()))
+            self.counters["queued"] += 1
+            self._cond.notify()
+        return True
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return dict(self.counters, backlog=len(self._queue) + sum(
+                len(p.enqueued) for p in self._pending.values()))
+
+    # --- Worker ---
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    self._take_queued(now)
+                    ready = [c for c, p in self._pending.items() if p.due <= now or self._stopped]
+                    if ready:
+                        batches = [(c, self._pending.pop(c)) for c in ready]
+                        break
+                    if self._stopped:
+                        return
+                    wait = min((p.due for p in self._pending.values()), default=None)
+                    self._cond.wait(None if wait is None else wait - now)
+            for category, pending in batches:
+                self._deliver(category, pending)
+
+    def _take_queued(self, now: float):
+        # Caller holds self._cond
+        while self._queue:
+            category, title, message, enqueued = self._queue.popleft()
+            delivered_at = self._recent.get((title, message))
+            if delivered_at is not None and now - delivered_at < self.dedup_window:
+                self.counters["deduped"] += 1
+                continue
+            pending = self._pending.get(category)
+            if pending is None:
+                pending = self._pending[category] = _Pending()
+                pending.due = max(now, self._next_slot.get(category, 0.0))
+            pending.messages[message] = pending.messages.get(message, 0) + 1
+            pending.enqueued.append(enqueued)
+            pending.title = pending.title or title
+
+    def _deliver(self, category: str, pending: _Pending):
+        title, message = pending.title, self._merge(category, pending.messages)
+        try:
+            self.backend.deliver(title, message)
+            ok = True
+        except Exception as e:
+            logging.error(f"Notification error: {e}")
+            ok = False
+        now = time.monotonic()
+        with self._cond:
+            self._next_slot[category] = now + self.rate_limits.get(category, self.min_interval)
+            if not ok:
+                self.counters["failed"] += 1
+                return
+            self.counters["delivered"] += 1
+            self.counters["merged"] += len(pending.enqueued) - 1
+            for text in pending.messages:
+                self._recent[(title, text)] = now
+            # Forget deliveries that can no longer suppress anything
+            if len(self._recent) > 256:
+                self._recent = {k: t for k, t in self._recent.items() if now - t < self.dedup_window}
+        for enqueued in pending.enqueued:
+            self.latency.record(now - enqueued)
+
+    @staticmethod
+    def _merge(category: str, messages: Dict[str, int]) -> str:
+        if len(messages) == 1:
+            (message, repeats), = messages.items()
+            return message if repeats == 1 else f"{message} (×{repeats})"
+        lines = [SUMMARIES.get(category, DEFAULT_SUMMARY).format(n=sum(messages.values()))]
+        lines.extend(list(messages)[:SUMMARY_LINES])
+        if len(messages) > SUMMARY_LINES:
+            lines.append("…")
+        return "\n".join(lines)
+
+    def close(self, timeout: float = 2.0):
+        """Deliver what is still held back (ignoring rate limits) and stop the worker."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=timeout)
@@ -0,0 +1,118 @@
+"""
+Recurrence rules for repeating reminders.
+
+A rule is a plain dict, so it can live in a task's params:
+
+    {"kind": "interval", "every": seconds, "anchor": "2024-05-01T09:00:00"}
+    {"kind": "daily", "at": "20:00"}
+    {"kind": "weekly", "at": "20:00", "weekdays": mask}   # bit 0 = Monday
+
+Occurrences are computed from the anchor (or the wall-clock time of day),
+never by adding a period to the last firing, so they do not drift however
+late a firing runs. count_between() is O(1), which lets a late firing
+report how many occurrences it stands for instead of firing once for each.
+"""
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, Optional
+
+WEEKDAYS = "一二三四五六日"
+
+
+def interval(minutes: float, anchor: Optional[datetime] = None) -> Dict:
+    """Every `minutes`, counted from `anchor` (default: now)."""
+    anchor = anchor or datetime.now().replace(microsecond=0)
+    return {"kind": "interval", "every": int(minutes * 60), "anchor": anchor.isoformat()}
+
+
+def daily(at: str) -> Dict:
+    """Every day at "HH:MM"."""
+    return {"kind": "daily", "at": _parse_at(at).strftime("%H:%M")}
+
+
+def weekly(at: str, weekdays: Iterable[int]) -> Dict:
+    """At "HH:MM" on the given weekdays (0 = Monday)."""
+    mask = 0
+    for day in weekdays:
+        mask |= 1 << day
+    return {"kind": "weekly", "at": _parse_at(at).strftime("%H:%M"), "weekdays": mask}
+
+
+def describe(rule: Dict) -> str:
+    """Short Chinese description, e.g. "每 30 分钟" or "周一三五 20:00"."""
+    kind = rule.get("kind")
+    if kind == "interval":
+        return f"每 {rule['every'] // 60} 分钟"
+    if kind == "daily":
+        return f"每天 {rule['at']}"
+    if kind == "weekly":
+        days = "".join(WEEKDAYS[i] for i in range(7) if rule["weekdays"] >> i & 1)
+        return f"周{days} {rule['at']}"
+    return "?"
+
+
+def _parse_at(at: str) -> time:
+    hours, minutes = at.split(":")
+    return time(int(hours), int(minutes))
+
+
+def _bits_before(mask: int, weekday: int) -> int:
+    """Set bits among weekdays 0..weekday-1."""
+    return bin(mask & ((1 << weekday) - 1)).count("1")
+
+
+def _count_until(rule: Dict, moment: datetime) -> int:
+    """Occurrences at or before `moment`, counted from a fixed origin."""
+    kind = rule["kind"]
+    if kind == "interval":
+        anchor = datetime.fromisoformat(rule["anchor"])
+        if moment < anchor or rule["every"] <= 0:
+            return 0
+        return (moment - anchor) // timedelta(seconds=rule["every"]) + 1
+    at = _parse_at(rule["at"])
+    today = moment.toordinal()
+    on_today = moment.time() >= at
+    if kind == "daily":
+        return today - 1 + on_today
+    if kind == "weekly":
+        mask = rule["weekdays"]
+        # Ordinal 1 (0001-01-01) is a Monday
+        days_before = today - 1
+        count = days_before // 7 * bin(mask).count("1") + _bits_before(mask, days_before % 7)
+        return count + (on_today and bool(mask >> moment.weekday() & 1))
+    raise ValueError(f"Unknown recurrence kind: {kind}")
+
+
+def count_between(rule: Dict, start: datetime, end: datetime) -> int:
+    """Number of occurrences t with start < t <= end."""
+    if end <= start:
+        return 0
+    return _count_until(rule, end) - _count_until(rule, start)
+
+
+def next_fire(rule: Dict, after: datetime) -> Optional[datetime]:
+    """First occurrence strictly after `after`, None if the rule never fires."""
+    kind = rule["kind"]
+    if kind == "interval":
+        anchor = datetime.fromisoformat(rule["anchor"])
+        period = timedelta(seconds=rule["every"])
+        if period <= timedelta(0):
+            return None
+        if after < anchor:
+            return anchor
+        return anchor + ((after - anchor) // period + 1) * period
+    at = _parse_at(rule["at"])
+    if kind == "daily":
+        candidate = datetime.combine(after.date(), at)
+        return candidate if candidate > after else candidate + timedelta(days=1)
+    if kind == "weekly":
+        mask = rule["weekdays"] & 0x7F
+        if not mask:
+            return None
+        day = after.date()
+        for offset in range(8):
+            current = day + timedelta(days=offset)
+            candidate = datetime.combine(current, at)
+            if mask >> current.weekday() & 1 and candidate > after:
+                return candidate
+        return None
+    raise ValueError(f"Unknown recurrence kind: {kind}")
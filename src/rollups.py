@@ -0,0 +1,59 @@
+from datetime import date
+from typing import Dict, List
+
+# Rollup kinds and their key format
+YEAR = "year"        # "2026"
+MONTH = "month"      # "2026-10"
+WEEK = "week"        # "2026-W42" (ISO week)
+WEEKDAY = "weekday"  # "0".."6", Monday = 0
+KINDS = (YEAR, MONTH, WEEK, WEEKDAY)
+
+
+def rollup_keys(day: date) -> Dict[str, str]:
+    iso_year, iso_week, _ = day.isocalendar()
+    return {
+        YEAR: str(day.year),
+        MONTH: f"{day.year}-{day.month:02d}",
+        WEEK: f"{iso_year}-W{iso_week:02d}",
+        WEEKDAY: str(day.weekday()),
+    }
+
+
+class Rollups:
+    """
+    Pre-aggregated pomodoro totals per year, month, ISO week and weekday.
+
+    Updated together with the daily counter on every recorded pomodoro, so
+    the Records tab answers "how many this year" with a dict lookup instead
+    of scanning every day of history.
+    """
+
+    def __init__(self, totals: Dict[str, Dict[str, int]] = None):
+        self.totals = {kind: dict((totals or {}).get(kind, {})) for kind in KINDS}
+
+    @classmethod
+    def from_daily(cls, stats: Dict[str, int]) -> "Rollups":
+        rollups = cls()
+        for day_str, count in stats.items():
+            try:
+                rollups.add(date.fromisoformat(day_str), count)
+            except ValueError:
+                pass
+        return rollups
+
+    def copy(self) -> "Rollups":
+        return Rollups(self.totals)
+
+    def to_dict(self) -> Dict[str, Dict[str, int]]:
+        return self.totals
+
+    def add(self, day: date, amount: int = 1):
+        for kind, key in rollup_keys(day).items():
+            bucket = self.totals[kind]
+            bucket[key] = bucket.get(key, 0) + amount
+
+    def get(self, kind: str, key: str) -> int:
+        return self.totals.get(kind, {}).get(key, 0)
+
+    def keys(self, kind: str) -> List[str]:
+        return [k for k, v in self.totals.get(kind, {}).items() if v]
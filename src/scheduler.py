@@ -1,39 +1,94 @@
-from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.triggers.date import DateTrigger
+from .timer_engine import TimerEngine
+from .diagnostics import TimerDiagnostics
+from . import recurrence
 from datetime import datetime, timedelta
+from typing import Dict, Optional
 import logging
+import threading
 
 class TaskScheduler:
     def __init__(self):
-        self.scheduler = BackgroundScheduler()
-        self.scheduler.start()
+        # One engine thread for every countdown, sleeping until the next deadline
+        self.diagnostics = TimerDiagnostics()
+        self.engine = TimerEngine(self.diagnostics)
+        # Bumped by remove_task() and by re-adding, so a recurring task whose
+        # callback is running when it is removed does not re-arm itself
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
         logging.info("Scheduler started")
 
     def add_one_off_task(self, task_id: str, run_date: datetime, callback, args=None):
         if args is None:
             args = []
         try:
-            self.scheduler.add_job(
-                callback,
-                DateTrigger(run_date=run_date),
-                id=task_id,
-                args=args,
-                replace_existing=True
-            )
+            self.engine.add_at(task_id, run_date, callback, args)
             logging.info(f"Scheduled task {task_id} at {run_date}")
         except Exception as e:
             logging.error(f"Error scheduling task {task_id}: {e}")
 
-    def add_countdown_task(self, task_id: str, minutes: int, callback, args=None):
-        run_date = datetime.now() + timedelta(minutes=minutes)
-        self.add_one_off_task(task_id, run_date, callback, args)
+    def add_countdown_task(self, task_id: str, minutes: float, callback, args=None):
+        if args is None:
+            args = []
+        # Relative delays go straight to the monotonic clock
+        self.engine.add(task_id, minutes * 60, callback, args)
+        logging.info(f"Scheduled task {task_id} in {minutes} min")
+
+    def add_recurring_task(self, task_id: str, rule: Dict, callback, last_fired: Optional[datetime] = None):
+        """
+        Call callback(fired_at, occurrences) for every occurrence of `rule`
+        (see recurrence.py). Occurrences missed since `last_fired` (sleep,
+        app closed) are coalesced into one immediate call whose
+        `occurrences` says how many it stands for. The next deadline is
+        always computed from the rule, so late firings never shift later ones.
+        """
+        state = {"last": last_fired or datetime.now(), "due": None}
+        with self._lock:
+            generation = self._generations[task_id] = self._generations.get(task_id, 0) + 1
+
+        def fire():
+            now = datetime.now()
+            occurrences = max(1, recurrence.count_between(rule, state["last"], now))
+            state["last"] = now
+            try:
+                callback(now, occurrences)
+            finally:
+                # Never before the occurrence we were armed for, even if the
+                # monotonic deadline came up a little ahead of the wall clock
+                arm(max(now, state["due"] or now))
+
+        def arm(after):
+            with self._lock:
+                if self._generations.get(task_id) != generation:
+                    return   # removed (or replaced) meanwhile
+                state["due"] = recurrence.next_fire(rule, after)
+                if state["due"] is not None:
+                    self.engine.add_at(task_id, state["due"], fire)
+
+        first = recurrence.next_fire(rule, state["last"])
+        if first is not None and first <= datetime.now():
+            self.engine.add(task_id, 0, fire)   # missed while we were away
+        else:
+            arm(state["last"])
 
     def remove_task(self, task_id: str):
-        try:
-            self.scheduler.remove_job(task_id)
+        with self._lock:
+            if task_id in self._generations:
+                self._generations[task_id] += 1
+            cancelled = self.engine.cancel(task_id)
+        if cancelled:
             logging.info(f"Removed task {task_id}")
-        except Exception:
-            pass # Job might not exist
+
+    def remaining(self, task_id: str) -> Optional[float]:
+        """Seconds left on a pending task (monotonic), None if not scheduled."""
+        return self.engine.remaining(task_id)
+
+    def firing_deadline(self) -> Optional[float]:
+        """Monotonic deadline of the task being fired; call from inside its callback."""
+        return self.engine.firing_deadline()
+
+    def on_clock_change(self, listener):
+        """listener(kind, delta) after a suspend or a wall-clock step, on the engine thread."""
+        self.engine.on_clock_change(listener)
 
     def shutdown(self):
-        self.scheduler.shutdown()
+        self.engine.shutdown()
@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .commit import CommitLog
+
+# Column order of one log row. Rows are JSON arrays to keep lines short:
+# ["2026-10-17T09:00:00", "2026-10-17T09:25:00", 1500, "focus_pomo", "写周报", 0]
+FIELDS = ("start", "end", "duration", "type", "tag", "cut_short")
+
+# Only completed pomodoros feed the day/tag counters
+COUNTED_TYPE = "focus_pomo"
+
+
+def _month_key(day: date) -> Tuple[int, int]:
+    return day.year, day.month
+
+
+class SessionLog:
+    """
+    Append-only log of timer sessions, one JSON Lines file per month
+    (sessions/YYYY-MM.jsonl).
+
+    Every finished or cancelled timer is one row, so the day and tag counters
+    can always be recomputed from here (see derive_counters). Reading a month
+    or a year only opens the partitions for that range.
+    """
+
+    def __init__(self, directory: Path, commits: Optional[CommitLog] = None):
+        self.directory = Path(directory)
+        # Only for the fsync policy of appends
+        self.commits = commits or CommitLog(self.directory)
+        self._lock = threading.Lock()
+
+    def _path(self, year: int, month: int) -> Path:
+        return self.directory / f"{year:04d}-{month:02d}.jsonl"
+
+    def append(self, start: datetime, end: datetime, task_type: str,
+               tag: Optional[str] = None, cut_short: bool = False):
+        row = [
+            start.isoformat(timespec="seconds"),
+            end.isoformat(timespec="seconds"),
+            max(0, int(round((end - start).total_seconds()))),
+            task_type,
+            tag or "",
+            1 if cut_short else 0,
+        ]
+        line = json.dumps(row, ensure_ascii=False, separators=(',', ':')) + "\n"
+        # Partitioned by end time: that is the day record_pomodoro counts it on
+        path = self._path(end.year, end.month)
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(path, 'a+b') as f:
+                # A crash mid-append leaves a line without its newline; end it
+                # first, or this row would be glued to it and both lost
+                if f.seek(0, os.SEEK_END) > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        line = "\n" + line
+                f.write(line.encode('utf-8'))
+                self.commits.appended(path, f)
+
+    def months(self) -> List[Tuple[int, int]]:
+        """(year, month) of every partition on disk, oldest first."""
+        result = []
+        for p in self.directory.glob("*.jsonl"):
+            try:
+                year, month = p.stem.split("-")
+                result.append((int(year), int(month)))
+            except ValueError:
+                pass
+        return sorted(result)
+
+    def _read_partition(self, year: int, month: int) -> Iterator[Dict]:
+        try:
+            f = open(self._path(year, month), 'r', encoding='utf-8')
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                # A crash mid-append can leave a truncated last line
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    if line.strip():
+                        logging.error(f"Skipping bad session row in {year:04d}-{month:02d}")
+                    continue
+                session = dict(zip(FIELDS, row))
+                session["cut_short"] = bool(session.get("cut_short"))
+                yield session
+
+    def iter_sessions(self, start: date, end: date) -> Iterator[Dict]:
+        """Sessions that ended on days start..end (inclusive), oldest first."""
+        first, last = start.isoformat(), end.isoformat()
+        for year, month in self.months():
+            if not _month_key(start) <= (year, month) <= _month_key(end):
+                continue
+            for session in self._read_partition(year, month):
+                if first <= session["end"][:10] <= last:
+                    yield session
+
+    def load_month(self, year: int, month: int) -> List[Dict]:
+        return list(self._read_partition(year, month))
+
+    def load_year(self, year: int) -> List[Dict]:
+        return list(self.iter_sessions(date(year, 1, 1), date(year, 12, 31)))
+
+
+def derive_counters(sessions) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Rebuild ({day: count}, {tag: count}) the way record_pomodoro counts them."""
+    daily, tags = {}, {}
+    for session in sessions:
+        if session["type"] != COUNTED_TYPE or session["cut_short"]:
+            continue
+        day = session["end"][:10]
+        daily[day] = daily.get(day, 0) + 1
+        tag = session["tag"].strip()
+        if tag:
+            tags[tag] = tags.get(tag, 0) + 1
+    return daily, tags
@@ -0,0 +1,397 @@
+import json
+import logging
+import sqlite3
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .date_index import DateIndex
+from .day_counters import read_counts
+from .journal import TaskJournal
+from .rollups import Rollups, rollup_keys
+from .storage import StorageBackend, DEFAULT_TAG_STATS, default_config_document, page_tasks
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    seq        INTEGER PRIMARY KEY AUTOINCREMENT,
+    id         TEXT NOT NULL,
+    created_at TEXT,
+    status     TEXT,
+    data       TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_tasks_id ON tasks(id);
+CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at);
+
+CREATE TABLE IF NOT EXISTS user_config (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS daily_stats (
+    date  TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_daily_stats_date ON daily_stats(date);
+
+CREATE TABLE IF NOT EXISTS tag_stats (
+    name  TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS rollups (
+    kind  TEXT NOT NULL,
+    key   TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, key)
+);
+"""
+
+ROLLUP_UPSERT = ("INSERT INTO rollups(kind, key, count) VALUES (?, ?, ?) "
+                 "ON CONFLICT(kind, key) DO UPDATE SET count = count + excluded.count")
+
+TASK_UPSERT = ("INSERT INTO tasks(id, created_at, status, data) VALUES (?, ?, ?, ?) "
+               "ON CONFLICT(id) DO UPDATE SET created_at = excluded.created_at, "
+               "status = excluded.status, data = excluded.data")
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Everything (tasks, user_config, daily and tag stats) in one SQLite file.
+    A new database is seeded from the JSON layout in `data_dir` if present;
+    meta["migrated"] is written in the same transaction, so an import that
+    failed or was interrupted is simply run again on the next start.
+    Settings sit in their own table, so config reads never touch the tasks.
+    """
+
+    # fsync_policy -> PRAGMA synchronous; in WAL mode NORMAL syncs at checkpoints
+    SYNCHRONOUS = {"always": "FULL", "batched": "NORMAL", "never": "OFF"}
+
+    def __init__(self, db_file: Path, data_dir: Optional[Path] = None,
+                 fsync_policy: str = "batched", daily_format: str = "json"):
+        self.db_file = Path(db_file)
+
+        # One connection shared by GUI and scheduler threads, serialized by a lock
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_file), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(f"PRAGMA synchronous={self.SYNCHRONOUS.get(fsync_policy, 'NORMAL')}")
+        self.conn.executescript(SCHEMA)
+
+        # Check and seed/import under SQLite's write lock: two processes
+        # opening a new database at once must not both initialize it
+        with self._lock, _immediate(self.conn):
+            if not _initialized(self.conn):
+                if data_dir is not None and (Path(data_dir) / "tasks.json").exists():
+                    _import_json(Path(data_dir), self.conn, daily_format)
+                else:
+                    self._seed_defaults()
+            elif self.conn.execute("SELECT 1 FROM rollups LIMIT 1").fetchone() is None:
+                # Database predates rollups: build them once from the daily table
+                self._rebuild_rollups()
+
+    def _rebuild_rollups(self):
+        # Caller holds self._lock inside a transaction
+        rows = self.conn.execute("SELECT date, count FROM daily_stats").fetchall()
+        _insert_rollups(self.conn, Rollups.from_daily(dict(rows)))
+
+    def _seed_defaults(self):
+        # Caller holds self._lock inside a transaction
+        doc = default_config_document()
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO user_config(key, value) VALUES (?, ?)",
+            [(k, _dumps(v)) for k, v in doc["user_config"].items()])
+        meta = dict(doc["meta"], migrated=datetime.now().isoformat())
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)",
+            [(k, _dumps(v)) for k, v in meta.items()])
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO tag_stats(name, count) VALUES (?, ?)",
+            list(DEFAULT_TAG_STATS.items()))
+
+    # --- Tasks & Config ---
+
+    def get_tasks(self) -> List[Dict]:
+        with self._lock:
+            rows = self.conn.execute("SELECT data FROM tasks ORDER BY seq").fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def get_task(self, task_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute("SELECT data FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _scan_tasks(self, page_size: int = 256) -> Iterator[Dict]:
+        # Keyset pagination on seq: the lock is only held while a page is fetched
+        last_seq = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT seq, data FROM tasks WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (last_seq, page_size)).fetchall()
+            for seq, data in rows:
+                yield json.loads(data)
+            if len(rows) < page_size:
+                return
+            last_seq = rows[-1][0]
+
+    def iter_tasks(self, filter: Optional[Callable[[Dict], bool]] = None,
+                   limit: Optional[int] = None, offset: int = 0) -> Iterator[Dict]:
+        if filter is not None or limit is None:
+            return page_tasks(self._scan_tasks(), filter, limit, offset)
+        # A plain page is a single bounded query
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT data FROM tasks ORDER BY seq LIMIT ? OFFSET ?", (limit, offset)).fetchall()
+        return (json.loads(r[0]) for r in rows)
+
+    def add_tasks(self, tasks: List[Dict]):
+        with self._lock, self.conn:
+            # An upsert, not REPLACE: REPLACE re-inserts with a new seq, which
+            # would move an updated task to the end of the list
+            self.conn.executemany(TASK_UPSERT,
+                [(t["id"], t.get("created_at"), t.get("status"), _dumps(t)) for t in tasks])
+
+    def delete_tasks(self, task_ids: Iterable[str]) -> int:
+        ids = list(dict.fromkeys(task_ids))
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("DELETE FROM tasks WHERE id = ?", [(t_id,) for t_id in ids])
+            return self.conn.total_changes - before
+
+    def update_tasks(self, updates: Dict[str, Dict]) -> int:
+        changed = 0
+        with self._lock, self.conn:
+            for t_id, fields in updates.items():
+                row = self.conn.execute("SELECT data FROM tasks WHERE id = ?", (t_id,)).fetchone()
+                if row is None:
+                    continue
+                task = json.loads(row[0])
+                task.update(fields)
+                task["id"] = t_id
+                self.conn.execute(
+                    "UPDATE tasks SET created_at = ?, status = ?, data = ? WHERE id = ?",
+                    (task.get("created_at"), task.get("status"), _dumps(task), t_id))
+                changed += 1
+        return changed
+
+    def get_config(self) -> Dict:
+        with self._lock:
+            rows = self.conn.execute("SELECT key, value FROM user_config").fetchall()
+        return {k: json.loads(v) for k, v in rows}
+
+    def update_config(self, key: str, value):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO user_config(key, value) VALUES (?, ?)",
+                (key, _dumps(value)))
+
+    # --- Stats ---
+
+    def get_daily_stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute("SELECT date, count FROM daily_stats ORDER BY date").fetchall()
+        return dict(rows)
+
+    def get_daily_stats_range(self, start: date, end: date) -> Dict[str, int]:
+        # ISO dates sort as text, so this is a range scan on the date index
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT date, count FROM daily_stats WHERE date BETWEEN ? AND ?",
+                (start.isoformat(), end.isoformat())).fetchall()
+        return dict(rows)
+
+    def iter_days(self, start: date, end: date) -> Iterator[Tuple[date, int]]:
+        return DateIndex(self.get_daily_stats_range(start, end)).iter_days(start, end)
+
+    def get_year_counts(self, year: int):
+        counts = array('I', bytes(366 * 4))
+        base = date(year, 1, 1).toordinal()
+        for day_str, count in self.get_daily_stats_range(date(year, 1, 1), date(year, 12, 31)).items():
+            counts[date.fromisoformat(day_str).toordinal() - base] = count
+        return counts
+
+    def get_tag_stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute("SELECT name, count FROM tag_stats").fetchall()
+        return dict(rows)
+
+    def merge_counts(self, daily: Dict[str, int], tags: Dict[str, int],
+                     sync_marks: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        # Day, tag and rollup counters (and sync marks) move together in a single transaction
+        rollup_rows = []
+        for day, amount in daily.items():
+            rollup_rows.extend((kind, key, amount)
+                               for kind, key in rollup_keys(date.fromisoformat(day)).items())
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO daily_stats(date, count) VALUES (?, ?) "
+                "ON CONFLICT(date) DO UPDATE SET count = count + excluded.count", daily.items())
+            self.conn.executemany(
+                "INSERT INTO tag_stats(name, count) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET count = count + excluded.count", tags.items())
+            self.conn.executemany(ROLLUP_UPSERT, rollup_rows)
+            if sync_marks:
+                row = self.conn.execute("SELECT value FROM meta WHERE key = 'sync_marks'").fetchone()
+                marks = dict(json.loads(row[0]) if row else {}, **sync_marks)
+                self.conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES ('sync_marks', ?)",
+                                  (_dumps(marks),))
+            return {day: self.conn.execute("SELECT count FROM daily_stats WHERE date = ?",
+                                           (day,)).fetchone()[0]
+                    for day in daily}
+
+    def get_sync_marks(self) -> Dict[str, int]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'sync_marks'").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def clear_tag_stats(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM tag_stats")
+
+    def tag_stats_version(self):
+        # Bumped by commits from other connections; our own are tracked by the caller
+        with self._lock:
+            return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def get_rollups(self) -> Rollups:
+        with self._lock:
+            rows = self.conn.execute("SELECT kind, key, count FROM rollups").fetchall()
+        totals = {}
+        for kind, key, count in rows:
+            totals.setdefault(kind, {})[key] = count
+        return Rollups(totals)
+
+    def get_rollup(self, kind: str, key: str) -> int:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT count FROM rollups WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        return row[0] if row else 0
+
+    def get_rollup_keys(self, kind: str) -> List[str]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT key FROM rollups WHERE kind = ? AND count > 0", (kind,)).fetchall()
+        return [r[0] for r in rows]
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def _insert_rollups(conn: sqlite3.Connection, rollups: Rollups):
+    conn.executemany(
+        ROLLUP_UPSERT,
+        [(kind, key, count) for kind, bucket in rollups.to_dict().items()
+         for key, count in bucket.items()])
+
+
+@contextmanager
+def _immediate(conn: sqlite3.Connection):
+    """A transaction that takes the database's write lock up front (BEGIN IMMEDIATE)."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _initialized(conn: sqlite3.Connection) -> bool:
+    """True once an import or the default seed has committed. Call inside _immediate()."""
+    if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone():
+        return True
+    # Databases from before the marker wrote meta only in a completed import or seed
+    if conn.execute("SELECT 1 FROM meta LIMIT 1").fetchone() is None:
+        return False
+    conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES ('migrated', ?)",
+                 (_dumps(datetime.now().isoformat()),))
+    return True
+
+
+def _read_json(path: Path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except json.JSONDecodeError as e:
+        logging.error(f"Error reading {path}: {e}")
+        return default
+
+
+def migrate_json_to_sqlite(data_dir: Path, conn: sqlite3.Connection, daily_format: str = "json") -> bool:
+    """
+    One-shot import of tasks.json and daily_records/* into `conn`, in one
+    transaction that also writes meta["migrated"]. Does nothing (and returns
+    False) if the database was already imported or seeded, checked under
+    the write lock so concurrent migrators cannot both run. The JSON files
+    are only read, never written, so both backends can be compared.
+    """
+    with _immediate(conn):
+        if _initialized(conn):
+            return False
+        _import_json(Path(data_dir), conn, daily_format)
+    return True
+
+
+def _import_json(data_dir: Path, conn: sqlite3.Connection, daily_format: str):
+    # Caller holds the write lock (see _immediate) and commits
+    records_dir = data_dir / "daily_records"
+    # With daily_stats_format = mmap the counts live in per-year .bin files;
+    # stats.json only matters until they were first created from it
+    if daily_format == "mmap" and any(records_dir.glob("counts-*.bin")):
+        stats = read_counts(records_dir)
+    else:
+        stats = _read_json(records_dir / "stats.json", {})
+    doc = _read_json(data_dir / "tasks.json", {})
+    config_doc = _read_json(data_dir / "config.json", {})
+    # Replaying through the journal also picks up records not yet compacted
+    journal = TaskJournal(data_dir / "tasks.json", data_dir / "tasks.journal")
+    tasks = journal.get_tasks()
+    # Settings may still sit in tasks.json/the journal if it was never split
+    user_config = dict(config_doc.get("user_config", {}), **journal.legacy_config())
+    tag_stats = _read_json(records_dir / "tag_stats.json", dict(DEFAULT_TAG_STATS))
+
+    conn.executemany(TASK_UPSERT,
+        [(t["id"], t.get("created_at"), t.get("status"), _dumps(t)) for t in tasks])
+    conn.executemany(
+        "INSERT OR REPLACE INTO user_config(key, value) VALUES (?, ?)",
+        [(k, _dumps(v)) for k, v in user_config.items()])
+    meta = dict(config_doc.get("meta", doc.get("meta", {})))
+    meta["migrated"] = datetime.now().isoformat()
+    conn.executemany(
+        "INSERT OR REPLACE INTO meta(key, value) VALUES (?, ?)",
+        [(k, _dumps(v)) for k, v in meta.items()])
+    conn.executemany(
+        "INSERT OR REPLACE INTO daily_stats(date, count) VALUES (?, ?)",
+        list(stats.items()))
+    conn.executemany(
+        "INSERT OR REPLACE INTO tag_stats(name, count) VALUES (?, ?)",
+        list(tag_stats.items()))
+    _insert_rollups(conn, Rollups.from_daily(stats))
+    logging.info(f"Migrated {len(tasks)} tasks, {len(stats)} days, "
+                 f"{len(tag_stats)} tags from JSON into SQLite")
+
+
+if __name__ == "__main__":
+    # python -m src.sqlite_store  ->  (re)build data/taskpulse.db from the JSON files
+    from .config import DATA_DIR, SQLITE_FILE, DAILY_STATS_FORMAT
+    logging.basicConfig(level=logging.INFO)
+    if SQLITE_FILE.exists():
+        print(f"{SQLITE_FILE} already exists, remove it first to migrate again.")
+    else:
+        SqliteBackend(SQLITE_FILE, DATA_DIR, daily_format=DAILY_STATS_FORMAT).close()
+        print(f"Migrated {DATA_DIR} -> {SQLITE_FILE}")
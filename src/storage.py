@@ -0,0 +1,662 @@
+import json
+import logging
+import os
+import threading
+from array import array
+from contextlib import contextmanager
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .commit import CommitLog
+from .date_index import DateIndex
+from .day_counters import DailyCounterStore
+from .file_cache import FileCache
+from .json_stream import iter_array
+from .locking import StoreLock
+from .journal import TaskJournal
+from .rollups import Rollups
+from .task_index import TaskIndex
+
+# Pre-fill with some default examples so user can test the UI immediately
+DEFAULT_TAG_STATS = {
+    "专注工作": 5,
+    "阅读学习": 3,
+    "锻炼身体": 2
+}
+
+
+def default_config_document() -> Dict:
+    return {
+        "user_config": {
+            "engineer_mode": False,
+            "auto_start": False
+        },
+        "meta": {
+            "version": "1.0.0",
+            "created_at": datetime.now().isoformat()
+        }
+    }
+
+
+def page_tasks(tasks: Iterable[Dict], filter: Optional[Callable[[Dict], bool]] = None,
+               limit: Optional[int] = None, offset: int = 0) -> Iterator[Dict]:
+    """Apply filter, then skip `offset` matches and stop after `limit`, lazily."""
+    if filter is not None:
+        tasks = (t for t in tasks if filter(t))
+    stop = None if limit is None else offset + limit
+    return islice(tasks, offset, stop)
+
+
+class StorageBackend:
+    """
+    Interface every storage backend implements. DataManager only talks to
+    these methods, so backends can be swapped via `storage_mode` in config.ini.
+    """
+
+    def get_tasks(self) -> List[Dict]:
+        raise NotImplementedError
+
+    def get_task(self, task_id: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def iter_tasks(self, filter: Optional[Callable[[Dict], bool]] = None,
+                   limit: Optional[int] = None, offset: int = 0) -> Iterator[Dict]:
+        """Tasks in stored order, one at a time, with optional filter and paging."""
+        return page_tasks(self.get_tasks(), filter, limit, offset)
+
+    # Batch mutations are the primitives: each call is persisted once.
+
+    def add_tasks(self, tasks: List[Dict]):
+        raise NotImplementedError
+
+    def delete_tasks(self, task_ids: Iterable[str]) -> int:
+        """Delete the given ids. Returns how many existed."""
+        raise NotImplementedError
+
+    def update_tasks(self, updates: Dict[str, Dict]) -> int:
+        """Merge fields into tasks, {task_id: {field: value}}. Returns how many existed."""
+        raise NotImplementedError
+
+    def add_task(self, task: Dict):
+        self.add_tasks([task])
+
+    def delete_task(self, task_id: str) -> bool:
+        return self.delete_tasks([task_id]) > 0
+
+    def get_config(self) -> Dict:
+        raise NotImplementedError
+
+    def update_config(self, key: str, value):
+        raise NotImplementedError
+
+    def get_daily_stats(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def get_tag_stats(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def record_pomodoro(self, day: str, tag: Optional[str]) -> int:
+        """Count one pomodoro for `day` (and `tag` if given). Returns the day's new total."""
+        return self.merge_counts({day: 1}, {tag: 1} if tag else {})[day]
+
+    def merge_counts(self, daily: Dict[str, int], tags: Dict[str, int],
+                     sync_marks: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """
+        Add increments to the day counters (and rollups) and tag counters in one
+        write, e.g. counts merged in from another machine. `sync_marks`
+        ({replica: offset}, see SyncAgent) is stored in the same write, so
+        whoever merged remote counts can tell afterwards whether they landed.
+        Returns the new totals of the touched days.
+        """
+        raise NotImplementedError
+
+    def get_sync_marks(self) -> Dict[str, int]:
+        """Sync marks stored by merge_counts(), {replica: offset}."""
+        raise NotImplementedError
+
+    # (daily stats object, DateIndex) - rebuilt when the backend swaps the object
+    _date_index = None
+
+    def _day_index(self) -> DateIndex:
+        stats = self.get_daily_stats()
+        cached = self._date_index
+        if cached is None or cached[0] is not stats:
+            cached = (stats, DateIndex(stats))
+            self._date_index = cached
+        return cached[1]
+
+    def get_daily_stats_range(self, start: date, end: date) -> Dict[str, int]:
+        """{"YYYY-MM-DD": count} for recorded days in start..end (inclusive)."""
+        return self._day_index().range(start, end)
+
+    def iter_days(self, start: date, end: date) -> Iterator[Tuple[date, int]]:
+        """(day, count) for every day in start..end (inclusive), zeros included."""
+        return self._day_index().iter_days(start, end)
+
+    def get_year_counts(self, year: int):
+        """366 counts for `year`, indexed by day_of_year - 1."""
+        counts = array('I', bytes(366 * 4))
+        for slot, (_, count) in enumerate(self.iter_days(date(year, 1, 1), date(year, 12, 31))):
+            counts[slot] = count
+        return counts
+
+    def clear_tag_stats(self):
+        raise NotImplementedError
+
+    def get_rollups(self) -> Rollups:
+        raise NotImplementedError
+
+    def tag_stats_version(self):
+        """Changes whenever tag stats change on disk, so in-memory indexes know to rebuild."""
+        raise NotImplementedError
+
+    def get_rollup(self, kind: str, key: str) -> int:
+        return self.get_rollups().get(kind, key)
+
+    def get_rollup_keys(self, kind: str) -> List[str]:
+        return self.get_rollups().keys(kind)
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Read-cache hit/miss counters, if the backend has a read cache."""
+        return {}
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class JsonBackend(StorageBackend):
+    """
+    JSON files: tasks.json, config.json (user_config + meta) and
+    daily_records/{stats,tag_stats}.json.
+    """
+
+    # Keys that used to live in tasks.json and now live in config.json
+    CONFIG_KEYS = ("user_config", "meta")
+
+    def __init__(self, data_dir: Path, tasks_file: Optional[Path] = None,
+                 config_file: Optional[Path] = None, daily_format: str = "json",
+                 fsync_policy: str = "batched"):
+        self.data_dir = Path(data_dir)
+        self.data_file = Path(tasks_file) if tasks_file else self.data_dir / "tasks.json"
+        self.config_file = Path(config_file) if config_file else self.data_dir / "config.json"
+        self.daily_records_dir = self.data_dir / "daily_records"
+        self.stats_file = self.daily_records_dir / "stats.json"
+        self.migrated_stats_file = self.daily_records_dir / "stats.json.migrated"
+        self.tag_stats_file = self.daily_records_dir / "tag_stats.json"
+        self.rollups_file = self.daily_records_dir / "rollups.json"
+        self.sync_marks_file = self.daily_records_dir / "sync_marks.json"
+        # Parsed files, reused until their mtime/size changes on disk
+        self.file_cache = FileCache()
+        self._tasks_lock = threading.RLock()
+        self._config_lock = threading.Lock()
+        self._task_index = None
+        self._indexed_doc = None
+
+        # Shared readers / exclusive writers across threads and processes. A
+        # version written by someone else drops every cached file.
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.store_lock = StoreLock(self.data_dir / ".taskpulse.lock",
+                                    on_change=self.file_cache.invalidate)
+        self._lock_signature = None   # lock file identity when its version was last read
+        # Every file is replaced atomically; related files commit together
+        self.commits = CommitLog(self.data_dir, fsync_policy)
+        self._groups = threading.local()   # outcome of the _commit_group() in progress
+
+        # daily_stats_format = mmap: per-year binary slot files instead of stats.json
+        self.day_counters = None
+        with self.store_lock.exclusive():
+            self.commits.recover()
+            self._ensure_file_exists()
+            self._ensure_stats_exists()
+            if daily_format == "mmap":
+                self.day_counters = DailyCounterStore(self.daily_records_dir)
+                self._migrate_stats_to_counters()
+            # Build rollups now if missing, so no reader ever has to write
+            self._load_rollups()
+            self.store_lock.bump()
+
+    def _ensure_file_exists(self):
+        if not self.data_file.exists():
+            self._save_json({"tasks": []})
+        if not self.config_file.exists():
+            self._split_config()
+
+    def _split_config(self):
+        """
+        One-time move of user_config/meta out of tasks.json into config.json,
+        so reading or flipping a setting never parses the task list again.
+        """
+        doc = self._read_json()
+        config_doc = default_config_document()
+        for key in self.CONFIG_KEYS:
+            if key in doc:
+                config_doc[key] = doc[key]
+        with self._commit_group("config"):
+            self._save_config_doc(config_doc)
+
+            if any(key in doc for key in self.CONFIG_KEYS):
+                tasks_doc = {k: v for k, v in doc.items() if k not in self.CONFIG_KEYS}
+                tasks_doc.setdefault("tasks", [])
+                self._save_json(tasks_doc)
+        if any(key in doc for key in self.CONFIG_KEYS):
+            logging.info(f"Moved settings from {self.data_file.name} to {self.config_file.name}")
+
+    def _ensure_stats_exists(self):
+        if not self.daily_records_dir.exists():
+            try:
+                os.makedirs(self.daily_records_dir)
+            except OSError as e:
+                logging.error(f"Error creating directory: {e}")
+
+        if not self.stats_file.exists():
+            self._save_stats({})
+
+        if not self.tag_stats_file.exists():
+            self._save_tag_stats(dict(DEFAULT_TAG_STATS))
+
+    def _migrate_stats_to_counters(self):
+        """
+        One-time move of stats.json into the year files. The old dict is kept
+        as stats.json.migrated and stats.json is emptied in the same commit,
+        so it can neither go stale next to the counters nor be imported twice.
+        """
+        stats = self._load_stats()
+        if not stats:
+            return
+        daily = {}
+        if not self.day_counters.has_data():
+            for day, count in stats.items():
+                try:
+                    date.fromisoformat(day)
+                    daily[day] = int(count)
+                except (TypeError, ValueError):
+                    continue
+        # else: imported by an older version that left stats.json in place
+        with self._commit_group("daily stats migration") as group:
+            # Not the write-behind override: that increments the mapped slots
+            # directly, outside this commit
+            JsonBackend._increment_days(self, daily)
+            self._write_file(self.migrated_stats_file, stats, "migrated stats")
+            self._save_stats({})
+        if group["ok"]:
+            logging.info(f"Moved {self.stats_file.name} into daily counter files")
+
+    def _read_json(self) -> Dict:
+        try:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError) as e:
+            logging.error(f"Error loading tasks: {e}")
+            return {"tasks": []}
+
+    def _load_json(self) -> Dict:
+        # Shared cached object: copy before modifying
+        return self.file_cache.get(self.data_file, self._read_json)
+
+    def _write_file(self, path: Path, payload, what: str, cached=None):
+        """
+        Atomically replace `path` with `payload` as JSON and cache `cached`
+        (default: the payload) once it is in place. Inside _commit_group()
+        the write joins the group's commit.
+        """
+        cached = payload if cached is None else cached
+        try:
+            data = json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8')
+            self.commits.write(path, data, on_commit=lambda: self.file_cache.put(path, cached))
+        except Exception as e:
+            self.file_cache.invalidate(path)
+            logging.error(f"Error saving {what}: {e}")
+            group = getattr(self._groups, "current", None)
+            if group is not None:
+                group["ok"] = False
+
+    @contextmanager
+    def _commit_group(self, what: str):
+        """
+        Commit every file saved in the block together, or none of them.
+        Yields a dict whose "ok" is False afterwards if anything in the group
+        failed to save (failures are logged, not raised). Nested groups share
+        the outer group's outcome.
+        """
+        outer = getattr(self._groups, "current", None)
+        group = outer if outer is not None else {"ok": True}
+        self._groups.current = group
+        staged = False
+        try:
+            with self.commits.transaction():
+                yield group
+                staged = True
+        except OSError as e:
+            if not staged:
+                raise
+            group["ok"] = False
+            self.file_cache.invalidate()
+            logging.error(f"Error saving {what}: {e}")
+        finally:
+            self._groups.current = outer
+
+    def _save_json(self, data: Dict):
+        self._write_file(self.data_file, data, "tasks")
+
+    def _read_config_doc(self) -> Dict:
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError) as e:
+            logging.error(f"Error loading config: {e}")
+            return {"user_config": {}}
+
+    def _load_config_doc(self) -> Dict:
+        return self.file_cache.get(self.config_file, self._read_config_doc)
+
+    def _save_config_doc(self, data: Dict):
+        self._write_file(self.config_file, data, "config")
+
+    def _read_stats_file(self, path: Path) -> Dict:
+        try:
+            if not path.exists():
+                return {}
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            logging.error(f"Error loading {path.name}: {e}")
+            return {}
+
+    def _load_stats(self) -> Dict:
+        # Shared cached object: copy before modifying
+        return self.file_cache.get(self.stats_file, lambda: self._read_stats_file(self.stats_file))
+
+    def _save_stats(self, data: Dict):
+        self._write_file(self.stats_file, data, "stats")
+
+    def _load_tag_stats(self) -> Dict:
+        return self.file_cache.get(self.tag_stats_file, lambda: self._read_stats_file(self.tag_stats_file))
+
+    def _save_tag_stats(self, data: Dict):
+        self._write_file(self.tag_stats_file, data, "tag stats")
+
+    def _read_rollups(self) -> Rollups:
+        if not self.rollups_file.exists():
+            # First run with rollups (or file removed): rebuild from history once
+            rollups = Rollups.from_daily(JsonBackend.get_daily_stats(self))
+            self._save_rollups(rollups)
+            return rollups
+        return Rollups(self._read_stats_file(self.rollups_file))
+
+    def _load_rollups(self) -> Rollups:
+        return self.file_cache.get(self.rollups_file, self._read_rollups)
+
+    def _load_sync_marks(self) -> Dict:
+        return self.file_cache.get(self.sync_marks_file, lambda: self._read_stats_file(self.sync_marks_file))
+
+    def _save_sync_marks(self, marks: Dict):
+        self._write_file(self.sync_marks_file, marks, "sync marks")
+
+    def _save_rollups(self, rollups: Rollups):
+        self._write_file(self.rollups_file, rollups.to_dict(), "rollups", cached=rollups)
+
+    # --- Locking ---
+
+    @contextmanager
+    def _reading(self):
+        """
+        Caches dropped if another writer got in. Every bump() rewrites the
+        lock file, so as long as its (mtime, size, inode) is unchanged the
+        version is too, and a read costs a stat() instead of a lock: files
+        are replaced atomically, so a whole file is always seen. The shared
+        lock is taken only to read a version that may have moved.
+        """
+        signature = FileCache.signature(self.store_lock.path)
+        if signature is not None and signature == self._lock_signature:
+            yield
+            return
+        with self.store_lock.shared():
+            self.store_lock.sync()
+            # Writers need the exclusive lock to bump, so this matches the version just read
+            self._lock_signature = FileCache.signature(self.store_lock.path)
+            yield
+
+    def _mutate_tasks(self, change: Callable[[TaskIndex], int]) -> int:
+        """Apply `change` to a copy of the task index and save it if it returns non-zero."""
+        def prepare():
+            with self._tasks_lock:
+                doc, index = self._task_state()
+                index = index.copy()
+                result = change(index)
+
+            def commit():
+                if result:
+                    with self._tasks_lock:
+                        self._commit_tasks(doc, index)
+                return result
+            return commit
+
+        return self.store_lock.optimistic(prepare)
+
+    # --- Tasks & Config ---
+
+    def _task_state(self):
+        """Current document plus an id index built once per loaded document."""
+        doc = self._load_json()
+        if doc is not self._indexed_doc:
+            self._task_index = TaskIndex(doc.get("tasks", []))
+            self._indexed_doc = doc
+        return doc, self._task_index
+
+    def _commit_tasks(self, doc: Dict, index: TaskIndex):
+        new_doc = dict(doc)
+        new_doc["tasks"] = index.tasks()
+        self._save_json(new_doc)
+        self._task_index = index
+        self._indexed_doc = new_doc
+
+    def get_tasks(self) -> List[Dict]:
+        with self._reading():
+            return list(self._load_json().get("tasks", []))
+
+    def _stream_tasks(self) -> Iterator[Dict]:
+        try:
+            yield from iter_array(self.data_file, "tasks")
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError as e:
+            logging.error(f"Error streaming tasks: {e}")
+
+    def iter_tasks(self, filter: Optional[Callable[[Dict], bool]] = None,
+                   limit: Optional[int] = None, offset: int = 0) -> Iterator[Dict]:
+        # Use the parsed document if it is already cached, otherwise parse the
+        # file incrementally so a first page never loads the whole file
+        with self._reading():
+            doc = self.file_cache.peek(self.data_file)
+        source = iter(doc.get("tasks", [])) if doc is not None else self._stream_tasks()
+        return page_tasks(source, filter, limit, offset)
+
+    def get_task(self, task_id: str) -> Optional[Dict]:
+        with self._reading(), self._tasks_lock:
+            return self._task_state()[1].get(task_id)
+
+    def add_tasks(self, tasks: List[Dict]):
+        if not tasks:
+            return
+        self._mutate_tasks(lambda index: index.add_many(tasks) or len(tasks))
+
+    def delete_tasks(self, task_ids: Iterable[str]) -> int:
+        task_ids = list(task_ids)
+        return self._mutate_tasks(lambda index: index.delete_many(task_ids))
+
+    def update_tasks(self, updates: Dict[str, Dict]) -> int:
+        return self._mutate_tasks(lambda index: index.update_many(updates))
+
+    def get_config(self) -> Dict:
+        with self._reading():
+            return dict(self._load_config_doc().get("user_config", {}))
+
+    def update_config(self, key: str, value):
+        def prepare():
+            data = dict(self._load_config_doc())
+            data["user_config"] = dict(data.get("user_config", {}))
+            data["user_config"][key] = value
+
+            def commit():
+                with self._config_lock:
+                    self._save_config_doc(data)
+            return commit
+
+        self.store_lock.optimistic(prepare)
+
+    # --- Stats ---
+
+    def get_daily_stats(self) -> Dict[str, int]:
+        if self.day_counters:
+            return self.day_counters.to_dict()
+        with self._reading():
+            return self._load_stats()
+
+    def get_year_counts(self, year: int):
+        if self.day_counters:
+            return self.day_counters.year_view(year)
+        return super().get_year_counts(year)
+
+    def get_daily_stats_range(self, start: date, end: date) -> Dict[str, int]:
+        if self.day_counters:
+            return {day.isoformat(): count for day, count in self.day_counters.iter_days(start, end)
+                    if count}
+        return super().get_daily_stats_range(start, end)
+
+    def iter_days(self, start: date, end: date) -> Iterator[Tuple[date, int]]:
+        if self.day_counters:
+            return self.day_counters.iter_days(start, end)
+        return super().iter_days(start, end)
+
+    def get_tag_stats(self) -> Dict[str, int]:
+        with self._reading():
+            return self._load_tag_stats()
+
+    def _increment_days(self, daily: Dict[str, int]) -> Dict[str, int]:
+        if self.day_counters:
+            # Slots are patched in place as part of the group commit, so they
+            # land together with rollups and tag counts
+            totals = {}
+            for day_str, amount in daily.items():
+                day = date.fromisoformat(day_str)
+                totals[day_str] = self.day_counters.get(day) + amount
+                self.commits.patch(*self.day_counters.slot_patch(day, totals[day_str]))
+            return totals
+        stats = dict(self._load_stats())
+        for day, amount in daily.items():
+            stats[day] = stats.get(day, 0) + amount
+        self._save_stats(stats)
+        return {day: stats[day] for day in daily}
+
+    def merge_counts(self, daily: Dict[str, int], tags: Dict[str, int],
+                     sync_marks: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        def prepare():
+            rollups = self._load_rollups().copy()
+            for day, amount in daily.items():
+                rollups.add(date.fromisoformat(day), amount)
+            t_stats = None
+            if tags:
+                t_stats = dict(self._load_tag_stats())
+                for tag, amount in tags.items():
+                    t_stats[tag] = t_stats.get(tag, 0) + amount
+            marks = dict(self._load_sync_marks(), **sync_marks) if sync_marks else None
+
+            def commit():
+                # Only the day counters are read again: in mmap mode the new
+                # slot values are computed here, under the writer lock
+                with self._commit_group("stats"):
+                    totals = self._increment_days(daily)
+                    self._save_rollups(rollups)
+                    if t_stats is not None:
+                        self._save_tag_stats(t_stats)
+                    if marks is not None:
+                        self._save_sync_marks(marks)
+                return totals
+            return commit
+
+        return self.store_lock.optimistic(prepare)
+
+    def clear_tag_stats(self):
+        with self.store_lock.exclusive():
+            self._save_tag_stats({})
+            self.store_lock.bump()
+
+    def get_rollups(self) -> Rollups:
+        with self._reading():
+            return self._load_rollups()
+
+    def get_sync_marks(self) -> Dict[str, int]:
+        with self._reading():
+            return dict(self._load_sync_marks())
+
+    def tag_stats_version(self):
+        return self.file_cache.signature(self.tag_stats_file)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self.file_cache.counters()
+
+    def close(self):
+        if self.day_counters:
+            self.day_counters.close()
+        self.commits.close()
+
+
+class JournalBackend(JsonBackend):
+    """JSON layout where task mutations go through a TaskJournal."""
+
+    def __init__(self, data_dir: Path, tasks_file: Optional[Path] = None,
+                 journal_file: Optional[Path] = None, compact_bytes: int = 256 * 1024,
+                 config_file: Optional[Path] = None, daily_format: str = "json",
+                 fsync_policy: str = "batched"):
+        super().__init__(data_dir, tasks_file, config_file, daily_format, fsync_policy)
+        self.journal = TaskJournal(self.data_file,
+                                   journal_file or self.data_dir / "tasks.journal",
+                                   compact_bytes=compact_bytes,
+                                   file_lock=self.store_lock.exclusive,
+                                   commits=self.commits)
+
+        # Older journals also carried settings; move them into config.json once
+        legacy = self.journal.legacy_config()
+        if legacy:
+            with self.store_lock.exclusive(), self._config_lock:
+                data = dict(self._load_config_doc())
+                data["user_config"] = dict(data.get("user_config", {}), **legacy)
+                self._save_config_doc(data)
+                self.store_lock.bump()
+            self.journal.compact()
+
+    def _journal_write(self, op, *args):
+        # Appends are serialized across processes; the journal re-syncs itself
+        with self.store_lock.exclusive():
+            result = op(*args)
+            self.store_lock.bump()
+            return result
+
+    def get_tasks(self) -> List[Dict]:
+        with self.store_lock.shared():
+            return self.journal.get_tasks()
+
+    def iter_tasks(self, filter: Optional[Callable[[Dict], bool]] = None,
+                   limit: Optional[int] = None, offset: int = 0) -> Iterator[Dict]:
+        # Journal records must be replayed over the snapshot, so no file streaming
+        return StorageBackend.iter_tasks(self, filter, limit, offset)
+
+    def get_task(self, task_id: str) -> Optional[Dict]:
+        with self.store_lock.shared():
+            return self.journal.get_task(task_id)
+
+    def add_tasks(self, tasks: List[Dict]):
+        self._journal_write(self.journal.add_tasks, tasks)
+
+    def delete_tasks(self, task_ids: Iterable[str]) -> int:
+        return self._journal_write(self.journal.delete_tasks, task_ids)
+
+    def update_tasks(self, updates: Dict[str, Dict]) -> int:
+        return self._journal_write(self.journal.update_tasks, updates)
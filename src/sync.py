@@ -0,0 +1,272 @@
+import json
+import logging
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .archive import TaskArchive
+from .commit import CommitLog
+from .locking import StoreLock
+from .storage import StorageBackend, DEFAULT_TAG_STATS
+
+
+class SyncAgent:
+    """
+    Merges pomodoro counts and tasks between machines through a shared folder.
+
+    Every replica appends only to its own delta file, <replica_id>.jsonl, in
+    the sync folder. A line holds local increments: {"daily": {day: n},
+    "tags": {tag: n}, "add": [task, ...], "del": [id, ...], "arch": [id, ...]}.
+    The counters are grow-only, so each replica's contribution is exactly
+    the sum of its own lines and other replicas add them once. "add"
+    carries new and changed tasks alike: the version with the later
+    updated_at (else created_at) wins, ties broken by content so every
+    replica picks the same one. Tasks listed in "arch" were archived by
+    their replica and move into our own archive too. Once an id is removed
+    or archived it is never re-added.
+
+    Pulling reads only files whose size or mtime moved past the stored
+    checkpoint, and only the bytes after the offset already applied. Those
+    offsets are stored by the backend in the same write as the merged
+    counts (merge_counts' sync_marks), so a crash between merging and
+    saving our own state never applies a remote increment twice. Remote
+    changes go straight into the backend, never back into our own delta
+    file, so nothing echoes between replicas.
+    """
+
+    def __init__(self, sync_dir: Path, state_file: Path, backend: StorageBackend,
+                 on_merge: Optional[Callable[[], None]] = None,
+                 commits: Optional[CommitLog] = None, archive: Optional[TaskArchive] = None):
+        self.sync_dir = Path(sync_dir)
+        self.state_file = Path(state_file)
+        self.backend = backend
+        self.on_merge = on_merge
+        # State file replacement and the fsync policy for delta appends
+        self.commits = commits or CommitLog(self.state_file.parent)
+        # Where tasks archived on another machine go (without one they are only deleted)
+        self.archive = archive
+        self._stop = threading.Event()
+        self._thread = None
+        # Other processes on this machine share the state file and delta file
+        self._lock = StoreLock(self.state_file.with_suffix(".lock"))
+
+        self.sync_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock.exclusive():
+            self.state = self._load_state()
+            self.replica_id = self.state["replica_id"]
+            self.own_file = self.sync_dir / f"{self.replica_id}.jsonl"
+            if not self.state.get("baseline_published"):
+                self._publish_baseline()
+
+    # --- State ---
+
+    def _load_state(self) -> Dict:
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            state = {}
+        except json.JSONDecodeError as e:
+            logging.error(f"Error loading sync state: {e}")
+            state = {}
+        state.setdefault("replica_id", uuid.uuid4().hex[:12])
+        state.setdefault("checkpoints", {})
+        state.setdefault("removed", [])
+        return state
+
+    def _save_state(self):
+        data = json.dumps(self.state, ensure_ascii=False, indent=2).encode('utf-8')
+        self.commits.write(self.state_file, data)
+
+    # --- Publishing our own changes ---
+
+    def _append(self, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+        try:
+            with open(self.own_file, 'ab') as f:
+                f.write(line.encode('utf-8'))
+                self.commits.appended(self.own_file, f)
+        except OSError as e:
+            logging.error(f"Error writing sync delta: {e}")
+
+    def _publish_baseline(self):
+        """First run: publish what this machine recorded before sync was enabled."""
+        # Every install starts with the same sample tags; they are not counts
+        # to add up across machines
+        tags = {tag: n - DEFAULT_TAG_STATS.get(tag, 0)
+                for tag, n in self.backend.get_tag_stats().items()}
+        self._append({
+            "daily": dict(self.backend.get_daily_stats()),
+            "tags": {tag: n for tag, n in tags.items() if n > 0},
+            "add": self.backend.get_tasks(),
+        })
+        self.state["baseline_published"] = True
+        self._save_state()
+
+    def publish_counts(self, day: str, tag: Optional[str]):
+        with self._lock.exclusive():
+            self._append({"daily": {day: 1}, "tags": {tag: 1} if tag else {}})
+
+    def publish_added(self, tasks: List[Dict]):
+        """New or changed tasks (the whole task, not just the changed fields)."""
+        if tasks:
+            with self._lock.exclusive():
+                self._append({"add": tasks})
+
+    def publish_removed(self, task_ids: List[str]):
+        if task_ids:
+            with self._lock.exclusive():
+                self.state = self._load_state()
+                self.state["removed"] = sorted(set(self.state["removed"]).union(task_ids))
+                self._append({"del": list(task_ids)})
+                self._save_state()
+
+    def publish_archived(self, task_ids: List[str]):
+        if task_ids:
+            with self._lock.exclusive():
+                self.state = self._load_state()
+                self.state["removed"] = sorted(set(self.state["removed"]).union(task_ids))
+                self._append({"arch": list(task_ids)})
+                self._save_state()
+
+    # --- Pulling other replicas' changes ---
+
+    def _read_new_lines(self, path: Path, checkpoint: Dict) -> List[Dict]:
+        st = path.stat()
+        offset = checkpoint.get("offset", 0)
+        if st.st_ino != checkpoint.get("inode", st.st_ino) or st.st_size < offset:
+            # Replaced or truncated: re-reading it would count everything twice
+            logging.error(f"Sync file {path.name} was rewritten, skipping to its end")
+            checkpoint.update(offset=st.st_size, inode=st.st_ino, mtime_ns=st.st_mtime_ns)
+            return []
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+        # Only complete lines; the owner may be mid-append
+        end = tail.rfind(b"\n") + 1
+        records = []
+        for line in tail[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                logging.error(f"Skipping bad sync record in {path.name}: {e}")
+        checkpoint.update(offset=offset + end, inode=st.st_ino, mtime_ns=st.st_mtime_ns)
+        return records
+
+    def pull(self) -> int:
+        """Merge everything other replicas appended since the last pull. Returns records applied."""
+        with self._lock.exclusive():
+            # Another process on this machine may have pulled in the meantime
+            self.state = self._load_state()
+            daily, tags, added, removed, archived = {}, {}, [], set(), set()
+            checkpoints = self.state["checkpoints"]
+            # What already reached the backend; ahead of the checkpoints if we
+            # crashed right after the last merge
+            applied = self.backend.get_sync_marks()
+            new_checkpoints = {}
+            count = 0
+            for path in sorted(self.sync_dir.glob("*.jsonl")):
+                replica = path.stem
+                if replica == self.replica_id:
+                    continue
+                checkpoint = dict(checkpoints.get(replica, {}))
+                if replica in applied:
+                    checkpoint["offset"] = applied[replica]
+                try:
+                    st = path.stat()
+                except FileNotFoundError:
+                    continue
+                # Unchanged since the checkpoint: not even opened
+                if (checkpoint.get("mtime_ns") == st.st_mtime_ns
+                        and checkpoint.get("offset") == st.st_size):
+                    continue
+                for record in self._read_new_lines(path, checkpoint):
+                    for day, n in record.get("daily", {}).items():
+                        daily[day] = daily.get(day, 0) + n
+                    for tag, n in record.get("tags", {}).items():
+                        tags[tag] = tags.get(tag, 0) + n
+                    added.extend(record.get("add", []))
+                    removed.update(record.get("del", []))
+                    archived.update(record.get("arch", []))
+                    count += 1
+                new_checkpoints[replica] = checkpoint
+
+            if not new_checkpoints:
+                return 0
+
+            # Tombstones first: keeping one too many is harmless
+            tombstones = removed.union(archived, self.state["removed"])
+            if len(tombstones) > len(self.state["removed"]):
+                self.state["removed"] = sorted(tombstones)
+                self._save_state()
+
+            # Task changes are idempotent, so applying them again after a
+            # crash changes nothing
+            newest = {}
+            for task in added:
+                if task["id"] not in tombstones and _newer(task, newest.get(task["id"])):
+                    newest[task["id"]] = task
+            changed = [t for t in newest.values() if _newer(t, self.backend.get_task(t["id"]))]
+            if changed:
+                self.backend.add_tasks(changed)
+            if archived:
+                # Archive first, like DataManager.archive_tasks: a crash in
+                # between leaves a copy in both, never in neither
+                local = [t for t in map(self.backend.get_task, archived) if t is not None]
+                if local and self.archive is not None:
+                    self.archive.add(local)
+                removed |= {t["id"] for t in local}
+            if removed:
+                self.backend.delete_tasks(removed)
+
+            # The commit point: counts and the offsets they cover land together
+            self.backend.merge_counts(daily, tags, sync_marks={
+                replica: checkpoint["offset"] for replica, checkpoint in new_checkpoints.items()})
+
+            # Only saves re-reading: the marks above already prevent double counting
+            checkpoints.update(new_checkpoints)
+            self._save_state()
+
+        if count and self.on_merge:
+            self.on_merge()
+        return count
+
+    # --- Background pulling ---
+
+    def start(self, interval: float):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, args=(interval,),
+                                            name="SyncAgent", daemon=True)
+            self._thread.start()
+
+    def _run(self, interval: float):
+        while True:
+            try:
+                self.pull()
+            except Exception as e:
+                logging.error(f"Error pulling sync changes: {e}")
+            if self._stop.wait(interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def _version(task: Dict) -> str:
+    return task.get("updated_at") or task.get("created_at") or ""
+
+
+def _newer(task: Dict, current: Optional[Dict]) -> bool:
+    """Whether `task` should replace `current`: last writer wins, ties go by content."""
+    if current is None:
+        return True
+    if _version(task) != _version(current):
+        return _version(task) > _version(current)
+    return (json.dumps(task, ensure_ascii=False, sort_keys=True)
+            > json.dumps(current, ensure_ascii=False, sort_keys=True))
@@ -0,0 +1,60 @@
+from typing import Dict, Iterable, List, Optional
+
+
+class TaskIndex:
+    """
+    Tasks keyed by id, in insertion order.
+
+    A plain dict keeps the original list order and gives O(1) lookup, insert,
+    delete and update, so batch operations cost O(batch) instead of a scan of
+    every stored task per change. Task dicts are never modified in place
+    (updates store a merged copy), so lists handed out earlier stay valid.
+    """
+
+    def __init__(self, tasks: Iterable[Dict] = ()):
+        self.by_id = {t["id"]: t for t in tasks}
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, task_id):
+        return task_id in self.by_id
+
+    def copy(self) -> "TaskIndex":
+        clone = TaskIndex()
+        clone.by_id = dict(self.by_id)
+        return clone
+
+    def tasks(self) -> List[Dict]:
+        return list(self.by_id.values())
+
+    def get(self, task_id: str) -> Optional[Dict]:
+        return self.by_id.get(task_id)
+
+    def add(self, task: Dict):
+        self.by_id[task["id"]] = task
+
+    def delete(self, task_id: str) -> bool:
+        return self.by_id.pop(task_id, None) is not None
+
+    def update(self, task_id: str, fields: Dict) -> bool:
+        old = self.by_id.get(task_id)
+        if old is None:
+            return False
+        new = dict(old)
+        new.update(fields)
+        new["id"] = task_id  # the id itself is not updatable
+        self.by_id[task_id] = new
+        return True
+
+    # --- Batches ---
+
+    def add_many(self, tasks: Iterable[Dict]):
+        for t in tasks:
+            self.by_id[t["id"]] = t
+
+    def delete_many(self, task_ids: Iterable[str]) -> int:
+        return sum(1 for t_id in task_ids if self.delete(t_id))
+
+    def update_many(self, updates: Dict[str, Dict]) -> int:
+        return sum(1 for t_id, fields in updates.items() if self.update(t_id, fields))
@@ -0,0 +1,235 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from .diagnostics import TimerDiagnostics
+
+# While timers are pending, wake at least this often to compare the clocks
+CLOCK_CHECK_SECONDS = 5.0
+# Clock offsets moving by more than this count as a suspend or a wall-clock step
+CLOCK_JUMP_TOLERANCE = 2.0
+
+
+def _clock_offsets():
+    """
+    (wall - boot, boot - monotonic). The boot clock keeps counting through
+    suspend where the monotonic clock stops (Linux), so the second offset
+    grows by the time spent suspended; the first moves when the wall clock
+    is stepped. Without CLOCK_BOOTTIME (Windows, macOS) the monotonic clock
+    already counts suspend, and only steps are seen.
+    """
+    mono = time.monotonic()
+    boot = time.clock_gettime(time.CLOCK_BOOTTIME) if hasattr(time, "CLOCK_BOOTTIME") else mono
+    return time.time() - boot, boot - mono
+
+
+class _Timer:
+    __slots__ = ("deadline", "seq", "timer_id", "callback", "args", "cancelled", "wall")
+
+    def __init__(self, deadline: float, seq: int, timer_id: str, callback: Callable, args,
+                 wall: Optional[datetime] = None):
+        self.deadline = deadline
+        self.seq = seq
+        self.timer_id = timer_id
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self.wall = wall    # set for add_at(): re-anchored when the wall clock moves
+
+    def __lt__(self, other):
+        return (self.deadline, self.seq) < (other.deadline, other.seq)
+
+
+class TimerEngine:
+    """
+    One thread, one min-heap of deadlines on the monotonic clock.
+
+    The thread sleeps until the earliest deadline (or until an earlier timer
+    is added), so idle timers cost nothing: there is no polling and no
+    thread per timer. add() is O(log n); cancel() marks the entry and drops
+    it from the index in O(1), and the heap is rebuilt once cancelled entries
+    outnumber live ones. Callbacks run on the engine thread, one at a time;
+    GUI code should hand them to the GUI thread (e.g. with a Qt signal).
+
+    Deadlines are monotonic, so a wall-clock change (NTP, DST, the user
+    editing the time) neither fires add() countdowns early nor delays them.
+    While timers are pending the clocks are compared every few seconds, so
+    only a jump within one such interval counts (the baseline is reset when
+    the first timer is added to an idle engine):
+    after a suspend, countdowns are moved up by the time spent asleep (so
+    a 25 minute session still ends 25 minutes after it started, once), and
+    add_at() timers are re-anchored to their wall-clock time after a
+    suspend or a step. Listeners registered with on_clock_change() hear
+    about both, e.g. to correct displayed end times.
+
+    Every firing records its lateness (deadline -> callback) in
+    `diagnostics`; firing_deadline() lets a callback pass its deadline on,
+    so later stages (the GUI) can record theirs.
+    """
+
+    def __init__(self, diagnostics: Optional[TimerDiagnostics] = None):
+        self.diagnostics = diagnostics or TimerDiagnostics()
+        self._listeners: List[Callable] = []
+        self._offsets = _clock_offsets()
+        self._pending_events: List = []   # clock changes seen by add(), for the engine thread
+        self._firing: Optional[_Timer] = None
+        self._heap: List[_Timer] = []
+        self._timers: Dict[str, _Timer] = {}
+        self._seq = itertools.count()
+        self._cancelled = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="TimerEngine", daemon=True)
+        self._thread.start()
+
+    # --- Adding and cancelling ---
+
+    def add(self, timer_id: str, delay: float, callback: Callable, args=None,
+            wall: Optional[datetime] = None):
+        """Call callback(*args) in `delay` seconds. An existing timer with this id is replaced."""
+        with self._cond:
+            if self._timers:
+                # Settle a clock change since the last check (at most
+                # CLOCK_CHECK_SECONDS ago) before it can be applied to this
+                # timer; listeners hear about it on the engine thread
+                events = self._check_clocks_locked()
+                self._pending_events.extend(events)
+            else:
+                # Idle: nothing was comparing the clocks, and hours of normal
+                # NTP slew must not be mistaken for a step. Start afresh.
+                self._offsets = _clock_offsets()
+                events = []
+            deadline = time.monotonic() + max(0.0, delay)
+            self._cancel_locked(timer_id)
+            timer = _Timer(deadline, next(self._seq), timer_id, callback, tuple(args or ()), wall)
+            self._timers[timer_id] = timer
+            heapq.heappush(self._heap, timer)
+            # Only an earlier wake-up (or clock news) changes anything for the sleeping thread
+            if self._heap[0] is timer or events:
+                self._cond.notify()
+
+    def add_at(self, timer_id: str, run_date: datetime, callback: Callable, args=None):
+        """
+        Like add(), for a wall-clock time: converted to a monotonic deadline
+        now, and again whenever the wall clock is seen to jump.
+        """
+        self.add(timer_id, (run_date - datetime.now()).total_seconds(), callback, args, wall=run_date)
+
+    def cancel(self, timer_id: str) -> bool:
+        with self._cond:
+            return self._cancel_locked(timer_id)
+
+    def _cancel_locked(self, timer_id: str) -> bool:
+        timer = self._timers.pop(timer_id, None)
+        if timer is None:
+            return False
+        timer.cancelled = True
+        self._cancelled += 1
+        if self._cancelled > len(self._timers):
+            self._heap = [t for t in self._heap if not t.cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        return True
+
+    # --- Queries ---
+
+    def remaining(self, timer_id: str) -> Optional[float]:
+        """Seconds until the timer fires, or None if it is not pending."""
+        with self._cond:
+            timer = self._timers.get(timer_id)
+            return None if timer is None else max(0.0, timer.deadline - time.monotonic())
+
+    def __contains__(self, timer_id: str) -> bool:
+        with self._cond:
+            return timer_id in self._timers
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._timers)
+
+    def firing_deadline(self) -> Optional[float]:
+        """Monotonic deadline of the timer whose callback is running (engine thread only)."""
+        return self._firing.deadline if self._firing else None
+
+    # --- Clock changes ---
+
+    def on_clock_change(self, listener: Callable):
+        """Call listener(kind, delta) on the engine thread: kind is "suspend" or "step", delta in seconds."""
+        self._listeners.append(listener)
+
+    def _check_clocks_locked(self) -> List:
+        wall_offset, sleep_offset = _clock_offsets()
+        stepped = wall_offset - self._offsets[0]
+        slept = sleep_offset - self._offsets[1]
+        self._offsets = (wall_offset, sleep_offset)
+        events = []
+        if slept > CLOCK_JUMP_TOLERANCE:
+            events.append(("suspend", slept))
+        if abs(stepped) > CLOCK_JUMP_TOLERANCE:
+            events.append(("step", stepped))
+        if not events:
+            return events
+
+        now, wall_now = time.monotonic(), datetime.now()
+        for timer in self._heap:
+            if timer.wall is not None:
+                timer.deadline = now + (timer.wall - wall_now).total_seconds()
+            elif slept > CLOCK_JUMP_TOLERANCE:
+                timer.deadline -= slept
+        heapq.heapify(self._heap)
+        for kind, delta in events:
+            logging.warning(f"Clock {kind} of {delta:+.1f}s detected, re-anchored {len(self._timers)} timers")
+            self.diagnostics.clock_event(kind, delta)
+        return events
+
+    def _notify_clock_change(self, events: List):
+        for kind, delta in events:
+            for listener in self._listeners:
+                try:
+                    listener(kind, delta)
+                except Exception as e:
+                    logging.error(f"Error in clock change listener: {e}")
+
+    # --- Engine thread ---
+
+    def _run(self):
+        while True:
+            timer = None
+            with self._cond:
+                if self._stopped:
+                    return
+                events = self._pending_events + self._check_clocks_locked()
+                self._pending_events = []
+                while self._heap and self._heap[0].cancelled:
+                    heapq.heappop(self._heap)
+                    self._cancelled -= 1
+                if self._heap:
+                    wait = self._heap[0].deadline - time.monotonic()
+                    if wait <= 0:
+                        timer = heapq.heappop(self._heap)
+                        del self._timers[timer.timer_id]
+                    elif not events:
+                        self._cond.wait(min(wait, CLOCK_CHECK_SECONDS))
+                elif not events:
+                    self._cond.wait()
+            self._notify_clock_change(events)
+            if timer is None:
+                continue
+            self.diagnostics.record("callback", time.monotonic() - timer.deadline)
+            self._firing = timer
+            try:
+                timer.callback(*timer.args)
+            except Exception as e:
+                logging.error(f"Error in timer {timer.timer_id}: {e}")
+            finally:
+                self._firing = None
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
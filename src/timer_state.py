@@ -0,0 +1,74 @@
+import json
+import logging
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from .commit import CommitLog
+
+# Timer fields worth keeping across a restart; the rest is UI bookkeeping
+_FIELDS = ("title", "type", "start_time", "end_time", "total_minutes", "finished", "finished_time")
+_TIMES = ("start_time", "end_time", "finished_time")
+
+
+class TimerState:
+    """
+    Running timers and the pomodoro cycle, persisted to timers.json.
+
+    The window saves after every change (start, cancel, finish, pomodoro
+    counted), never on the 1 s countdown tick, and an unchanged snapshot is
+    not rewritten. The file is replaced atomically, so after a crash it holds
+    the last complete snapshot.
+    """
+
+    def __init__(self, path: Path, commits: Optional[CommitLog] = None):
+        self.path = Path(path)
+        self.commits = commits or CommitLog(self.path.parent)
+        self._last = None
+
+    def save(self, timers: Dict[str, Dict], pomodoro_count: int):
+        doc = {
+            "pomodoro_count": pomodoro_count,
+            "cycle_day": date.today().isoformat(),
+            "timers": {
+                t_id: {key: (info[key].isoformat() if key in _TIMES else info[key])
+                       for key in _FIELDS if info.get(key) is not None}
+                for t_id, info in timers.items()
+            },
+        }
+        data = json.dumps(doc, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if data == self._last:
+            return
+        try:
+            self.commits.write(self.path, data)
+            self._last = data
+        except OSError as e:
+            logging.error(f"Error saving timers: {e}")
+
+    def load(self) -> Dict:
+        """
+        {"timers": {id: info}, "pomodoro_count": n} with datetimes parsed.
+        The pomodoro cycle starts over on a new day.
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                doc = json.load(f)
+        except FileNotFoundError:
+            return {"timers": {}, "pomodoro_count": 0}
+        except json.JSONDecodeError as e:
+            logging.error(f"Error loading timers: {e}")
+            return {"timers": {}, "pomodoro_count": 0}
+
+        timers = {}
+        for t_id, info in doc.get("timers", {}).items():
+            try:
+                for key in _TIMES:
+                    if key in info:
+                        info[key] = datetime.fromisoformat(info[key])
+                info.setdefault("finished", False)
+                info["popup_shown"] = info["finished"]
+                timers[t_id] = info
+            except (TypeError, ValueError) as e:
+                logging.error(f"Skipping unreadable timer {t_id}: {e}")
+        same_day = doc.get("cycle_day") == date.today().isoformat()
+        return {"timers": timers, "pomodoro_count": doc.get("pomodoro_count", 0) if same_day else 0}
@@ -1,10 +1,15 @@
 from PySide6.QtWidgets import QSystemTrayIcon, QMenu
 from PySide6.QtGui import QIcon, QAction
+from PySide6.QtCore import Signal
 from .config import APP_NAME, APP_ICON_PATH
 
 class SystemTray(QSystemTrayIcon):
+    # title, message; emitted by the notification worker, shown on the GUI thread
+    sig_show_message = Signal(str, str)
+
     def __init__(self, main_window, app_exit_callback, scheduler):
         super().__init__()
+        self.sig_show_message.connect(self.show_message)
         self.main_window = main_window
         self.app_exit_callback = app_exit_callback
         self.scheduler = scheduler
@@ -47,6 +52,9 @@ class SystemTray(QSystemTrayIcon):
     def setup(self):
         self.show()
 
+    def show_message(self, title, message):
+        self.showMessage(title, message, QSystemTrayIcon.Information, 3000)
+
     def run(self):
         # Native tray doesn't need a separate run loop, it uses the app's loop.
         pass
@@ -82,15 +90,17 @@ class SystemTray(QSystemTrayIcon):
 
     def on_quick_timer(self, minutes):
         import uuid
-        from .utils import show_notification
+        from .event_bus import NOTIFY
         
         task_id = f"quick_{uuid.uuid4().hex[:8]}"
+        events = self.main_window.events
         
+        # Runs on the timer engine thread: hand the message to the GUI thread
         def job_function():
-            show_notification("时间到!", f"您的 {minutes} 分钟专注会话已结束。")
+            events.publish(NOTIFY, title="时间到!", message=f"您的 {minutes} 分钟专注会话已结束。")
             
         self.scheduler.add_countdown_task(task_id, minutes, job_function)
-        show_notification("专注开始", f"定时器已设定为 {minutes} 分钟。")
+        self.main_window.sig_notify.emit("专注开始", f"定时器已设定为 {minutes} 分钟。")
 
     def on_exit_clicked(self):
         self.hide() # Remove icon immediately
@@ -0,0 +1,271 @@
+import logging
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from .storage import JsonBackend, StorageBackend
+from .task_index import TaskIndex
+
+
+class WriteBehindBackend(JsonBackend):
+    """
+    JSON layout held entirely in memory.
+
+    Everything is loaded once at startup, so getters never touch the disk.
+    Mutations only update memory and mark the affected file dirty; a writer
+    thread flushes once changes have been quiet for `debounce` seconds, but
+    never later than `flush_interval` seconds after the first unsaved change.
+    close() always performs a final synchronous flush.
+
+    Memory is the source of truth, so this mode assumes a single process owns
+    the data directory; flushes still take the store lock so readers in other
+    processes never see a half-written file.
+    """
+
+    TASKS = "tasks"
+    CONFIG = "config"
+    STATS = "stats"
+    TAGS = "tags"
+    ROLLUPS = "rollups"
+    MARKS = "sync_marks"
+
+    def __init__(self, data_dir: Path, tasks_file: Optional[Path] = None,
+                 flush_interval: float = 5.0, debounce: float = 0.5,
+                 config_file: Optional[Path] = None, daily_format: str = "json",
+                 fsync_policy: str = "batched"):
+        super().__init__(data_dir, tasks_file, config_file, daily_format, fsync_policy)
+        self.flush_interval = max(0.0, flush_interval)
+        self.debounce = min(max(0.0, debounce), self.flush_interval)
+
+        self._doc = dict(self._load_json())
+        self._index = TaskIndex(self._doc.pop("tasks", []))
+        self._config_doc = dict(self._load_config_doc())
+        self._config_doc["user_config"] = dict(self._config_doc.get("user_config", {}))
+        self._stats = self._load_stats()
+        self._tags = self._load_tag_stats()
+        self._rollups = self._load_rollups()
+        self._marks = self._load_sync_marks()
+        self._tags_version = 0
+
+        self._cond = threading.Condition()
+        self._dirty = set()
+        self._first_dirty = 0.0
+        self._last_change = 0.0
+        self._retry_at = 0.0     # after a failed flush, wait a full interval before trying again
+        self._closed = False
+        self._io_lock = threading.Lock()  # serializes actual file writes
+
+        self._writer = threading.Thread(target=self._writer_loop, name="WriteBehindFlusher", daemon=True)
+        self._writer.start()
+
+    # --- Dirty tracking ---
+
+    def _mark_dirty(self, *parts):
+        # Caller holds self._cond
+        now = time.monotonic()
+        if not self._dirty:
+            self._first_dirty = now
+        self._last_change = now
+        self._dirty.update(parts)
+        self._cond.notify()
+
+    def _writer_loop(self):
+        with self._cond:
+            while not self._closed:
+                if not self._dirty:
+                    self._cond.wait()
+                    continue
+                deadline = max(min(self._last_change + self.debounce,
+                                   self._first_dirty + self.flush_interval),
+                               self._retry_at)
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+                try:
+                    self._flush_locked()
+                except Exception as e:
+                    # Keep the writer alive; the parts are still dirty
+                    logging.error(f"Error in write-behind flusher: {e}")
+                    self._retry_at = time.monotonic() + self.flush_interval
+
+    def _flush_locked(self):
+        """Snapshot dirty parts under the lock, write them without it."""
+        dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return
+        snapshot = {}
+        if self.TASKS in dirty:
+            doc = dict(self._doc)
+            doc["tasks"] = self._index.tasks()
+            snapshot[self.TASKS] = doc
+        if self.CONFIG in dirty:
+            config_doc = dict(self._config_doc)
+            config_doc["user_config"] = dict(self._config_doc["user_config"])
+            snapshot[self.CONFIG] = config_doc
+        # Stats dicts are copy-on-write, so the current objects never change under us
+        if self.STATS in dirty:
+            snapshot[self.STATS] = self._stats
+        if self.TAGS in dirty:
+            snapshot[self.TAGS] = self._tags
+        if self.ROLLUPS in dirty:
+            snapshot[self.ROLLUPS] = self._rollups
+        if self.MARKS in dirty:
+            snapshot[self.MARKS] = self._marks
+
+        self._io_lock.acquire()
+        self._cond.release()
+        saved = False
+        try:
+            # Everything dirty since the last flush is one group commit
+            with self.store_lock.exclusive(), self._commit_group("cached changes") as group:
+                if self.TASKS in snapshot:
+                    self._save_json(snapshot[self.TASKS])
+                if self.CONFIG in snapshot:
+                    self._save_config_doc(snapshot[self.CONFIG])
+                if self.STATS in snapshot:
+                    self._save_stats(snapshot[self.STATS])
+                if self.TAGS in snapshot:
+                    self._save_tag_stats(snapshot[self.TAGS])
+                if self.ROLLUPS in snapshot:
+                    self._save_rollups(snapshot[self.ROLLUPS])
+                if self.MARKS in snapshot:
+                    self._save_sync_marks(snapshot[self.MARKS])
+                self.store_lock.bump()
+            saved = group["ok"]
+        except Exception as e:
+            logging.error(f"Error flushing cached changes: {e}")
+        finally:
+            self._io_lock.release()
+            self._cond.acquire()
+            if not saved:
+                # Memory still holds these parts: write them again on the next interval
+                logging.error(f"Cached changes not saved ({', '.join(sorted(dirty))}), will retry")
+                if not self._dirty:
+                    self._first_dirty = time.monotonic()
+                self._dirty |= dirty
+                self._retry_at = time.monotonic() + self.flush_interval
+
+    def flush(self):
+        """Write all pending changes now."""
+        with self._cond:
+            self._flush_locked()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._writer.join(timeout=5)
+        self.flush()
+        super().close()
+        logging.info("Write-behind cache flushed")
+
+    # --- Tasks & Config ---
+
+    def get_tasks(self) -> List[Dict]:
+        with self._cond:
+            return self._index.tasks()
+
+    def get_task(self, task_id: str) -> Optional[Dict]:
+        with self._cond:
+            return self._index.get(task_id)
+
+    def iter_tasks(self, filter: Optional[Callable[[Dict], bool]] = None,
+                   limit: Optional[int] = None, offset: int = 0) -> Iterator[Dict]:
+        # Everything is in memory already
+        return StorageBackend.iter_tasks(self, filter, limit, offset)
+
+    def add_tasks(self, tasks: List[Dict]):
+        if not tasks:
+            return
+        with self._cond:
+            self._index.add_many(tasks)
+            self._mark_dirty(self.TASKS)
+
+    def delete_tasks(self, task_ids: Iterable[str]) -> int:
+        with self._cond:
+            removed = self._index.delete_many(task_ids)
+            if removed:
+                self._mark_dirty(self.TASKS)
+            return removed
+
+    def update_tasks(self, updates: Dict[str, Dict]) -> int:
+        with self._cond:
+            changed = self._index.update_many(updates)
+            if changed:
+                self._mark_dirty(self.TASKS)
+            return changed
+
+    def get_config(self) -> Dict:
+        with self._cond:
+            return dict(self._config_doc["user_config"])
+
+    def update_config(self, key: str, value):
+        with self._cond:
+            self._config_doc["user_config"][key] = value
+            self._mark_dirty(self.CONFIG)
+
+    # --- Stats ---
+
+    # Stats dicts and rollups are replaced, never mutated, so a paint handler iterating the
+    # dict it got from a getter is safe while another thread records.
+
+    def get_daily_stats(self) -> Dict[str, int]:
+        if self.day_counters:
+            return self.day_counters.to_dict()
+        return self._stats
+
+    def get_tag_stats(self) -> Dict[str, int]:
+        return self._tags
+
+    def _increment_days(self, daily: Dict[str, int]) -> Dict[str, int]:
+        # Caller holds self._cond. Mapped day counters are already in memory.
+        if self.day_counters:
+            return {day: self.day_counters.increment(date.fromisoformat(day), amount)
+                    for day, amount in daily.items()}
+        stats = dict(self._stats)
+        for day, amount in daily.items():
+            stats[day] = stats.get(day, 0) + amount
+        self._stats = stats
+        self._mark_dirty(self.STATS)
+        return {day: stats[day] for day in daily}
+
+    def merge_counts(self, daily: Dict[str, int], tags: Dict[str, int],
+                     sync_marks: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        with self._cond:
+            # Marks are flushed in the same group as the counts they cover
+            if sync_marks:
+                self._marks = dict(self._marks, **sync_marks)
+                self._mark_dirty(self.MARKS)
+            totals = self._increment_days(daily)
+            rollups = self._rollups.copy()
+            for day, amount in daily.items():
+                rollups.add(date.fromisoformat(day), amount)
+            self._rollups = rollups
+            self._mark_dirty(self.ROLLUPS)
+            if tags:
+                new_tags = dict(self._tags)
+                for tag, amount in tags.items():
+                    new_tags[tag] = new_tags.get(tag, 0) + amount
+                self._tags = new_tags
+                self._tags_version += 1
+                self._mark_dirty(self.TAGS)
+            return totals
+
+    def get_rollups(self):
+        return self._rollups
+
+    def get_sync_marks(self) -> Dict[str, int]:
+        with self._cond:
+            return dict(self._marks)
+
+    def tag_stats_version(self):
+        return self._tags_version
+
+    def clear_tag_stats(self):
+        with self._cond:
+            self._tags = {}
+            self._tags_version += 1
+            self._mark_dirty(self.TAGS)
@@ -0,0 +1,27 @@
+"""
+Concurrent record_pomodoro/add_task from several threads in several
+processes must not lose a count or a task, on every backend that supports
+more than one process. Small counts of `python -m src.bench stress`.
+"""
+import pytest
+
+from src import bench
+
+ENV = ("TASKPULSE_DATA_DIR", "TASKPULSE_STORAGE_MODE", "TASKPULSE_DAILY_STATS_FORMAT")
+
+
+@pytest.fixture(autouse=True)
+def restore_env(monkeypatch):
+    # stress() points the worker processes at a temp directory through these
+    for name in ENV:
+        monkeypatch.setenv(name, "")
+
+
+@pytest.mark.parametrize("mode", ["json", "journal", "sqlite"])
+def test_no_lost_counts(mode):
+    assert bench.stress(mode, processes=3, threads=3, count=20, daily_format="json") == []
+
+
+@pytest.mark.parametrize("mode", ["json", "journal"])
+def test_no_lost_counts_mmap(mode):
+    assert bench.stress(mode, processes=3, threads=3, count=20, daily_format="mmap") == []